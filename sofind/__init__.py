@@ -1,6 +1,7 @@
 from sofind import utils
 from sofind.products import Product
 
+import hashlib
 import os
 
 
@@ -30,7 +31,7 @@ class DataModel(*Product.__subclasses__()):
         return self._name
 
     @classmethod
-    def from_config(cls, config_name):
+    def from_config(cls, config_name, use_bundle=True, lazy=False):
         """Build a DataModel instance from configuration files distributed in
         the sofind package.
 
@@ -39,6 +40,17 @@ class DataModel(*Product.__subclasses__()):
         config_name : str
             The name of the configuration file. If does not end in '.yaml', 
             '.yaml' will be appended.
+        use_bundle : bool, optional
+            Whether to load the fully resolved configuration from a compiled
+            bundle in the sofind cache directory (see utils.get_cache_dir), by
+            default True. The bundle is only used if none of the configuration
+            files it was compiled from has changed since; otherwise, it is
+            transparently rebuilt. Ignored if lazy.
+        lazy : bool, optional
+            If True, only the data model and qids configuration files are read
+            up front. Each subproduct configuration file is instead read, and
+            checked for compatibility with the data model, the first time the
+            subproduct is requested, by default False.
 
         Returns
         -------
@@ -46,6 +58,55 @@ class DataModel(*Product.__subclasses__()):
             Instance corresponding to the collection of products and subproducts
             indicated in the named configuration file.
 
+        Raises
+        ------
+        AssertionError
+            If the qids_config for the data model is not allowed by a
+            subproduct in the data model. If lazy, this is only raised when
+            the subproduct is first requested.
+        """
+        if not config_name.endswith('.yaml'):
+            config_name += '.yaml'
+        name = os.path.splitext(config_name)[0]
+
+        if lazy or not use_bundle:
+            dm_kwargs, _ = cls._resolve_config(config_name, lazy=lazy)
+            return cls(name, **dm_kwargs)
+
+        # the bundle is specific to this installation of sofind, since
+        # different installations may distribute different configs
+        package_path = os.path.dirname(utils.get_package_fn('sofind', ''))
+        package_hash = hashlib.sha1(package_path.encode()).hexdigest()[:12]
+        bundle_fn = utils.get_cache_dir(
+            'config_bundles', f'{name}_{package_hash}.pkl'
+            )
+
+        dm_kwargs = utils.read_config_bundle(bundle_fn)
+        if dm_kwargs is None:
+            dm_kwargs, signature = cls._resolve_config(config_name)
+            utils.write_config_bundle(bundle_fn, dm_kwargs, signature)
+
+        return cls(name, **dm_kwargs)
+
+    @classmethod
+    def _resolve_config(cls, config_name, lazy=False):
+        """Read and resolve all the configuration files making up a data model.
+
+        Parameters
+        ----------
+        config_name : str
+            The name of the configuration file, ending in '.yaml'.
+        lazy : bool, optional
+            If True, do not read any subproduct configuration files, but 
+            configure the DataModel to read them on demand, by default False.
+
+        Returns
+        -------
+        dict, tuple
+            The keyword arguments to construct the DataModel with, and the
+            signature (see utils.get_file_signature) of every configuration
+            file that was read, taken when it was parsed.
+
         Raises
         ------
         AssertionError
@@ -53,33 +114,38 @@ class DataModel(*Product.__subclasses__()):
             subproduct in the data model.
         """
         dm_kwargs = {}
+        signature = []
         
         # first get the datamodel dictionary
-        if not config_name.endswith('.yaml'):
-            config_name += '.yaml'
         basename = f'datamodels/{config_name}'
-        datamodel_fn = utils.get_package_fn('sofind', basename)
-        datamodel_dict = utils.config_from_yaml_file(datamodel_fn)
+        _signature, datamodel_dict = utils.get_package_config(
+            basename, return_signature=True
+            )
+        signature += _signature
 
         # evaluate the (sub)product dicts and add in the system paths.
         # handle special case of qids_dict separately
 
         # qids_config: the config basename
-        qids_config = datamodel_dict.pop('qids_config')
+        qids_config = datamodel_dict['qids_config']
         if not qids_config.endswith('.yaml'):
             qids_config += '.yaml'
 
-        # qids_fn: the actual config full filename
+        # qids_dict: the contents of the qids config
         basename = f'qids/{qids_config}'
-        qids_fn = utils.get_package_fn('sofind', basename)
-
-        # qids_dict: the contents of the filename
-        qids_dict = utils.config_from_yaml_file(qids_fn)
+        _signature, qids_dict = utils.get_package_config(
+            basename, return_signature=True
+            )
+        signature += _signature
         dm_kwargs['qids'] = qids_dict
+        dm_kwargs['qids_config'] = qids_config
+        dm_kwargs['lazy'] = lazy
 
         # next get the paths, configs, and config info
         dm_kwargs['configs'] = {}
         for product in datamodel_dict:
+            if product == 'qids_config':
+                continue
             dm_kwargs[product] = {}
             dm_kwargs['configs'][product] = {}
             for subproduct, subproduct_config in datamodel_dict[product].items():
@@ -87,32 +153,30 @@ class DataModel(*Product.__subclasses__()):
                 if not subproduct_config.endswith('.yaml'):
                     subproduct_config += '.yaml'
 
-                # subproduct_fn: the actual config full filename
-                basename = f'products/{product}/{subproduct_config}'
-                subproduct_fn = utils.get_package_fn('sofind', basename)
+                subproduct = subproduct.split('_config')[0] # remove _config
+                dm_kwargs['configs'][product][subproduct] = subproduct_config
 
-                # subproduct_dict: the contents of the filename
-                subproduct_dict = utils.config_from_yaml_file(subproduct_fn)
+                if lazy:
+                    continue
+
+                # subproduct_dict: the contents of the subproduct config
+                basename = f'products/{product}/{subproduct_config}'
+                _signature, subproduct_dict = utils.get_package_config(
+                    basename, return_signature=True
+                    )
+                signature += _signature
 
                 # NOTE: check for compatibility of this subproduct with the
                 # data_model, meaning the requested qids_dict is allowed
-                subproduct = subproduct.split('_config')[0] # remove _config
+                cls.check_subproduct_config_allows_qids_config(
+                    product, subproduct, subproduct_config, subproduct_dict,
+                    qids_config
+                    )
 
-                try:
-                    if qids_config not in subproduct_dict['allowed_qids_configs']:
-                        assert subproduct_dict['allowed_qids_configs'] == 'all', \
-                            f'qids_config {qids_config} not allowed by product {product}, ' + \
-                            f'subproduct {subproduct} (config {subproduct_config})'
-                except TypeError as e:
-                    raise AssertionError(
-                         f'No allowed_qids_configs for product {product}, subproduct {subproduct} '
-                         f'(config {subproduct_config})') from e
-
-                # if compatible, add to the dm_kwargs. also add config name for the record
+                # if compatible, add to the dm_kwargs
                 dm_kwargs[product][subproduct] = subproduct_dict
-                dm_kwargs['configs'][product][subproduct] = subproduct_config
 
-        return cls(os.path.splitext(config_name)[0], **dm_kwargs)
+        return dm_kwargs, tuple(signature)
 
     @classmethod
     def from_productdb(cls, config_name):
@@ -1,7 +1,7 @@
-from ..products import Product, get_implements_decorator
+from ..products import Product, get_async_method, get_implements_decorator
+from sofind import utils
 
-import os
-import numpy as np
+np = utils.lazy_import('numpy')
 
 class Beam(Product):
 
@@ -47,25 +47,66 @@ class Beam(Product):
             If basename is False and the product, subproduct dirname is not
             known to the datamodel.
         """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
-
         # get the appropriate filename template
         if coadd:
-            fn_template = subprod_dict['coadd_beam_file_template']
+            fn_template = 'coadd_beam_file_template'
         else:
-            fn_template = subprod_dict['split_beam_file_template']
+            fn_template = 'split_beam_file_template'
+
+        # the resolver holds the info about the requested array. add kwargs
+        # passed to this method call to format the file template
+        resolver = self.resolver(__name__, subproduct, qid, fn_template)
+        return resolver(basename=basename, split_num=split_num, **kwargs)
+
+    def get_beam_fns(self, qids, split_nums=0, coadd=False,
+                     subproduct='default', basename=False, **kwargs):
+        """Get the full paths to beam products over a grid of qids and split
+        indices. The qid-dependent part of each filename is only resolved once
+        per qid.
+
+        Parameters
+        ----------
+        qids : str or iterable of str
+            Dataset identification strings.
+        split_nums : int or iterable of int, optional
+            Split indices of the beam products, by default 0.
+        coadd : bool, optional
+            If True, get the corresponding products for the on-disk coadd beam,
+            by default False. If True, split_nums is neglected (all entries
+            along the split axis of the output are the same).
+        subproduct : str, optional
+            Name of beam subproduct to load raw products from, by default 
+            'default'.
+        basename : bool, optional
+            Only return file basenames, by default False.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the beam filenames,
+            common to all filenames.
 
-        # get info about the requested array and add kwargs passed to this
-        # method call. use this info to format the file template
-        fn_kwargs = self.get_qid_kwargs_by_subproduct(__name__, subproduct, qid)
-        fn_kwargs.update(split_num=split_num, **kwargs)
-        fn = fn_template.format(**fn_kwargs)
+        Returns
+        -------
+        (nqid, nsplit) np.ndarray of str
+            The filenames (see get_beam_fn), where a str or int argument counts
+            as a length-1 axis.
+        """
+        qids = utils.to_tuple(qids)
+        split_nums = utils.to_tuple(split_nums)
 
-        if basename:
-            return fn
+        # get the appropriate filename template
+        if coadd:
+            fn_template = 'coadd_beam_file_template'
         else:
-            subprod_path = self.get_subproduct_path(__name__, subproduct)
-            return os.path.join(subprod_path, fn)
+            fn_template = 'split_beam_file_template'
+
+        fns = []
+        for qid in qids:
+            resolver = self.resolver(__name__, subproduct, qid, fn_template)
+            for split_num in split_nums:
+                fns.append(resolver(
+                    basename=basename, split_num=split_num, **kwargs
+                    ))
+
+        return np.array(fns, dtype=str).reshape(len(qids), len(split_nums))
 
     @implements(Product.read_product)
     def read_beam(self, qid, split_num=0, coadd=False, subproduct='default',
@@ -93,7 +134,8 @@ class Beam(Product):
         Returns
         -------
         np.array
-            The requested beam = [ells, bells]
+            The requested beam = [ells, bells]. Read-only if the loadtxt cache
+            is enabled (see utils.enable_loadtxt_cache).
         """
         
         if subproduct == 'dummy':
@@ -109,8 +151,87 @@ class Beam(Product):
         if loadtxt_kwargs is None:
             loadtxt_kwargs = {'unpack': True, 'usecols': (0, 1)}
 
-        return np.loadtxt(fn, **loadtxt_kwargs)
+        return utils.loadtxt(fn, **loadtxt_kwargs)
     
+    def read_beams(self, qids, lmax, split_num=0, coadd=False,
+                   subproduct='default', normalize=None, loadtxt_kwargs=None,
+                   right=None, **kwargs):
+        """Read beam products for several qids and resample them onto the
+        common ell grid 0, 1, ..., lmax.
+
+        Parameters
+        ----------
+        qids : str or iterable of str
+            Dataset identification strings.
+        lmax : int
+            The maximum ell of the output.
+        split_num : int, optional
+            Split index of the beam products, by default 0.
+        coadd : bool, optional
+            If True, load the corresponding products for the on-disk coadd 
+            beams, by default False. If True, split_num is neglected.
+        subproduct : str, optional
+            Name of beam subproduct to load raw products from, by default 
+            'default'.
+        normalize : bool, optional
+            Whether to divide each beam by its first value (bells /= bells[0]).
+            By default, normalize if get_if_norm_beam(subproduct) is True.
+        loadtxt_kwargs : dict, optional
+            Any keyword arguments to pass to np.loadtxt, by default 
+            {'unpack': True, 'usecols': (0, 1)}. The first two rows of the
+            loaded array must be ells and bells.
+        right : float, optional
+            Value of a beam above the maximum ell in its file, by default the
+            value at that maximum ell. Below the minimum ell in its file, a
+            beam takes the value at that minimum ell.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the beam filenames,
+            common to all filenames.
+
+        Returns
+        -------
+        (nqid, lmax+1) np.ndarray
+            The beams, linearly interpolated (see utils.interp_rows) onto 
+            integer ells, where a str qids counts as a length-1 axis.
+
+        Notes
+        -----
+        Qids whose beams are in the same file only read that file once.
+        """
+        qids = utils.to_tuple(qids)
+        ells = np.arange(lmax + 1)
+
+        if subproduct == 'dummy':
+            # dummy beam is 1 everywhere, see read_beam
+            return np.ones((len(qids), ells.size))
+
+        if normalize is None:
+            normalize = bool(self.get_if_norm_beam(subproduct=subproduct))
+
+        if loadtxt_kwargs is None:
+            loadtxt_kwargs = {'unpack': True, 'usecols': (0, 1)}
+
+        fns = self.get_beam_fns(
+            qids, split_nums=split_num, coadd=coadd, subproduct=subproduct,
+            basename=False, **kwargs
+            )[:, 0]
+
+        # read each distinct file once, then interpolate them all together
+        beams = {}
+        for fn in fns:
+            if fn not in beams:
+                beams[fn] = utils.loadtxt(fn, **loadtxt_kwargs)
+        uniq_fns = list(beams)
+        
+        uniq_ells = [beams[fn][0] for fn in uniq_fns]
+        uniq_bells = [beams[fn][1] for fn in uniq_fns]
+        out = utils.interp_rows(ells, uniq_ells, uniq_bells, right=right)
+
+        if normalize:
+            out /= np.array([bells[0] for bells in uniq_bells])[:, None]
+
+        return out[[uniq_fns.index(fn) for fn in fns]]
+
     def get_if_norm_beam(self, subproduct='default'):
 
         """Check if the beam product needs to be normalised (operation bells /= bells[0]).
@@ -128,9 +249,13 @@ class Beam(Product):
             True or False otherwise
         """
 
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
 
         # Verify if 'norm' exists on subprod_dict
         norm_value = subprod_dict.get('norm', None)
 
-        return norm_value
\ No newline at end of file
+        return norm_value
+
+    # async counterparts, see Product.run_async
+    aread_beam = get_async_method(read_beam)
+    aread_beams = get_async_method(read_beams)
@@ -1,10 +1,11 @@
 
-from ..products import Product, get_implements_decorator
+from ..products import Product, get_async_method, get_implements_decorator
+from sofind import utils
     
-import numpy as np
-import os
 import pickle
 
+np = utils.lazy_import('numpy')
+
 class Calibration(Product):
 
     implementedmethods = []
@@ -13,6 +14,16 @@ class Calibration(Product):
     def __init__(self, **kwargs):
         self.set_attrs(__name__, kwargs)
         super().__init__(**kwargs)
+
+        # memoized calibration tables, keyed by filename. each entry is a 
+        # (signature, table) tuple
+        self._calibration_tables = {}
+
+        # memoized column of the calibration values for each value of each
+        # subproduct_kwarg, keyed by subproduct. e.g. {'el_split': {'el1': 0,
+        # 'el2': 1, 'el3': 2}}
+        self._calibration_columns = {}
+
         self.check_product_config_internal_consistency(__name__)
 
 
@@ -42,34 +53,22 @@ class Calibration(Product):
             If basename, basename of requested product. Else, full path to
             requested product.
         """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
-
         # get the appropriate filename template
-        cals_file_template = subprod_dict['cals_file_template']
-        poleffs_file_template = subprod_dict['poleffs_file_template']
-
-        # get info about the requested array and add kwargs passed to this
-        # method call. use this info to format the file template
-        fn_kwargs = self.get_qid_kwargs_by_subproduct(__name__, subproduct, qid)
-        fn_kwargs.update(**kwargs)
-
         if which == 'cals':
-            fn = cals_file_template.format(**fn_kwargs)
+            fn_template = 'cals_file_template'
         elif which == 'poleffs':
-            fn = poleffs_file_template.format(**fn_kwargs)      
+            fn_template = 'poleffs_file_template'
         else:
             raise ValueError(f"which must be 'cals' or 'poleffs', got {which}")
-        
-        if basename:
-            return fn
-        else:
-            # subprod_path is the system path to the directory holding this (sub)product
-            subprod_path = self.get_subproduct_path(__name__, subproduct)
-            return os.path.join(subprod_path, fn)
+
+        # the resolver holds the info about the requested array. add kwargs
+        # passed to this method call to format the file template
+        resolver = self.resolver(__name__, subproduct, qid, fn_template)
+        return resolver(basename=basename, **kwargs)
 
     @implements(Product.read_product)
     def read_calibration(self, qid, which='cals', subproduct='default', 
-                         fn_kwargs=None, **kwargs):       
+                         fn_kwargs=None, refresh=False, **kwargs):       
         """
         Read a calibration product from disk.
 
@@ -87,6 +86,9 @@ class Calibration(Product):
             Only return file basename, by default False.
         fn_kwargs : dict, optional
             Any additional keyword arguments used to format the calibration filename.
+        refresh : bool, optional
+            Re-read the calibration file even if it was not modified since it
+            was last read, by default False. See get_calibration_table.
         kwargs : dict, optional
             Any additional keyword arguments used to format the calibration key
             and/or retrieve the calibration out of the data. I.e., the value of a
@@ -103,7 +105,131 @@ class Calibration(Product):
         if subproduct == 'dummy':
             return 1
 
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
+        if fn_kwargs is None:
+            fn_kwargs = {}
+        fn = self.get_calibration_fn(qid, which=which, subproduct=subproduct, 
+                                basename=False, **fn_kwargs)
+        table = self.get_calibration_table(fn, refresh=refresh)
+
+        return self._get_calibration_from_table(table, qid, subproduct, kwargs)
+
+    def read_calibrations(self, qids, which='cals', subproduct='default',
+                          fn_kwargs=None, refresh=False, **subproduct_kwargs):
+        """Read calibration products from disk over a grid of qids and values
+        of subproduct_kwargs, in one call.
+
+        Parameters
+        ----------
+        qids : str or iterable of str
+            Dataset identification strings.
+        which : str, optional
+            Whether to load from the available 'cals' or 'poleffs', by default
+            'cals'.
+        subproduct : str, optional
+            Name of calibration subproduct to load raw products from, by default 
+            'default'.
+        fn_kwargs : dict, optional
+            Any additional keyword arguments used to format the calibration
+            filenames.
+        refresh : bool, optional
+            Re-read the calibration files even if they were not modified since
+            they were last read, by default False. See get_calibration_table.
+        subproduct_kwargs : dict, optional
+            Lists of the values of any additional keyword arguments used to
+            format the calibration keys and/or retrieve the calibrations out of
+            the data, e.g., "el_split=['el1', 'el2', 'el3']". A single value
+            counts as a length-1 list. See read_calibration.
+
+        Returns
+        -------
+        (*nvals, nqid) np.ndarray
+            The requested calibration values, with one axis per 
+            subproduct_kwarg (in order) and then one for the qids. Flattened,
+            the values follow the order of the 'super_qids' (see 
+            utils.get_super_qids_from_qids_and_subproduct_kwargs).
+
+        Notes
+        -----
+        Each calibration file is checked for modification (see 
+        get_calibration_table) only once per call.
+
+        Examples
+        --------
+        >>> cals = dm.read_calibrations(['pa5a', 'pa5b', 'pa6a'], 
+        ...                             subproduct='act_dr6.02_el_split',
+        ...                             el_split=['el1', 'el2', 'el3'])
+        >>> cals.shape
+        (3, 3)
+        """
+        qids = utils.to_tuple(qids)
+        subproduct_kwargs = {k: utils.to_tuple(v) for k, v in subproduct_kwargs.items()}
+        oshape = tuple(len(v) for v in subproduct_kwargs.values()) + (len(qids),)
+
+        if subproduct == 'dummy':
+            return np.ones(oshape)
+
+        if fn_kwargs is None:
+            fn_kwargs = {}
+        super_qids = utils.get_super_qids_from_qids_and_subproduct_kwargs(
+            *qids, **subproduct_kwargs
+            )
+
+        out = []
+        tables = {}
+        for kwargs, qid in super_qids:
+            fn = self.get_calibration_fn(qid, which=which, subproduct=subproduct,
+                                         basename=False, **fn_kwargs)
+            try:
+                table = tables[fn]
+            except KeyError:
+                table = tables[fn] = self.get_calibration_table(
+                    fn, refresh=refresh
+                    )
+            out.append(
+                self._get_calibration_from_table(table, qid, subproduct, kwargs)
+                )
+        return np.array(out).reshape(oshape)
+
+    def get_calibration_table(self, fn, refresh=False):
+        """Get the contents of a calibration file, which are read from disk
+        only once, unless the file is modified.
+
+        Parameters
+        ----------
+        fn : str
+            Full path to the calibration file.
+        refresh : bool, optional
+            Re-read the file even if it was not modified since it was last 
+            read, by default False.
+
+        Returns
+        -------
+        dict
+            A mapping from calibration key (e.g. 'dr6_pa4_f220') to a tuple of
+            calibration values. Must not be modified.
+        """
+        signature = utils.get_file_signature(fn)
+        try:
+            _signature, table = self._calibration_tables[fn]
+            if not refresh and _signature == signature:
+                return table
+        except KeyError:
+            pass
+        
+        with open(fn, 'rb') as f:
+            d = pickle.load(f)
+        
+        # calibration & polarization efficies are stored in a dictionary
+        # like {'dr6_pa4_f220': {'calibs': [0.9111]}}, annoyingly
+        table = {k: tuple(v['calibs']) for k, v in d.items()}
+        self._calibration_tables[fn] = (signature, table)
+        return table
+
+    def _get_calibration_from_table(self, table, qid, subproduct, kwargs):
+        """Get a calibration value from a calibration table (see 
+        get_calibration_table) given the qid and the subproduct kwargs. See
+        read_calibration."""
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
 
         # get the appropriate dictionary key template
         key_template = subprod_dict['key_template']
@@ -114,36 +240,69 @@ class Calibration(Product):
         qid_kwargs.update(**kwargs)
         key = key_template.format(**qid_kwargs)
 
-        # get info about the requested array and add kwargs passed to this
-        # method call. use this info to format the file template
-        if fn_kwargs is None:
-            fn_kwargs = {}
-        fn = self.get_calibration_fn(qid, which=which, subproduct=subproduct, 
-                                basename=False, **fn_kwargs)
-
-        with open(fn, 'rb') as f:
-            d = pickle.load(f)
-
         # depending on the subproduct, the factors may be in a particular
         # order in the list of 'calibs'
-        subproduct_kwargs_orders = subprod_dict['subproduct_kwargs_orders']
-        if subproduct_kwargs_orders is not None:
+        columns = self._get_calibration_columns(subproduct)
+        if columns is not None:
             # first ensure that exactly one expected subproduct_kwarg is 
             # available in kwargs. in other words, can only get the calibration
             # for one subproduct_kwarg at a time. 
             nmatch = 0
-            for subproduct_kwarg in subproduct_kwargs_orders.keys():
+            for subproduct_kwarg in columns:
                 if subproduct_kwarg in kwargs:
                     nmatch += 1
                     k = subproduct_kwarg # e.g., el_split
                     v = kwargs[subproduct_kwarg] # e.g., el1
             assert nmatch == 1, \
-                f"expected exactly one of {list(subproduct_kwargs_orders.keys())} " + \
+                f"expected exactly one of {list(columns)} " + \
                 f"in kwargs, got {nmatch}"
-            idx = subproduct_kwargs_orders[k].index(v)
+            try:
+                idx = columns[k][v]
+            except KeyError:
+                raise ValueError(
+                    f'{v} is not in subproduct_kwargs_orders[{k!r}] of '
+                    f'subproduct {subproduct}'
+                    ) from None
         else:
             idx = 0
 
-        # calibration & polarization efficies are stored in a dictionary
-        # like {'dr6_pa4_f220': {'calibs': [0.9111]}}, annoyingly
-        return d[key]['calibs'][idx]
+        return table[key][idx]
+
+    def _get_calibration_columns(self, subproduct):
+        """Get the column of the calibration values for each value of each 
+        subproduct_kwarg of a subproduct, from its subproduct_kwargs_orders.
+        Built once per subproduct, and then memoized.
+
+        Parameters
+        ----------
+        subproduct : str
+            Name of calibration subproduct.
+
+        Returns
+        -------
+        dict or None
+            A mapping from subproduct_kwarg to a mapping from its values to
+            their column, or None if the subproduct has no 
+            subproduct_kwargs_orders. Must not be modified.
+        """
+        try:
+            return self._calibration_columns[subproduct]
+        except KeyError:
+            pass
+
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
+        subproduct_kwargs_orders = subprod_dict['subproduct_kwargs_orders']
+        if subproduct_kwargs_orders is None:
+            columns = None
+        else:
+            # the first occurrence of a value gives its column, as list.index
+            columns = {
+                k: {v: idx for idx, v in reversed(list(enumerate(order)))}
+                for k, order in subproduct_kwargs_orders.items()
+                }
+        
+        self._calibration_columns[subproduct] = columns
+        return columns
+
+    # async counterparts, see Product.run_async
+    aread_calibration = get_async_method(read_calibration)
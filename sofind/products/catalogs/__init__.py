@@ -1,17 +1,40 @@
-from ..products import Product, get_implements_decorator
-
-import numpy as np
+from ..products import Product, get_async_method, get_implements_decorator
+from sofind import utils
 
+from collections import OrderedDict
+import operator
 import os
 
+np = utils.lazy_import('numpy')
+enmap = utils.lazy_import('pixell.enmap')
+spatial = utils.lazy_import('scipy.spatial')
+
 class Catalog(Product):
 
     implementedmethods = []
     implements = get_implements_decorator(implementedmethods)
+
+    # The maximum number of (catalog, geometry) pixel positions cached by 
+    # catalog_pixels, per datamodel
+    catalog_pixels_cache_size = 64
     
     def __init__(self, **kwargs):
         self.set_attrs(__name__, kwargs)
         super().__init__(**kwargs)
+
+        # memoized columnar catalog tables, keyed by filename. each entry is
+        # a (signature, table) tuple
+        self._catalog_tables = {}
+
+        # memoized spatial indices of catalogs, keyed by filename. each entry 
+        # is a (signature, tree) tuple
+        self._catalog_trees = {}
+
+        # memoized pixel positions of catalogs, keyed by filename, file
+        # signature and map geometry, in least-recently used order. each
+        # entry is an (idxs, pix) tuple
+        self._catalog_pixels = OrderedDict()
+
         self.check_product_config_internal_consistency(__name__)
 
     @implements(Product.get_fn)
@@ -48,7 +71,7 @@ class Catalog(Product):
             If basename is False and the product, subproduct dirname is not
             known to the datamodel.
         """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
 
         if basename:
             return cat_fn
@@ -57,7 +80,7 @@ class Catalog(Product):
             return os.path.join(subprod_path, cat_fn)
 
     @implements(Product.read_product)
-    def read_catalog(self, cat_fn, subproduct='default', **kwargs):
+    def read_catalog(self, cat_fn, subproduct='default', where=None, **kwargs):
         """Read a catalog product from disk.
 
         Parameters
@@ -72,6 +95,9 @@ class Catalog(Product):
         subproduct : str, optional
             Name of catalog subproduct to load raw products from, by default 
             'default'.
+        where : iterable of (int, str, scalar), optional
+            Only return the sources satisfying all of these predicates, see
+            read_catalog_columns. By default, all sources.
         kwargs : dict, optional
             Any additional keyword arguments used to format the catalog filename.
 
@@ -84,7 +110,396 @@ class Catalog(Product):
         -----
         Expects RA, DEC columns (degrees), returns DEC, RA rows (radians).
         """
+        if where is not None:
+            dec, ra = self.read_catalog_columns(
+                cat_fn, columns=[1, 0], where=where, subproduct=subproduct,
+                **kwargs
+                )
+            return np.radians(np.vstack([dec, ra]))
+
         fn = self.get_catalog_fn(cat_fn, subproduct=subproduct, basename=False,
                               **kwargs)
-        ra, dec = np.loadtxt(fn, unpack=True, usecols=[0, 1], delimiter=',')
-        return np.radians(np.vstack([dec, ra]))
\ No newline at end of file
+        ra, dec = utils.loadtxt(fn, unpack=True, usecols=[0, 1], delimiter=',')
+        return np.radians(np.vstack([dec, ra]))
+
+    def read_catalog_columns(self, cat_fn, columns=None, where=None,
+                             subproduct='default', **kwargs):
+        """Read columns of a catalog product, optionally only for the rows
+        (sources) satisfying some predicates.
+
+        Parameters
+        ----------
+        cat_fn : str
+            The filename for a source catalog. All columns of the source 
+            catalog must be numeric and comma-separated.
+        columns : int or iterable of int, optional
+            The indices of the columns to read, by default all of them.
+        where : iterable of (int, str, scalar), optional
+            Predicates (column index, operator, value), e.g. (3, '>', 5) for 
+            the rows whose fourth column is greater than 5. The operator is 
+            one of '<', '<=', '>', '>=', '==' or '!='. Only the rows 
+            satisfying all predicates are returned. By default, all rows.
+        subproduct : str, optional
+            Name of catalog subproduct to load raw products from, by default 
+            'default'.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the catalog filename.
+
+        Returns
+        -------
+        (ncol, nrow) np.ndarray
+            The requested columns, in the units of the file, where an int 
+            columns counts as a length-1 axis.
+
+        Raises
+        ------
+        ValueError
+            If a predicate operator is not supported.
+
+        Notes
+        -----
+        The catalog is parsed only once, into a columnar binary table (see
+        get_catalog_table). Only the requested and predicate columns are then
+        read from the table, and only the selected rows are copied.
+        """
+        fn = self.get_catalog_fn(cat_fn, subproduct=subproduct, basename=False,
+                                 **kwargs)
+        table = self.get_catalog_table(fn)
+
+        if columns is None:
+            columns = range(table.shape[0])
+        columns = utils.to_tuple(columns)
+
+        if where is None:
+            return table[list(columns)]
+
+        mask = np.ones(table.shape[1], dtype=bool)
+        for column, op, value in where:
+            try:
+                op = _catalog_operators[op]
+            except KeyError as e:
+                raise ValueError(
+                    f'Unsupported operator {op}, must be one of '
+                    f'{list(_catalog_operators)}'
+                    ) from e
+            mask &= op(table[column], value)
+
+        out = np.empty((len(columns), np.count_nonzero(mask)), dtype=table.dtype)
+        for i, column in enumerate(columns):
+            np.compress(mask, table[column], out=out[i])
+        return out
+
+    def get_catalog_table(self, fn):
+        """Get the contents of a catalog file as a columnar table. The file is
+        parsed only once (unless it is modified) and kept in memory. If the
+        loadtxt cache is enabled (see utils.enable_loadtxt_cache), the table
+        is instead stored as a binary sidecar file, which is memory-mapped, so
+        that other processes need not parse the file either.
+
+        Parameters
+        ----------
+        fn : str
+            Full path to the catalog file. All columns must be numeric and 
+            comma-separated.
+
+        Returns
+        -------
+        (ncol, nrow) np.ndarray
+            The table, read-only and shared between calls. Each column is
+            contiguous.
+        """
+        signature = utils.get_file_signature(fn)
+        try:
+            _signature, table = self._catalog_tables[fn]
+            if _signature == signature:
+                return table
+        except KeyError:
+            pass
+
+        table = utils.loadtxt(fn, unpack=True, delimiter=',', ndmin=2)
+        
+        # if unpack, np.loadtxt returns a transposed view
+        table = np.ascontiguousarray(table)
+        table.flags.writeable = False
+        self._catalog_tables[fn] = (signature, table)
+        return table
+
+    def get_catalog_tree(self, fn):
+        """Get a spatial index of the sources in a catalog file, which is only
+        built once, unless the file is modified.
+
+        Parameters
+        ----------
+        fn : str
+            Full path to the catalog file. The first column is RA and the 
+            second column is DEC (in degrees). All columns must be numeric and
+            comma-separated.
+
+        Returns
+        -------
+        scipy.spatial.cKDTree
+            KD-tree of the unit vectors of the sources, in the order of the
+            rows of the catalog.
+        """
+        signature = utils.get_file_signature(fn)
+        try:
+            _signature, tree = self._catalog_trees[fn]
+            if _signature == signature:
+                return tree
+        except KeyError:
+            pass
+        
+        table = self.get_catalog_table(fn)
+        # unbalanced trees build faster with the same query performance for
+        # points on the sphere
+        tree = spatial.cKDTree(
+            _ang2vec(np.radians(table[1]), np.radians(table[0])),
+            balanced_tree=False
+            )
+        self._catalog_trees[fn] = (signature, tree)
+        return tree
+
+    def query_cone(self, cat_fn, ra, dec, radius, subproduct='default',
+                   **kwargs):
+        """Find the sources of a catalog within some angular distance of a
+        point, using its spatial index (see get_catalog_tree).
+
+        Parameters
+        ----------
+        cat_fn : str
+            The filename for a source catalog, see read_catalog.
+        ra : float
+            RA of the center of the cone (in radians).
+        dec : float
+            DEC of the center of the cone (in radians).
+        radius : float
+            Radius of the cone (in radians).
+        subproduct : str, optional
+            Name of catalog subproduct to load raw products from, by default 
+            'default'.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the catalog filename.
+
+        Returns
+        -------
+        np.ndarray
+            The sorted indices of the sources in the cone, i.e., of the 
+            columns of the output of read_catalog.
+        """
+        fn = self.get_catalog_fn(cat_fn, subproduct=subproduct, basename=False,
+                                 **kwargs)
+        tree = self.get_catalog_tree(fn)
+
+        # angular distance to chord length between unit vectors
+        chord = 2 * np.sin(min(radius, np.pi) / 2)
+        idxs = tree.query_ball_point(_ang2vec(dec, ra), chord)
+        return np.sort(np.asarray(idxs, dtype=np.intp))
+
+    def query_box(self, cat_fn, box, subproduct='default', **kwargs):
+        """Find the sources of a catalog within a box in RA and DEC, using its
+        spatial index (see get_catalog_tree).
+
+        Parameters
+        ----------
+        cat_fn : str
+            The filename for a source catalog, see read_catalog.
+        box : (2, 2) array-like
+            The box [[dec_from, ra_from], [dec_to, ra_to]] (in radians), as in
+            pixell. The box spans the RA in the interval between ra_from and 
+            ra_to, which may be given in either order. As in pixell, a box
+            crossing RA = 0 is given with RA outside [0, 2pi), e.g. from -0.1
+            to 0.1; from 0.1 to 2pi - 0.1 is instead the complement of that.
+        subproduct : str, optional
+            Name of catalog subproduct to load raw products from, by default 
+            'default'.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the catalog filename.
+
+        Returns
+        -------
+        np.ndarray
+            The sorted indices of the sources in the box, i.e., of the 
+            columns of the output of read_catalog.
+        """
+        fn = self.get_catalog_fn(cat_fn, subproduct=subproduct, basename=False,
+                                 **kwargs)
+        tree = self.get_catalog_tree(fn)
+        table = self.get_catalog_table(fn)
+
+        (dec0, ra0), (dec1, ra1) = np.asarray(box, dtype=np.float64)
+        dec0, dec1 = sorted([max(dec0, -np.pi/2), min(dec1, np.pi/2)])
+        ra0, ra1 = sorted([ra0, ra1])
+        ra_width = ra1 - ra0
+
+        # first get candidates from the cone around the center of the box
+        # passing through its corners. if the box is narrower than pi in RA,
+        # the corners are the furthest points of the box from its center
+        if ra_width < np.pi:
+            center = _ang2vec((dec0 + dec1) / 2, (ra0 + ra1) / 2)
+            corners = _ang2vec(
+                np.array([dec0, dec0, dec1, dec1]), np.array([ra0, ra1, ra0, ra1])
+                )
+            chord = np.linalg.norm(corners - center, axis=-1).max()
+            idxs = tree.query_ball_point(center, chord * (1 + 1e-12))
+            idxs = np.sort(np.asarray(idxs, dtype=np.intp))
+        else:
+            idxs = np.arange(table.shape[1])
+
+        # then keep those candidates exactly in the box
+        dec = np.radians(table[1][idxs])
+        ra = np.radians(table[0][idxs])
+        in_box = (dec >= dec0) & (dec <= dec1)
+        in_box &= np.mod(ra - ra0, 2*np.pi) <= ra_width
+        return idxs[in_box]
+
+    def crossmatch_catalogs(self, cat_a, cat_b, radius, subproduct='default',
+                            **kwargs):
+        """Match each source of one catalog to its nearest neighbor in another
+        catalog, if it is within some angular distance.
+
+        Parameters
+        ----------
+        cat_a : str or (2, N) array-like
+            The catalog whose sources are matched: either the filename for a 
+            source catalog (see read_catalog) or DEC and RA values (in 
+            radians) for each source, as returned by read_catalog.
+        cat_b : str or (2, M) array-like
+            The catalog in which to find matches, in the same format as cat_a.
+            If a filename, its spatial index is reused (see get_catalog_tree).
+        radius : float
+            Maximum separation of a match (in radians).
+        subproduct : str, optional
+            Name of catalog subproduct to load raw products from, if cat_a or
+            cat_b is a filename, by default 'default'.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the catalog 
+            filenames.
+
+        Returns
+        -------
+        (N,) np.ndarray, (N,) np.ndarray
+            For each source of cat_a, the index of its match in cat_b (-1 if 
+            none) and the separation (in radians) to it (np.inf if none).
+        """
+        dec_a, ra_a = self._get_catalog_dec_ra(cat_a, subproduct, kwargs)
+
+        if isinstance(cat_b, str):
+            fn = self.get_catalog_fn(cat_b, subproduct=subproduct, 
+                                     basename=False, **kwargs)
+            tree = self.get_catalog_tree(fn)
+        else:
+            dec_b, ra_b = self._get_catalog_dec_ra(cat_b, subproduct, kwargs)
+            tree = spatial.cKDTree(_ang2vec(dec_b, ra_b), balanced_tree=False)
+
+        # angular distance to chord length between unit vectors, and back
+        chord = 2 * np.sin(min(radius, np.pi) / 2)
+        chords, idxs = tree.query(
+            _ang2vec(dec_a, ra_a), distance_upper_bound=chord
+            )
+
+        matched = idxs < tree.n
+        idxs = np.where(matched, idxs, -1)
+        seps = np.full(chords.shape, np.inf)
+        seps[matched] = 2 * np.arcsin(np.minimum(chords[matched] / 2, 1))
+        return idxs, seps
+
+    def catalog_pixels(self, cat_fn, shape, wcs, subproduct='default',
+                       **kwargs):
+        """Get the pixel positions of the sources of a catalog that fall in a
+        map geometry. The positions are only computed once for each catalog
+        file and geometry, unless the file is modified.
+
+        Parameters
+        ----------
+        cat_fn : str
+            The filename for a source catalog, see read_catalog.
+        shape : tuple of int
+            The shape of the map geometry. Only the last two axes are used.
+        wcs : astropy.wcs.WCS
+            The wcs of the map geometry.
+        subproduct : str, optional
+            Name of catalog subproduct to load raw products from, by default 
+            'default'.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the catalog filename.
+
+        Returns
+        -------
+        (N,) np.ndarray, (2, N) np.ndarray
+            The indices of the sources in the geometry, i.e., of the columns
+            of the output of read_catalog, and their (y, x) pixel positions
+            (see enmap.sky2pix). Read-only and shared between calls.
+
+        Notes
+        -----
+        A source is in the geometry if the pixel nearest to it is, rounding
+        half-pixel positions up as enmap.at does with order=0. Up to 
+        catalog_pixels_cache_size results are cached, the least-recently
+        used being evicted first.
+        """
+        fn = self.get_catalog_fn(cat_fn, subproduct=subproduct, basename=False,
+                                 **kwargs)
+        shape = tuple(shape[-2:])
+        signature = utils.get_file_signature(fn)
+        key = (fn, signature, shape, wcs.to_header_string())
+        
+        try:
+            out = self._catalog_pixels[key]
+            self._catalog_pixels.move_to_end(key)
+            return out
+        except KeyError:
+            pass
+        
+        table = self.get_catalog_table(fn)
+        pix = enmap.sky2pix(
+            shape, wcs, np.radians([table[1], table[0]]), safe=True
+            )
+        
+        # nearest pixel, as in enmap.at with order=0. np.round would round
+        # half to even
+        ipix = np.floor(pix + 0.5)
+        in_geometry = np.all(
+            (ipix >= 0) & (ipix < np.array(shape)[:, None]), axis=0
+            )
+        idxs = np.nonzero(in_geometry)[0]
+        pix = pix[:, idxs]
+        
+        idxs.flags.writeable = False
+        pix.flags.writeable = False
+        self._catalog_pixels[key] = (idxs, pix)
+        while len(self._catalog_pixels) > self.catalog_pixels_cache_size:
+            self._catalog_pixels.popitem(last=False)
+        return idxs, pix
+
+    def _get_catalog_dec_ra(self, cat, subproduct, kwargs):
+        """Get DEC and RA (in radians) of a catalog given as a filename or 
+        as DEC and RA values, see crossmatch_catalogs."""
+        if isinstance(cat, str):
+            fn = self.get_catalog_fn(cat, subproduct=subproduct, 
+                                     basename=False, **kwargs)
+            table = self.get_catalog_table(fn)
+            return np.radians(table[1]), np.radians(table[0])
+        else:
+            dec, ra = np.asarray(cat, dtype=np.float64)
+            return dec, ra
+
+    # async counterparts, see Product.run_async
+    aread_catalog = get_async_method(read_catalog)
+    aread_catalog_columns = get_async_method(read_catalog_columns)
+
+def _ang2vec(dec, ra):
+    """Unit vectors, with shape (..., 3), of points at DEC, RA (in radians)."""
+    dec = np.asarray(dec)
+    ra = np.asarray(ra)
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)],
+                    axis=-1)
+
+_catalog_operators = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
@@ -4,10 +4,12 @@
 ### PRODUCT TEMPLATE in module file hotdogs.py ###
 
 from ..products import Product, get_implements_decorator
+from sofind import utils
     
-import numpy as np
 import os
 
+np = utils.lazy_import('numpy')
+
 # # All products must inherit from Product and implement its productmethods,
 # # which one does by decorating a subclass method, e.g. get_hotdog_fn with
 # # the decorator @implements(Product.get_fn), for each method tagged with the
@@ -35,7 +37,7 @@ class HotDog(Product):
                       basename=False, **kwargs):
         # use subprod_dict to get the filename template for this (sub)product,
         # as well as any other info in the (sub)product configuration file
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
 
         # get the appropriate filename template
         fn_template = subprod_dict['hotdog_file_template']
@@ -1,8 +1,10 @@
-from ..products import Product, get_implements_decorator
+from ..products import Product, get_async_method, get_implements_decorator
+from sofind import utils
 
-from pixell import enmap
+from concurrent.futures import ThreadPoolExecutor
 
-import os
+np = utils.lazy_import('numpy')
+enmap = utils.lazy_import('pixell.enmap')
 
 class Map(Product):
 
@@ -50,30 +52,80 @@ class Map(Product):
             If basename is False and the product, subproduct dirname is not
             known to the datamodel.
         """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
-
         # get the appropriate filename template
         if coadd:
-            fn_template = subprod_dict['coadd_map_file_template']
+            fn_template = 'coadd_map_file_template'
         else:
-            fn_template = subprod_dict['split_map_file_template']
+            fn_template = 'split_map_file_template'
+
+        # the resolver holds the info about the requested array. add kwargs
+        # passed to this method call to format the file template
+        resolver = self.resolver(__name__, subproduct, qid, fn_template)
+        return resolver(
+            basename=basename, split_num=split_num, maptag=maptag, **kwargs
+            )
+
+    def get_map_fns(self, qids, split_nums=0, maptags='map', coadd=False,
+                    subproduct='default', basename=False, **kwargs):
+        """Get the full paths to map products over a grid of qids, split
+        indices and maptags. The qid-dependent part of each filename is only
+        resolved once per qid.
+
+        Parameters
+        ----------
+        qids : str or iterable of str
+            Dataset identification strings.
+        split_nums : int or iterable of int, optional
+            Split indices of the map products, by default 0.
+        maptags : str or iterable of str, optional
+            The types of product to load, by default 'map.' E.g. 'map_srcfree', 
+            'srcs', 'ivar', 'xlink', 'hits', etc.
+        coadd : bool, optional
+            If True, get the corresponding products for the on-disk coadd map,
+            by default False. If True, split_nums is neglected (all entries
+            along the split axis of the output are the same).
+        subproduct : str, optional
+            Name of map subproduct to load raw products from, by default 'default'.
+        basename : bool, optional
+            Only return file basenames, by default False.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the map filenames,
+            common to all filenames.
 
-        # get info about the requested array and add kwargs passed to this
-        # method call. use this info to format the file template
-        fn_kwargs = self.get_qid_kwargs_by_subproduct(__name__, subproduct, qid)
-        fn_kwargs.update(split_num=split_num, maptag=maptag, **kwargs)
-        fn = fn_template.format(**fn_kwargs)
+        Returns
+        -------
+        (nqid, nsplit, nmaptag) np.ndarray of str
+            The filenames (see get_map_fn), where a str or int argument counts
+            as a length-1 axis.
+        """
+        qids = utils.to_tuple(qids)
+        split_nums = utils.to_tuple(split_nums)
+        maptags = utils.to_tuple(maptags)
 
-        if basename:
-            return fn
+        # get the appropriate filename template
+        if coadd:
+            fn_template = 'coadd_map_file_template'
         else:
-            subprod_path = self.get_subproduct_path(__name__, subproduct)
-            return os.path.join(subprod_path, fn)
+            fn_template = 'split_map_file_template'
+
+        fns = []
+        for qid in qids:
+            resolver = self.resolver(__name__, subproduct, qid, fn_template)
+            for split_num in split_nums:
+                for maptag in maptags:
+                    fns.append(resolver(
+                        basename=basename, split_num=split_num, maptag=maptag,
+                        **kwargs
+                        ))
+
+        return np.array(fns, dtype=str).reshape(
+            len(qids), len(split_nums), len(maptags)
+            )
 
     @implements(Product.read_product)
     def read_map(self, qid, split_num=0, coadd=False, maptag='map',
-                 subproduct='default', read_map_kwargs=None,
-                 **kwargs):
+                 subproduct='default', read_map_kwargs=None, mmap=False,
+                 box=None, pixbox=None, comps=None, **kwargs):
         """Read a map product from disk.
 
         Parameters
@@ -95,6 +147,24 @@ class Map(Product):
             Name of map subproduct to load raw products from, by default 'default'.
         read_map_kwargs : dict, optional
             Any keyword arguments to pass to enmap.read_map.
+        mmap : bool, optional
+            If True, return a read-only map backed by a memory map of the file
+            rather than reading it into memory, by default False. Only the 
+            parts of the file backing the parts of the map that are accessed
+            (e.g. a slice) are read from disk. Requires an uncompressed, 
+            unscaled fits image, and read_map_kwargs may only contain 'hdu'
+            (besides region-selecting keyword arguments). If a region is 
+            selected, it is instead returned as an in-memory copy.
+        box : (2, 2) array-like, optional
+            Only read the region of the map inside the [[fromy, fromx], [toy,
+            tox]] coordinate box (in radians), by default None. Only the rows 
+            of the box are read from disk.
+        pixbox : (2, 2) array-like, optional
+            Like box, but in pixels, by default None.
+        comps : int or slice, or tuple of int or slice, optional
+            Only read these indices of the leading non-pixel axes of the map,
+            e.g. 0 for only the T component of a (3, ny, nx) map, by default 
+            None. Only the selected components are read from disk.
         kwargs : dict, optional
             Any additional keyword arguments used to format the map filename.
 
@@ -108,7 +178,112 @@ class Map(Product):
             subproduct=subproduct, basename=False, **kwargs
             )
         
-        if read_map_kwargs is None:
-            read_map_kwargs = {}
+        return self._read_map(
+            fn, read_map_kwargs=read_map_kwargs, mmap=mmap, box=box,
+            pixbox=pixbox, comps=comps
+            )
+
+    def read_maps(self, qids, split_nums=0, coadd=False, maptag='map',
+                  subproduct='default', out=None, max_workers=None, **kwargs):
+        """Read map products over a grid of qids and split indices into one
+        contiguous array. The geometries of the maps are read from their 
+        headers first, so the output can be allocated up front, and then the
+        maps are read concurrently, each directly into its slot of the output.
+
+        Parameters
+        ----------
+        qids : str or iterable of str
+            Dataset identification strings.
+        split_nums : int or iterable of int, optional
+            Split indices of the map products, by default 0.
+        coadd : bool, optional
+            If True, load the corresponding products for the on-disk coadd map,
+            by default False. If True, split_nums is neglected (all entries
+            along the split axis of the output are the same, and the coadd is
+            only read once).
+        maptag : str, optional
+            The type of product to load, by default 'map.' E.g. 'map_srcfree', 
+            'srcs', 'ivar', 'xlink', 'hits', etc.
+        subproduct : str, optional
+            Name of map subproduct to load raw products from, by default 'default'.
+        out : (nqid, nsplit, ...) np.ndarray, optional
+            Array to read the maps into, by default None, in which case a new
+            array is allocated with the dtype of the first map.
+        max_workers : int, optional
+            Maximum number of threads reading maps at once, by default None
+            (see concurrent.futures.ThreadPoolExecutor).
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the map filenames,
+            common to all filenames.
+
+        Returns
+        -------
+        (nqid, nsplit, ...) enmap.ndmap
+            The requested maps, where a str or int argument counts as a 
+            length-1 axis. If out is supplied, a view of out.
+
+        Raises
+        ------
+        ValueError
+            If the maps do not all have the same geometry, or out does not
+            have the right shape.
+
+        Notes
+        -----
+        Uncompressed fits maps are copied directly from a memory map of the
+        file into the output, so no intermediate copy of any map is made. If 
+        the read cache is enabled (see enable_read_cache), maps are read 
+        through it instead.
+        """
+        fns = self.get_map_fns(
+            qids, split_nums=split_nums, maptags=maptag, coadd=coadd,
+            subproduct=subproduct, **kwargs
+            )[..., 0]
+        
+        # e.g. if coadd, all slots along the split axis share a file, so read
+        # each file once and copy it into its other slots
+        idxs_by_fn = {}
+        for idx in np.ndindex(fns.shape):
+            idxs_by_fn.setdefault(fns[idx], []).append(idx)
+
+        # get geometry from the headers, which must all agree
+        geometries = [enmap.read_map_geometry(fn) for fn in idxs_by_fn]
+        shape, wcs = geometries[0]
+        for fn, (_shape, _wcs) in zip(idxs_by_fn, geometries):
+            if tuple(_shape) != tuple(shape) or not enmap.wcsutils.equal(_wcs, wcs):
+                raise ValueError(
+                    f'Geometry of {fn} does not match geometry of {fns.flat[0]}'
+                    )
+        oshape = fns.shape + tuple(shape)
+
+        if out is None:
+            dtype = enmap.read_map_dtype(fns.flat[0])
+            out = enmap.empty(oshape, wcs, dtype=dtype)
+        elif out.shape != oshape:
+            raise ValueError(f'Expected out shape {oshape}, got {out.shape}')
+        else:
+            out = enmap.ndmap(out, wcs)
+
+        def read_into(fn):
+            idx, *dup_idxs = idxs_by_fn[fn]
+            if self._read_cache is None:
+                try:
+                    np.copyto(out[idx], utils.read_map_mmap(fn))
+                except (ValueError, OSError):
+                    # e.g. compressed or hdf maps
+                    out[idx] = self._read_map(fn)
+            else:
+                out[idx] = self._read_map(fn)
+            for dup_idx in dup_idxs:
+                np.copyto(out[dup_idx], out[idx])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # consume results to raise any exception
+            for _ in executor.map(read_into, idxs_by_fn):
+                pass
+
+        return out
 
-        return enmap.read_map(fn, **read_map_kwargs)
\ No newline at end of file
+    # async counterparts, see Product.run_async
+    aread_map = get_async_method(read_map)
+    aread_maps = get_async_method(read_maps)
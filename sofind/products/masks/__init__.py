@@ -1,6 +1,4 @@
-from ..products import Product, get_implements_decorator
-
-from pixell import enmap
+from ..products import Product, get_async_method, get_implements_decorator
 
 import os
 
@@ -48,7 +46,7 @@ class Mask(Product):
             If basename is False and the product, subproduct dirname is not
             known to the datamodel.
         """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
 
         if mask_fn is None:
             mask_fn = subprod_dict[mask_type]['mask_fn'].format(**kwargs)
@@ -61,7 +59,8 @@ class Mask(Product):
 
     @implements(Product.read_product)
     def read_mask(self, mask_fn=None, mask_type=None, subproduct='default',
-                  read_map_kwargs=None, **kwargs):
+                  read_map_kwargs=None, mmap=False, box=None, pixbox=None,
+                  comps=None, **kwargs):
         """Read a mask product from disk.
 
         Parameters
@@ -75,6 +74,24 @@ class Mask(Product):
             'default'.
         read_map_kwargs : dict, optional
             Any keyword arguments to pass to enmap.read_map.
+        mmap : bool, optional
+            If True, return a read-only map backed by a memory map of the file
+            rather than reading it into memory, by default False. Only the 
+            parts of the file backing the parts of the map that are accessed
+            (e.g. a slice) are read from disk. Requires an uncompressed, 
+            unscaled fits image, and read_map_kwargs may only contain 'hdu'
+            (besides region-selecting keyword arguments). If a region is 
+            selected, it is instead returned as an in-memory copy.
+        box : (2, 2) array-like, optional
+            Only read the region of the map inside the [[fromy, fromx], [toy,
+            tox]] coordinate box (in radians), by default None. Only the rows 
+            of the box are read from disk.
+        pixbox : (2, 2) array-like, optional
+            Like box, but in pixels, by default None.
+        comps : int or slice, or tuple of int or slice, optional
+            Only read these indices of the leading non-pixel axes of the map,
+            e.g. 0 for only the T component of a (3, ny, nx) map, by default 
+            None. Only the selected components are read from disk.
         kwargs : dict, optional
             Any additional keyword arguments used to format the mask filename.
 
@@ -86,7 +103,10 @@ class Mask(Product):
         fn = self.get_mask_fn(mask_fn=mask_fn, mask_type=mask_type, 
                               subproduct=subproduct, basename=False, **kwargs)
         
-        if read_map_kwargs is None:
-            read_map_kwargs = {}
-        
-        return enmap.read_map(fn, **read_map_kwargs)
\ No newline at end of file
+        return self._read_map(
+            fn, read_map_kwargs=read_map_kwargs, mmap=mmap, box=box,
+            pixbox=pixbox, comps=comps
+            )
+
+    # async counterparts, see Product.run_async
+    aread_mask = get_async_method(read_mask)
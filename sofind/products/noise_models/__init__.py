@@ -1,7 +1,13 @@
-from ..products import Product, get_implements_decorator
+from ..products import (
+    Product, FilenameParser, get_async_method, get_implements_decorator
+    )
+from sofind import utils
 
+import functools
 import os
 
+np = utils.lazy_import('numpy')
+
 def _defer_mnms_load(param_dict):
     """The purpose of this function is to defer the load of `mnms.io` module
     when loading the `sofind.NoiseModel` to avoid circular installation-time
@@ -42,6 +48,21 @@ class NoiseModel(Product):
     def __init__(self, **kwargs):
         self.set_attrs(__name__, kwargs)
         super().__init__(**kwargs)
+
+        # memoized (mnms ioobj, formatted params) per (subproduct, noise 
+        # model name), and filename keyword arguments per (subproduct, noise
+        # model name, qids, alm), with the keys callers may not override.
+        # these are not bounded: they grow with the
+        # noise models in the configs and the qid combinations requested,
+        # and are small compared to the products they name
+        self._noise_models = {}
+        self._noise_fn_kwargs = {}
+
+        # the (subproduct, noise model name) and (subproduct, parent product,
+        # parent subproduct) combinations already checked
+        self._checked_noise_models = set()
+        self._checked_noise_parents = set()
+
         self.check_product_config_internal_consistency(__name__)
 
     @implements(Product.get_fn)
@@ -67,7 +88,8 @@ class NoiseModel(Product):
         basename : bool, optional
             Only return file basename, by default False.
         kwargs : dict, optional
-            Any additional keyword arguments used to format the filename.
+            Any additional keyword arguments used to format the filename. 
+            These take precedence over the noise model parameters.
 
         Returns
         -------
@@ -79,13 +101,265 @@ class NoiseModel(Product):
         ------
         TypeError
             If basename is False and the product, subproduct dirname is not
-            known to the datamodel.
+            known to the datamodel, or if any keyword argument is 
+            config_name, noise_model_name, qids, qid_names, alm_str, or a 
+            keyword argument shared by the qids.
+
+        ValueError
+            If 'which' is not 'models' or 'sims'.
+        """
+        fn_template, fn_ext, fn_kwargs = self._get_noise_fn_template(
+            noise_model_name, *qids, which=which, subproduct=subproduct,
+            alm=alm, **kwargs
+            )
+
+        fn = fn_template.format(**fn_kwargs)
+        if not fn.endswith(fn_ext):
+            fn += fn_ext
+
+        if basename:
+            return fn
+        else:
+            subprod_path = self.get_subproduct_path(__name__, subproduct)
+            return os.path.join(subprod_path, which, fn)
+
+    def get_noise_fns(self, noise_model_name, *qids, split_nums=0, sim_nums=0,
+                      which='sims', subproduct='default', alm=False,
+                      basename=False, **kwargs):
+        """Get the full paths to mnms noise model products over a grid of split
+        indices and sim indices. The noise model, and the qid-dependent part of
+        each filename, are only resolved once.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        qids : str
+            One or more dataset identification strings, which together label 
+            each product.
+        split_nums : int or iterable of int, optional
+            Split indices of the products, by default 0.
+        sim_nums : int or iterable of int, optional
+            Sim indices of the products, by default 0. If 'models', sim_nums
+            is neglected (all entries along the sim axis of the output are the
+            same).
+        which : str, optional
+            Whether to load from the available 'models' or 'sims', by default
+            'sims'.
+        subproduct : str, optional
+            Name of noise subproduct to load products from, by default
+            'default'.
+        alm : bool, optional
+            If 'sims', whether the product lives in map-space or alm-space, by
+            default False. Used for tagging the filename with 'alm' or 'map'.
+        basename : bool, optional
+            Only return file basenames, by default False.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the filenames,
+            common to all filenames.
+
+        Returns
+        -------
+        (nsplit, nsim) np.ndarray of str
+            The filenames (see get_noise_fn), where an int argument counts as
+            a length-1 axis.
+
+        Raises
+        ------
+        TypeError
+            If any keyword argument is config_name, noise_model_name, qids,
+            qid_names, alm_str, or a keyword argument shared by the qids.
+
+        ValueError
+            If 'which' is not 'models' or 'sims'.
+        """
+        split_nums = utils.to_tuple(split_nums)
+        sim_nums = utils.to_tuple(sim_nums)
+
+        fn_template, fn_ext, fn_kwargs = self._get_noise_fn_template(
+            noise_model_name, *qids, which=which, subproduct=subproduct,
+            alm=alm, **kwargs
+            )
+        
+        if basename:
+            dirname = ''
+        else:
+            subprod_path = self.get_subproduct_path(__name__, subproduct)
+            dirname = os.path.join(subprod_path, which)
+
+        fns = []
+        for split_num in split_nums:
+            for sim_num in sim_nums:
+                fn_kwargs.update(split_num=split_num, sim_num=sim_num)
+                fn = fn_template.format(**fn_kwargs)
+                if not fn.endswith(fn_ext):
+                    fn += fn_ext
+                fns.append(os.path.join(dirname, fn))
+
+        return np.array(fns, dtype=str).reshape(len(split_nums), len(sim_nums))
+
+    def _get_noise_fn_template(self, noise_model_name, *qids, which='sims',
+                               subproduct='default', alm=False, **kwargs):
+        """Get the filename template, filename extension and keyword 
+        arguments with which to format filenames of an mnms noise model product.
+        See get_noise_fn for the parameters.
+
+        Returns
+        -------
+        str, str, dict
+            The template, the extension (appended to the formatted template if
+            it does not already end with it), and the keyword arguments. The
+            keyword arguments are a new dict which the caller may update.
+
+        Raises
+        ------
+        TypeError
+            If any keyword argument is config_name, noise_model_name, qids,
+            qid_names, alm_str, or a keyword argument shared by the qids.
 
         ValueError
             If 'which' is not 'models' or 'sims'.
         """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
-        param_dict = subprod_dict[noise_model_name] # param_dict is a deepcopy :)
+        key = (subproduct, noise_model_name, qids, alm)
+        try:
+            fn_kwargs, fixed_keys = self._noise_fn_kwargs[key]
+        except KeyError:
+            fn_kwargs = self._get_noise_model_params(noise_model_name, subproduct)
+            equal_qid_kwargs = self.get_equal_qid_kwargs_by_subproduct(
+                __name__, subproduct, *qids
+                )
+            fn_kwargs.update(
+                qids='_'.join(qids),
+                qid_names=self.get_qid_names_by_subproduct(
+                    __name__, subproduct, *qids,
+                    qid_names_template=fn_kwargs['qid_names_template']
+                ),
+                **equal_qid_kwargs,
+                alm_str='alm' if alm else 'map'
+            )
+            fixed_keys = frozenset(
+                ['config_name', 'noise_model_name', 'qids', 'qid_names', 
+                 'alm_str', *equal_qid_kwargs]
+                )
+            self._noise_fn_kwargs[key] = (fn_kwargs, fixed_keys)
+
+        # kwargs override the noise model parameters, but not the keywords
+        # set by sofind itself
+        duplicates = fixed_keys & kwargs.keys()
+        if duplicates:
+            raise TypeError(
+                f'Got multiple values for keyword arguments {sorted(duplicates)} '
+                f'of noise model {noise_model_name}'
+                )
+
+        model_file_template = fn_kwargs['model_file_template']
+        sim_file_template = fn_kwargs['sim_file_template']
+        param_dict = {**fn_kwargs, **kwargs}
+
+        # only sims or models supported
+        if which == 'sims':
+            return sim_file_template, '.fits', param_dict
+        elif which == 'models':
+            return model_file_template, '.hdf5', param_dict
+        else:
+            raise ValueError(f"which must be 'sims' or 'models', got {which}")
+
+    def _get_noise_model_params(self, noise_model_name, subproduct='default'):
+        """Get the formatted parameters of an mnms noise model, which do not
+        depend on the qids of a product. See _get_noise_model.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        subproduct : str, optional
+            Name of noise subproduct to load products from, by default
+            'default'.
+
+        Returns
+        -------
+        dict
+            The mnms param_formatted_dict of the noise model, updated with the
+            config_name and noise_model_name. This is a new dict which the 
+            caller may update.
+        """
+        return dict(self._get_noise_model(noise_model_name, subproduct)[1])
+
+    def _get_noise_model(self, noise_model_name, subproduct='default'):
+        """Get the mnms io object of a noise model and its formatted 
+        parameters, after checking the noise model config (see 
+        check_noise_model_config). Both are built once per noise model and
+        subproduct, and then memoized.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        subproduct : str, optional
+            Name of noise subproduct to load products from, by default
+            'default'.
+
+        Returns
+        -------
+        io.BaseIO subclass instance, dict
+            The io object, and its param_formatted_dict updated with the 
+            config_name and noise_model_name. Neither may be modified.
+        """
+        key = (subproduct, noise_model_name)
+        try:
+            return self._noise_models[key]
+        except KeyError:
+            pass
+
+        self.check_noise_model_config(noise_model_name, subproduct)
+        
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
+        param_dict = utils.thaw(subprod_dict[noise_model_name]) # param_dict is a deepcopy :)
+
+        ioobj = _defer_mnms_load(param_dict)
+        
+        # copy in case ioobj returns its own dict
+        param_dict = dict(ioobj.param_formatted_dict)
+        param_dict.update(
+            config_name=os.path.splitext(
+                self.get_subproduct_config(__name__, subproduct)
+                )[0],
+            noise_model_name=noise_model_name
+        )
+
+        self._noise_models[key] = (ioobj, param_dict)
+        return ioobj, param_dict
+
+    def check_noise_model_config(self, noise_model_name, subproduct='default'):
+        """Check that a noise model config is compatible with this data model
+        and with its parent maps subproduct. The config is static, so each 
+        noise model is only checked once (on first use), and each pair of 
+        noise subproduct and parent subproduct only once.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        subproduct : str, optional
+            Name of noise subproduct, by default 'default'.
+
+        Raises
+        ------
+        AssertionError
+            If the data_model_name or subproduct of the noise model config do
+            not match this data model or the subproduct, or the subproduct 
+            config is not a subset of the parent subproduct config (see
+            check_subproduct_config_is_subset).
+        """
+        if (subproduct, noise_model_name) in self._checked_noise_models:
+            return
+
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
+        param_dict = subprod_dict[noise_model_name]
 
         # check compatibility with data model
         # allow data_model_name to have periods before .yaml
@@ -101,59 +375,137 @@ class NoiseModel(Product):
         
         # check compatibility with parent product/subproduct (e.g., maps).
         parent_product, parent_subproduct = param_dict['maps_product'], param_dict['maps_subproduct']
-        parent_subprod_dict = self.get_subproduct_dict(
-            parent_product, parent_subproduct
-            )
-        self.check_subproduct_config_is_subset(
-            __name__, subproduct, subprod_dict, parent_product,
-            parent_subproduct, parent_subprod_dict
-            )
+        parent_key = (subproduct, parent_product, parent_subproduct)
+        if parent_key not in self._checked_noise_parents:
+            parent_subprod_dict = self.get_subproduct_dict(
+                parent_product, parent_subproduct, copy=False
+                )
+            self.check_subproduct_config_is_subset(
+                __name__, subproduct, subprod_dict, parent_product,
+                parent_subproduct, parent_subprod_dict
+                )
+            self._checked_noise_parents.add(parent_key)
 
-        ioobj = _defer_mnms_load(param_dict)
-        
-        # don't worry about updating param_dict because ioobj only in this scope
-        param_dict = ioobj.param_formatted_dict 
-        model_file_template = param_dict['model_file_template']
-        sim_file_template = param_dict['sim_file_template']
-        qid_names_template = param_dict['qid_names_template']
-        param_dict.update(
-            config_name=os.path.splitext(
-                self.get_subproduct_config(__name__, subproduct)
-                )[0],
-            noise_model_name=noise_model_name,
-            qids='_'.join(qids),
-            qid_names=self.get_qid_names_by_subproduct(
-                __name__, subproduct, *qids, qid_names_template=qid_names_template
-            ),
-            **self.get_equal_qid_kwargs_by_subproduct(
-                __name__, subproduct, *qids
-            ),
-            alm_str='alm' if alm else 'map',
-            **kwargs
-        )
+        self._checked_noise_models.add((subproduct, noise_model_name))
+
+    def parse_noise_fn(self, noise_model_name, fn, which='sims',
+                       subproduct='default'):
+        """Parse the filename of an mnms noise model product back into the
+        keyword arguments that produced it. The inverse of get_noise_fn.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        fn : str
+            The filename, either a basename or a full path.
+        which : str, optional
+            Whether fn is one of the available 'models' or 'sims', by default
+            'sims'.
+        subproduct : str, optional
+            Name of noise subproduct of fn, by default 'default'.
+
+        Returns
+        -------
+        dict or None
+            If fn matches the filename template, the keyword arguments that
+            format the template to fn, other than the noise model parameters.
+            For instance, for sims, typically 'qid_names', 'split_num', 
+            'sim_num', and 'alm_str', as well as any qid keywords in the
+            template. Values are ints if formatting that int gives back the 
+            same string, otherwise strs. If fn does not match, None.
+
+        Raises
+        ------
+        ValueError
+            If 'which' is not 'models' or 'sims'.
+        """
+        parser = self._get_noise_fn_parser(noise_model_name, which, subproduct)
+        res = parser.parse(fn)
+        return None if res is None else res[0]
+
+    def parse_noise_fns(self, noise_model_name, fns=None, which='sims',
+                        subproduct='default'):
+        """Parse many filenames of mnms noise model products, e.g. a directory
+        listing, in a single pass. See parse_noise_fn.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        fns : iterable of str, optional
+            The filenames, either basenames or full paths. By default, the 
+            names of the files in the 'which' directory of the subproduct on
+            this system.
+        which : str, optional
+            Whether fns are of the available 'models' or 'sims', by default
+            'sims'.
+        subproduct : str, optional
+            Name of noise subproduct of fns, by default 'default'.
+
+        Returns
+        -------
+        dict
+            A mapping from each filename to its parse_noise_fn result (None
+            if the filename does not match the template).
+
+        Raises
+        ------
+        ValueError
+            If 'which' is not 'models' or 'sims'.
+        """
+        parser = self._get_noise_fn_parser(noise_model_name, which, subproduct)
+        if fns is None:
+            subprod_path = self.get_subproduct_path(__name__, subproduct)
+            with os.scandir(os.path.join(subprod_path, which)) as it:
+                fns = [entry.name for entry in it if entry.is_file()]
+        out = {}
+        for fn in fns:
+            res = parser.parse(fn)
+            out[fn] = None if res is None else res[0]
+        return out
+
+    def _get_noise_fn_parser(self, noise_model_name, which, subproduct):
+        """Get the (cached) FilenameParser for filenames of an mnms noise
+        model product, in which the noise model parameters are static."""
+        key = (__name__, subproduct, noise_model_name, which)
+        if key in self._fn_parsers:
+            return self._fn_parsers[key]
+
+        param_dict = self._get_noise_model_params(noise_model_name, subproduct)
 
         # only sims or models supported
         if which == 'sims':
-            fn = sim_file_template.format(**param_dict)
-            if not fn.endswith('.fits'): 
-                fn += '.fits'
+            fn_template, fn_ext = param_dict['sim_file_template'], '.fits'
         elif which == 'models':
-            fn = model_file_template.format(**param_dict)
-            if not fn.endswith('.hdf5'):
-                fn += '.hdf5'        
+            fn_template, fn_ext = param_dict['model_file_template'], '.hdf5'
         else:
             raise ValueError(f"which must be 'sims' or 'models', got {which}")
+        if not fn_template.endswith(fn_ext):
+            fn_template += fn_ext
 
-        if basename:
-            return fn
-        else:
-            subprod_path = self.get_subproduct_path(__name__, subproduct)
-            return os.path.join(subprod_path, which, fn)
+        # qid keywords override noise model parameters in get_noise_fn, so 
+        # they cannot be static
+        subprod_dict = self.get_subproduct_dict(__name__, subproduct, copy=False)
+        allowed_qids = subprod_dict['allowed_qids']
+        if allowed_qids is None:
+            allowed_qids = []
+        elif allowed_qids == 'all':
+            allowed_qids = self.qids
+        for qid in allowed_qids:
+            for k in self.get_qid_kwargs_by_subproduct(__name__, subproduct, qid):
+                param_dict.pop(k, None)
+
+        parser = FilenameParser(fn_template, static_kwargs=param_dict)
+        self._fn_parsers[key] = parser
+        return parser
 
     @implements(Product.read_product)
     def read_noise(self, noise_model_name, *qids, which='sims',
                    subproduct='default', alm=False, read_noise_kwargs=None,
-                   **kwargs):
+                   box=None, pixbox=None, comps=None, **kwargs):
         """Read an mnms noise model product from disk.
 
         Parameters
@@ -173,6 +525,16 @@ class NoiseModel(Product):
         read_noise_kwargs : dict, optional
             Any keyword arguments to pass to the noise model's 'read_sim' or
             'read_model' methods (depending on the value of 'which').
+        box : (2, 2) array-like, optional
+            Only read the region of a map-space sim inside the [[fromy, fromx],
+            [toy, tox]] coordinate box (in radians), by default None. Only the
+            rows of the box are read from disk.
+        pixbox : (2, 2) array-like, optional
+            Like box, but in pixels, by default None.
+        comps : int or slice, or tuple of int or slice, optional
+            Only read these indices of the leading non-pixel axes of a 
+            map-space sim, by default None. Only the selected components are
+            read from disk.
         kwargs : dict, optional
             Any additional keyword arguments used to format the filename.
 
@@ -186,24 +548,126 @@ class NoiseModel(Product):
         ------
         ValueError
             If 'which' is not 'models' or 'sims'.
-        """
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
-        param_dict = subprod_dict[noise_model_name] # param_dict is a deepcopy :)
 
-        ioobj = _defer_mnms_load(param_dict)
-    
+        ValueError
+            If any of box, pixbox or comps is supplied, but the product is not
+            a map-space sim, or read_noise_kwargs are also supplied.
+
+        Notes
+        -----
+        If any of box, pixbox or comps is supplied, the sim is read directly
+        with enmap (see utils.read_map_region), rather than by the noise 
+        model's 'read_sim' method.
+        """
         fn = self.get_noise_fn(
             noise_model_name, *qids, which=which, subproduct=subproduct,
             alm=alm, basename=False, **kwargs
             )
+        read_func = self._get_noise_read_func(
+            noise_model_name, which=which, subproduct=subproduct, alm=alm,
+            read_noise_kwargs=read_noise_kwargs, box=box, pixbox=pixbox,
+            comps=comps
+            )
+        return read_func(fn)
+
+    def iter_noise_sims(self, noise_model_name, *qids, sim_nums=0, split_num=0,
+                        subproduct='default', alm=False, read_noise_kwargs=None,
+                        box=None, pixbox=None, comps=None, prefetch=1, 
+                        **kwargs):
+        """Iterate over mnms noise sims, reading the next sims from disk on
+        background threads while the caller processes the current one.
+
+        Parameters
+        ----------
+        noise_model_name : str
+            The string name of this NoiseModel instance. This is the header
+            of the block in the config storing this NoiseModel's parameters.
+        qids : str
+            One or more dataset identification strings, which together label 
+            each sim.
+        sim_nums : int or iterable of int, optional
+            Sim indices of the sims, in order, by default 0.
+        split_num : int, optional
+            Split index of the sims, by default 0.
+        subproduct : str, optional
+            Name of noise subproduct to load products from, by default
+            'default'.
+        alm : bool, optional
+            Whether the sims live in map-space or alm-space, by default False.
+        read_noise_kwargs : dict, optional
+            Any keyword arguments to pass to the noise model's 'read_sim' 
+            method.
+        box, pixbox, comps : optional
+            Only read part of each map-space sim, see read_noise.
+        prefetch : int, optional
+            Number of sims to read ahead of the one being processed, by 
+            default 1. If 0, each sim is read when it is requested.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the filenames.
+
+        Yields
+        ------
+        enmap.ndmap or np.ndarray
+            The sims (see read_noise), in the order of sim_nums.
+
+        Notes
+        -----
+        All filenames are resolved before the first sim is read. At most
+        prefetch + 1 sims are held at once, plus any the caller keeps: in a
+        plain for loop, that includes the previous sim until the loop variable
+        is rebound, so up to prefetch + 2 (see utils.iter_prefetch). If the
+        loop is abandoned, sims not yet started are not read, and no threads
+        are left behind.
+
+        Examples
+        --------
+        >>> for sim in dm.iter_noise_sims('tile_cmbmask', 'pa5a', 'pa5b', 
+        ...                               sim_nums=range(100), prefetch=2):
+        ...     process(sim)
+        """
+        fns = self.get_noise_fns(
+            noise_model_name, *qids, split_nums=split_num, sim_nums=sim_nums,
+            which='sims', subproduct=subproduct, alm=alm, basename=False,
+            **kwargs
+            )[0]
+        read_func = self._get_noise_read_func(
+            noise_model_name, which='sims', subproduct=subproduct, alm=alm,
+            read_noise_kwargs=read_noise_kwargs, box=box, pixbox=pixbox,
+            comps=comps
+            )
+        return utils.iter_prefetch(read_func, fns, prefetch=prefetch)
+
+    def _get_noise_read_func(self, noise_model_name, which='sims', 
+                             subproduct='default', alm=False,
+                             read_noise_kwargs=None, box=None, pixbox=None,
+                             comps=None):
+        """Get a function reading an mnms noise model product given its 
+        filename. See read_noise for the parameters."""
+        if (box, pixbox, comps) != (None, None, None):
+            if which != 'sims' or alm:
+                raise ValueError(
+                    'box, pixbox and comps only supported for map-space sims'
+                    )
+            if read_noise_kwargs:
+                raise ValueError(
+                    'read_noise_kwargs not supported with box, pixbox or comps'
+                    )
+            return functools.partial(
+                self._read_map, box=box, pixbox=pixbox, comps=comps
+                )
+
+        ioobj = self._get_noise_model(noise_model_name, subproduct)[0]
         
         if read_noise_kwargs is None:
             read_noise_kwargs = {}
 
         # only sims or models supported
         if which == 'sims':
-            return ioobj.read_sim(fn, alm=alm, **read_noise_kwargs) 
+            return functools.partial(ioobj.read_sim, alm=alm, **read_noise_kwargs)
         elif which == 'models':
-            return ioobj.read_model(fn, **read_noise_kwargs)
+            return functools.partial(ioobj.read_model, **read_noise_kwargs)
         else:
-            raise ValueError(f"which must be 'sims' or 'models', got {which}")
\ No newline at end of file
+            raise ValueError(f"which must be 'sims' or 'models', got {which}")
+
+    # async counterparts, see Product.run_async
+    aread_noise = get_async_method(read_noise)
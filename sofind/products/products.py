@@ -3,9 +3,16 @@
 
 from sofind import utils, systems
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import functools
 import os
-from copy import deepcopy
+import re
+import string
+import threading
+import weakref
+
+np = utils.lazy_import('numpy')
 
 # This is only for use in decorating Product methods, but needs to be 
 # defined outside the Product class scope
@@ -60,6 +67,310 @@ def get_implements_decorator(implementedmethods_list):
         return decorator
     return implements
 
+def get_async_method(method):
+    """Make an async counterpart of a Product method, which runs the method on
+    the datamodel's async executor (see Product.set_async_max_workers) without
+    blocking the event loop. For use inside the declaration of each Product
+    subclass, e.g.:
+
+        aread_map = get_async_method(read_map)
+
+    Parameters
+    ----------
+    method : function
+        The Product method.
+
+    Returns
+    -------
+    coroutine function
+        The async method, with the same signature as method.
+    """
+    @functools.wraps(method)
+    async def amethod(self, *args, **kwargs):
+        return await self.run_async(method, self, *args, **kwargs)
+
+    amethod.__name__ = f'a{method.__name__}'
+    amethod.__qualname__ = amethod.__qualname__.rsplit('.', 1)[0] + f'.a{method.__name__}'
+    amethod.__doc__ = (
+        f'Async counterpart of {method.__name__}, run on the async executor '
+        f'(see Product.run_async). From {method.__name__}:\n\n        '
+        f'{method.__doc__}'
+        )
+    return amethod
+
+
+class FilenameResolver:
+
+    def __init__(self, datamodel, product, subproduct, qid, template):
+        """Formats filenames from one filename template of a subproduct, for
+        one qid. Everything that does not depend on the per-call keyword
+        arguments (the allowed qid check, the qid keywords, the subproduct
+        directory and the template fields) is done once, when the resolver is
+        constructed, or on first use.
+
+        Parameters
+        ----------
+        datamodel : Product
+            The datamodel holding the subproduct.
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        qid : str or None
+            Dataset identification string. If None, the template is only
+            populated by the per-call keyword arguments.
+        template : str
+            The key of the filename template in the subproduct config, e.g.
+            'split_map_file_template'.
+
+        Notes
+        -----
+        Users should get resolvers from Product.resolver, which caches them.
+        """
+        self._datamodel = datamodel
+        self.product = utils.get_producttag(product)
+        self.subproduct = subproduct
+        self.qid = qid
+
+        subproduct_dict = datamodel.get_subproduct_dict(self.product, subproduct, copy=False)
+        self.template = subproduct_dict[template]
+
+        if qid is None:
+            self._qid_kwargs = {}
+        else:
+            self._qid_kwargs = datamodel.get_qid_kwargs_by_subproduct(
+                self.product, subproduct, qid
+                )
+
+        fields = set()
+        for _, field_name, _, _ in string.Formatter().parse(self.template):
+            if field_name:
+                fields.add(re.match(r'[^.\[]*', field_name).group())
+        self.fields = frozenset(fields)
+
+        # the directory depends on the SOFIND_SYSTEM, which could change
+        self._path = None
+        self._path_system = None
+
+    @property
+    def qid_kwargs(self):
+        """The qid keywords used to populate the template."""
+        return utils.FrozenDict(self._qid_kwargs)
+
+    @property
+    def path(self):
+        """The system path to the directory holding the files of the
+        subproduct (see Product.get_subproduct_path)."""
+        system = os.environ.get('SOFIND_SYSTEM')
+        if self._path is None or system != self._path_system:
+            self._path = self._datamodel.get_subproduct_path(
+                self.product, self.subproduct
+                )
+            self._path_system = system
+        return self._path
+
+    def __call__(self, basename=False, **kwargs):
+        """Get a filename.
+
+        Parameters
+        ----------
+        basename : bool, optional
+            Only return file basename, by default False.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the filename. These
+            take precedence over the qid keywords, as in the get_*_fn methods
+            of each product, e.g. freq='f220' formats a pa5a filename with 
+            f220 instead of f090.
+
+        Returns
+        -------
+        str
+            If basename, basename of requested product. Else, full path to
+            requested product.
+        """
+        fn = self.template.format_map({**self._qid_kwargs, **kwargs})
+        if basename:
+            return fn
+        else:
+            return os.path.join(self.path, fn)
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(product={self.product!r}, '
+                f'subproduct={self.subproduct!r}, qid={self.qid!r}, '
+                f'template={self.template!r})')
+
+
+# the FilenameResolver cache of each datamodel. the resolvers only hold a weak
+# reference to their datamodel, so a datamodel and its cached resolvers are 
+# freed as soon as the datamodel is no longer used
+_resolver_caches = weakref.WeakKeyDictionary()
+_resolver_caches_lock = threading.Lock()
+
+def _get_resolver_cache(datamodel):
+    """Get the function returning cached FilenameResolvers of a datamodel, 
+    given (product, subproduct, qid, template). See Product.resolver."""
+    try:
+        return _resolver_caches[datamodel]
+    except KeyError:
+        pass
+
+    with _resolver_caches_lock:
+        try:
+            return _resolver_caches[datamodel]
+        except KeyError:
+            get_resolver = functools.lru_cache(
+                maxsize=datamodel.resolver_cache_size
+                )(functools.partial(FilenameResolver, weakref.proxy(datamodel)))
+            _resolver_caches[datamodel] = get_resolver
+            return get_resolver
+
+
+class FilenameParser:
+
+    def __init__(self, template, static_kwargs=None, qid_kwargs=None):
+        """Parses filenames formatted from a template back into the keyword
+        arguments that produced them, by compiling the template into a regular
+        expression.
+
+        Parameters
+        ----------
+        template : str
+            The filename template, e.g. '{array}_{freq}_set{split_num}.fits'.
+        static_kwargs : dict, optional
+            Keyword arguments whose values are known in advance. These fields
+            are matched literally and are not returned by parse.
+        qid_kwargs : dict, optional
+            A mapping from candidate qids to their keyword arguments (see
+            Product.get_qid_kwargs_by_subproduct). Fields of the template set
+            by the keyword arguments of every candidate qid are 'qid fields':
+            they may only match one of the candidate values, and are used to 
+            identify the qid(s) of a filename.
+
+        Raises
+        ------
+        ValueError
+            If the template has positional fields, or fields accessing
+            attributes or items of a keyword argument.
+        """
+        if static_kwargs is None:
+            static_kwargs = {}
+        if qid_kwargs is None:
+            qid_kwargs = {}
+        self.template = template
+
+        parsed_template = list(string.Formatter().parse(template))
+        for _, field_name, _, _ in parsed_template:
+            if field_name is not None and not field_name.isidentifier():
+                raise ValueError(
+                    f'Cannot parse field {{{field_name}}} of template {template}'
+                    )
+
+        self.qid_fields = tuple(dict.fromkeys(
+            field_name for _, field_name, _, _ in parsed_template
+            if field_name is not None and field_name not in static_kwargs
+            and qid_kwargs and all(field_name in kw for kw in qid_kwargs.values())
+            ))
+        
+        # map each combination of qid field values to the qid(s) that have it
+        self._qids_by_values = {}
+        for qid, kw in qid_kwargs.items():
+            values = tuple(kw[f] for f in self.qid_fields)
+            self._qids_by_values.setdefault(values, []).append(qid)
+
+        pattern = ''
+        self._specs = {}
+        self._qid_values = {}
+        for literal, field_name, spec, conversion in parsed_template:
+            pattern += re.escape(literal)
+            if field_name is None:
+                continue
+            
+            if field_name in static_kwargs:
+                value = _format_field(static_kwargs[field_name], spec, conversion)
+                pattern += re.escape(value)
+            elif field_name in self._specs:
+                pattern += f'(?P={field_name})'
+            else:
+                self._specs[field_name] = (spec, conversion)
+                if field_name in self.qid_fields:
+                    values = {
+                        _format_field(kw[field_name], spec, conversion): kw[field_name]
+                        for kw in qid_kwargs.values()
+                        }
+                    self._qid_values[field_name] = values
+                    alternatives = sorted(values, key=len, reverse=True)
+                    pattern += f'(?P<{field_name}>' + \
+                        '|'.join(re.escape(v) for v in alternatives) + ')'
+                elif _is_int_spec(spec):
+                    pattern += f'(?P<{field_name}>[-+ ]?\\d+)'
+                else:
+                    pattern += f'(?P<{field_name}>[^/]+?)'
+
+        # allow any leading directories
+        self._regex = re.compile(r'(?:.*/)?' + pattern)
+
+    def parse(self, fn):
+        """Parse a filename.
+
+        Parameters
+        ----------
+        fn : str
+            The filename, either a basename or a full path.
+
+        Returns
+        -------
+        (dict, tuple of str) or None
+            If fn matches the template, the keyword arguments that format the 
+            template to fn, and the candidate qids whose keywords match the qid
+            fields of fn (empty if the template has no qid fields). Qid fields
+            take the value from the qid keywords, and other fields are ints if
+            formatting that int gives back the same string, otherwise strs. If
+            fn does not match the template, None.
+        """
+        m = self._regex.fullmatch(fn)
+        if m is None:
+            return None
+
+        kwargs = m.groupdict()
+        for field_name, value in kwargs.items():
+            if field_name in self._qid_values:
+                kwargs[field_name] = self._qid_values[field_name][value]
+            else:
+                try:
+                    int_value = int(value)
+                except ValueError:
+                    continue
+                if _format_field(int_value, *self._specs[field_name]) == value:
+                    kwargs[field_name] = int_value
+
+        if self.qid_fields:
+            values = tuple(kwargs[f] for f in self.qid_fields)
+            qids = tuple(self._qids_by_values.get(values, ()))
+        else:
+            qids = ()
+
+        return kwargs, qids
+
+    def __repr__(self):
+        return f'{type(self).__name__}(template={self.template!r})'
+
+def _is_int_spec(spec):
+    """Whether a format spec only applies to ints, e.g. '04' or 'd', in which
+    case the formatted field is a string of digits."""
+    return bool(spec) and (spec[-1] == 'd' or spec.lstrip('+- ').startswith('0'))
+
+def _format_field(value, spec, conversion):
+    """Format a single value like a template field with the given format spec
+    and conversion would."""
+    if conversion == 'r':
+        value = repr(value)
+    elif conversion == 's':
+        value = str(value)
+    elif conversion == 'a':
+        value = ascii(value)
+    return format(value, spec or '')
+
 
 # All products must inherit from Product and implement its productmethods
 class Product: 
@@ -69,12 +380,44 @@ class Product:
     productmethods = []
     productmethod = get_productmethod_decorator(productmethods)
 
+    # The maximum number of FilenameResolvers cached by each datamodel
+    resolver_cache_size = 4096
+
+    # The default maximum number of threads running async methods, and so 
+    # product reads, at once, per datamodel
+    async_max_workers = 16
+
     def __init__(self, **kwargs):
         """Base class for products. Enforces subclasses implement any
         productmethods exactly once.
+
+        Parameters
+        ----------
+        qids : dict
+            The contents of the qids_config of the data model.
+        configs : dict
+            For each product, a mapping from subproduct names to the
+            subproduct config basename.
+        qids_config : str, optional
+            The basename of the qids_config of the data model, by default None.
+            Required if lazy.
+        lazy : bool, optional
+            If True, the subproduct dicts of each product are not supplied up
+            front, but are loaded (and checked) on first request from the 
+            configs, by default False.
         """
-        self.qids = kwargs.pop('qids')
+        self.qids = utils.freeze(kwargs.pop('qids'))
         self.configs = kwargs.pop('configs')
+        self.qids_config = kwargs.pop('qids_config', None)
+        self._lazy = kwargs.pop('lazy', False)
+        self._lazy_lock = threading.Lock()
+        self._fn_parsers = {}
+        self._read_cache = None
+        self._async_executor = None
+        self._async_lock = threading.Lock()
+
+        assert not self._lazy or self.qids_config is not None, \
+            'Must supply the qids_config if lazy'
 
         for product in Product.__subclasses__():
             for method_name in self.productmethods:
@@ -125,17 +468,58 @@ class Product:
         """
         product = utils.get_producttag(product)
         
-        assert product not in ['qids', 'configs'], \
-            "Cannot have a product named 'qids' or 'configs'"
+        assert product not in ['qids', 'configs', 'qids_config', 'lazy'], \
+            "Cannot have a product named 'qids', 'configs', 'qids_config', or 'lazy'"
         
         product_dict = kwargs.pop(product, None)
 
         if product_dict is not None:
-            setattr(self, product, product_dict)     
+            setattr(self, product, utils.freeze(product_dict))
+
+    @classmethod
+    def check_subproduct_config_allows_qids_config(cls, product, subproduct,
+                                                   subproduct_config,
+                                                   subproduct_dict, qids_config):
+        """Ensure a subproduct configuration file allows the qids_config of
+        the data model. This is a classmethod so that it may be called before
+        a data model is constructed.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        subproduct_config : str
+            The subproduct config basename.
+        subproduct_dict : dict
+            A dictionary corresponding to the subproduct configuration file.
+        qids_config : str
+            The basename of the qids_config of the data model.
+
+        Raises
+        ------
+        AssertionError
+            If the subproduct has no allowed_qids_configs, or qids_config is
+            not one of them (and they are not 'all').
+        """
+        product = utils.get_producttag(product)
+        try:
+            if qids_config not in subproduct_dict['allowed_qids_configs']:
+                assert subproduct_dict['allowed_qids_configs'] == 'all', \
+                    f'qids_config {qids_config} not allowed by product {product}, ' + \
+                    f'subproduct {subproduct} (config {subproduct_config})'
+        except TypeError as e:
+            raise AssertionError(
+                    f'No allowed_qids_configs for product {product}, subproduct {subproduct} '
+                    f'(config {subproduct_config})') from e
 
     def check_product_config_internal_consistency(self, product):
         """Ensure the subproduct configuration file is internally consistent for
-        every subproduct in this product in the datamodel. 
+        every subproduct in this product in the datamodel. If the datamodel is
+        lazy, only those subproducts that have already been loaded are checked
+        (the rest are checked when they are loaded).
 
         Parameters
         ----------
@@ -143,6 +527,35 @@ class Product:
             Name of type of product, e.g. 'maps'. Can also be a module __name__
             in which case the product is inferred from the module basename.
 
+        Raises
+        ------
+        See check_subproduct_config_internal_consistency.
+        """
+        product = utils.get_producttag(product)
+        try:
+            product_dict = getattr(self, product)
+        except AttributeError:
+            return # if not in the data model, it is internally consistent
+
+        for subproduct, subproduct_dict in product_dict.items():
+            self.check_subproduct_config_internal_consistency(
+                product, subproduct, subproduct_dict
+                )
+
+    def check_subproduct_config_internal_consistency(self, product, subproduct,
+                                                     subproduct_dict):
+        """Ensure the subproduct configuration file is internally consistent.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        subproduct_dict : dict
+            A dictionary corresponding to the subproduct configuration file.
+
         Raises
         ------
         AssertionError
@@ -158,59 +571,52 @@ class Product:
         AssertionError
             If any qid in 'allowed_qids_extra_kwargs' is not in 'allowed_qids'.
         """
+        product = utils.get_producttag(product)
+        subproduct_config = self.get_subproduct_config(product, subproduct)
+
+        # check each listed system is in sofind systems
         try:
-            product_dict = self.get_product_dict(product)
-        except LookupError:
-            return # if not in the data model, it is internally consistent
+            for system in subproduct_dict['system_paths']:
+                assert system in systems.sofind_systems, \
+                    f'product {product}, subproduct {subproduct} (config {subproduct_config}) ' + \
+                    f'has system {system} but {system} not in sofind_systems: ' + \
+                    f'{systems.sofind_systems}'
+        except KeyError as e:
+            raise KeyError(f'product {product}, subproduct {subproduct} (config {subproduct_config}) '
+                        'missing system_paths') from e
+        except TypeError as e:
+            assert subproduct_dict['system_paths'] is None # None is OK
 
-        for subproduct, subproduct_dict in product_dict.items():
-            subproduct_config = self.get_subproduct_config(product, subproduct)
-            product = utils.get_producttag(product)
+        # check each allowed_qid is in each allowed_qids_configs
+        allowed_qids_configs = subproduct_dict['allowed_qids_configs']
+        if allowed_qids_configs == 'all':
+            allowed_qids_configs = utils.get_package_config_names('qids')
+
+        allowed_qids = subproduct_dict['allowed_qids']
 
-            # check each listed system is in sofind systems
-            try:
-                for system in subproduct_dict['system_paths']:
-                    assert system in systems.sofind_systems, \
-                        f'product {product}, subproduct {subproduct} (config {subproduct_config}) ' + \
-                        f'has system {system} but {system} not in sofind_systems: ' + \
-                        f'{systems.sofind_systems}'
-            except KeyError as e:
-                raise KeyError(f'product {product}, subproduct {subproduct} (config {subproduct_config}) '
-                            'missing system_paths') from e
-            except TypeError as e:
-                assert subproduct_dict['system_paths'] is None # None is OK
-
-            # check each allowed_qid is in each allowed_qids_configs
-            allowed_qids_configs = subproduct_dict['allowed_qids_configs']
-            if allowed_qids_configs == 'all':
-                allowed_qids_configs = os.listdir(utils.get_package_fn('sofind', 'qids'))
-
-            allowed_qids = subproduct_dict['allowed_qids']
-
-            if allowed_qids is not None and allowed_qids != 'all':
-                for allowed_qids_config in allowed_qids_configs:
-
-                    # need to get the contents from the config_name
-                    allowed_qids_fn = utils.get_package_fn('sofind', f'qids/{allowed_qids_config}')
-                    allowed_qids_dict = utils.config_from_yaml_file(allowed_qids_fn)
-
-                    for qid in allowed_qids:
-                        assert qid in allowed_qids_dict, \
-                            f'qid {qid} allowed by product {product}, subproduct ' + \
-                            f'{subproduct} (config {subproduct_config}), but not in ' + \
-                            f'{allowed_qids_config}'
-
-            # check each allowed_qids_extra_kwarg key is an allowed_qid
-            if subproduct_dict['allowed_qids_extra_kwargs'] is not None:
-                assert allowed_qids is not None, \
-                    f'product {product}, subproduct {subproduct} (config {subproduct_config}) has '+ \
-                    'allowed_qids_extra_kwargs but allowed_qids is None'
-
-                if allowed_qids != 'all':
-                    for qid in subproduct_dict['allowed_qids_extra_kwargs']:
-                        assert qid in allowed_qids, \
-                            f'qid {qid} has extra kwargs in product {product}, subproduct ' + \
-                            f'{subproduct} (config {subproduct_config}), but not is not an allowed_qid'
+        if allowed_qids is not None and allowed_qids != 'all':
+            for allowed_qids_config in allowed_qids_configs:
+
+                # need to get the contents from the config_name
+                allowed_qids_dict = utils.get_package_config(f'qids/{allowed_qids_config}')
+
+                for qid in allowed_qids:
+                    assert qid in allowed_qids_dict, \
+                        f'qid {qid} allowed by product {product}, subproduct ' + \
+                        f'{subproduct} (config {subproduct_config}), but not in ' + \
+                        f'{allowed_qids_config}'
+
+        # check each allowed_qids_extra_kwarg key is an allowed_qid
+        if subproduct_dict['allowed_qids_extra_kwargs'] is not None:
+            assert allowed_qids is not None, \
+                f'product {product}, subproduct {subproduct} (config {subproduct_config}) has '+ \
+                'allowed_qids_extra_kwargs but allowed_qids is None'
+
+            if allowed_qids != 'all':
+                for qid in subproduct_dict['allowed_qids_extra_kwargs']:
+                    assert qid in allowed_qids, \
+                        f'qid {qid} has extra kwargs in product {product}, subproduct ' + \
+                        f'{subproduct} (config {subproduct_config}), but not is not an allowed_qid'
 
     def check_subproduct_config_is_subset(self, this_product, this_subproduct,
                                           this_subproduct_dict, that_product,
@@ -324,7 +730,8 @@ class Product:
         -------
         dict
             A set of keywords for the requested qid, such as its array, frequency,
-            etc.
+            etc. The dict itself is a new, mutable dict, but any nested values
+            are read-only views shared with the datamodel.
 
         Raises
         ------
@@ -340,7 +747,7 @@ class Product:
             If qid is not in the data_model qids_dict.
         """
         subproduct_config = self.get_subproduct_config(product, subproduct)
-        subproduct_dict = self.get_subproduct_dict(product, subproduct)
+        subproduct_dict = self.get_subproduct_dict(product, subproduct, copy=False)
 
         # check allowed_qids is not None
         assert subproduct_dict['allowed_qids'] is not None, \
@@ -352,10 +759,10 @@ class Product:
                 f'qid {qid} not allowed by product {product}, subproduct ' + \
                 f'{subproduct} (config {subproduct_config})'
 
-        qid_dict = deepcopy(self.qids[qid])
+        qid_dict = dict(self.qids[qid])
         if subproduct_dict['allowed_qids_extra_kwargs'] is not None:
             qid_subproduct_dict = subproduct_dict['allowed_qids_extra_kwargs'].get(qid, {})
-            qid_dict.update(deepcopy(qid_subproduct_dict))
+            qid_dict.update(qid_subproduct_dict)
 
         return qid_dict
     
@@ -430,20 +837,27 @@ class Product:
             Name of type of product, e.g. 'maps'. Can also be a module __name__
             in which case the product is inferred from the module basename.
         copy : bool, optional
-            Return a deepcopy of the product_dict, by default True. Otherwise the
-            product_dict which is bound as an attribute to this product object is
-            returned.
+            Return a mutable deepcopy of the product_dict, by default True. 
+            Otherwise the read-only product_dict which is bound as an attribute
+            to this product object is returned (see utils.freeze), which avoids
+            the copy.
             
         Returns
         -------
-        dict
+        dict or utils.FrozenDict
             A mapping from subproduct names in this product type to a dict of
-            information for each subproduct.
+            information for each subproduct. A dict (with lists) if copy, 
+            otherwise a utils.FrozenDict (with tuples).
 
         Raises
         ------
         LookupError
             If a product type is not in this datamodel.
+
+        Notes
+        -----
+        If the datamodel is lazy, this loads every subproduct of the product
+        that has not been loaded yet.
         """
         product = utils.get_producttag(product)
         try:
@@ -453,7 +867,12 @@ class Product:
                 f'product {product} not in datamodel configuration file'
                 ) from e
         
-        return deepcopy(product_dict) if copy else product_dict                   
+        if self._lazy and len(product_dict) < len(self.configs[product]):
+            for subproduct in self.configs[product]:
+                self.get_subproduct_dict(product, subproduct, copy=False)
+            product_dict = getattr(self, product)
+
+        return utils.thaw(product_dict) if copy else product_dict
             
     def get_subproduct_dict(self, product, subproduct, copy=True):
         """Get the subproduct dictionary for this subproduct of a given product
@@ -469,31 +888,98 @@ class Product:
         subproduct : str
             The specific subproduct.
         copy : bool, optional
-            Return a deepcopy of the subproduct_dict, by default True. Otherwise the
-            subproduct_dict which is bound as an attribute to this product object is
-            returned.
+            Return a mutable deepcopy of the subproduct_dict, by default True.
+            Otherwise the read-only subproduct_dict which is bound as an
+            attribute to this product object is returned (see utils.freeze),
+            which avoids the copy.
 
         Returns
         -------
-        dict
-            A dictionary of information for this subproduct.
+        dict or utils.FrozenDict
+            A dictionary of information for this subproduct. A dict (with 
+            lists) if copy, otherwise a utils.FrozenDict (with tuples).
 
         Raises
         ------
         KeyError
             If a subproduct under the product type is not in this datamodel.
+
+        Notes
+        -----
+        If the datamodel is lazy, the subproduct config is loaded and checked
+        on the first call for this subproduct (see load_subproduct_dict).
         """
-        product_dict = self.get_product_dict(product, copy=False)
+        product = utils.get_producttag(product)
+        try:
+            product_dict = getattr(self, product)
+        except AttributeError as e:
+            raise LookupError(
+                f'product {product} not in datamodel configuration file'
+                ) from e
+        
         try:
             subproduct_dict = product_dict[subproduct]
         except KeyError as e:
-            product = utils.get_producttag(product)
-            raise LookupError(
-                f'product {product}, subproduct {subproduct} not in '
-                'datamodel configuration file'
-            ) from e
+            if self._lazy and subproduct in self.configs[product]:
+                subproduct_dict = self.load_subproduct_dict(product, subproduct)
+            else:
+                raise LookupError(
+                    f'product {product}, subproduct {subproduct} not in '
+                    'datamodel configuration file'
+                ) from e
+        
+        return utils.thaw(subproduct_dict) if copy else subproduct_dict
+
+    def load_subproduct_dict(self, product, subproduct):
+        """Load the subproduct dictionary for this subproduct of a given
+        product type from its configuration file, check it, and bind it to this
+        product object. Only needed if the datamodel is lazy; this is called
+        automatically by get_subproduct_dict.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+
+        Returns
+        -------
+        utils.FrozenDict
+            A read-only dictionary of information for this subproduct.
+
+        Raises
+        ------
+        LookupError
+            If a subproduct under the product type is not in this datamodel.
+
+        AssertionError
+            If the subproduct does not allow the qids_config of the datamodel,
+            or is not internally consistent (see
+            check_subproduct_config_internal_consistency).
+        """
+        product = utils.get_producttag(product)
+        subproduct_config = self.get_subproduct_config(product, subproduct)
+        subproduct_dict = utils.get_package_config(
+            f'products/{product}/{subproduct_config}'
+            )
+
+        self.check_subproduct_config_allows_qids_config(
+            product, subproduct, subproduct_config, subproduct_dict,
+            self.qids_config
+            )
+        self.check_subproduct_config_internal_consistency(
+            product, subproduct, subproduct_dict
+            )
+
+        with self._lazy_lock:
+            product_dict = getattr(self, product)
+            setattr(self, product, utils.FrozenDict(
+                {**product_dict, subproduct: subproduct_dict}
+                ))
         
-        return deepcopy(subproduct_dict) if copy else subproduct_dict                   
+        return subproduct_dict
 
     def get_subproduct_path(self, product, subproduct):
         """Get the system path to a directory holding the files for this
@@ -520,7 +1006,7 @@ class Product:
         LookupError
             If a subproduct is not served on the user SOFIND_SYSTEM.
         """
-        subproduct_dict = self.get_subproduct_dict(product, subproduct)
+        subproduct_dict = self.get_subproduct_dict(product, subproduct, copy=False)
         subproduct_config = self.get_subproduct_config(product, subproduct)
         my_system = os.environ['SOFIND_SYSTEM']
 
@@ -572,4 +1058,350 @@ class Product:
                 f'product {product}, subproduct {subproduct} not in '
                 'datamodel configuration file'
             ) from e
-        return subproduct_config
\ No newline at end of file
+        return subproduct_config
+
+    def resolver(self, product, subproduct, qid, template):
+        """Get a FilenameResolver for one filename template of a subproduct of
+        a given product type, for one qid. The most recently used resolvers are
+        cached (up to resolver_cache_size of them), so repeated calls with the
+        same arguments return the same resolver. Cached resolvers only hold a 
+        weak reference to the datamodel, so they cannot be used once the 
+        datamodel is freed.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        qid : str or None
+            Dataset identification string. If None, the template is only
+            populated by the keyword arguments passed to the resolver.
+        template : str
+            The key of the filename template in the subproduct config, e.g.
+            'split_map_file_template'.
+
+        Returns
+        -------
+        FilenameResolver
+            Callable returning filenames given the remaining keyword arguments
+            of the template.
+
+        Raises
+        ------
+        LookupError
+            If the subproduct is not in this datamodel.
+
+        KeyError
+            If the template is not in the subproduct config.
+
+        AssertionError
+            If the qid is not allowed by the subproduct.
+
+        Examples
+        --------
+        >>> r = dm.resolver('maps', 'default', 'pa5a', 'split_map_file_template')
+        >>> fns = [r(split_num=i, maptag='ivar') for i in range(4)]
+        """
+        product = utils.get_producttag(product)
+        return _get_resolver_cache(self)(product, subproduct, qid, template)
+
+    def enable_read_cache(self, max_bytes, copy=False):
+        """Cache the maps read by read_map and read_mask in memory, such that
+        reading the same file (with the same read_map_kwargs) again does not
+        touch the disk, as long as the file has not been modified. The 
+        least-recently used maps are evicted once their total size exceeds
+        max_bytes.
+
+        Parameters
+        ----------
+        max_bytes : int
+            Maximum total size in bytes of the cached maps.
+        copy : bool, optional
+            If True, return writeable copies of cached maps. Otherwise, return
+            read-only views of cached maps (the default), which avoids the copy
+            but means modifying a map in-place raises a ValueError.
+
+        Notes
+        -----
+        Replaces any existing cache. Maps larger than max_bytes are never
+        cached, but are returned with the same mutability as cached maps.
+        """
+        self._read_cache = utils.ReadCache(max_bytes, copy=copy)
+
+    def disable_read_cache(self):
+        """Stop caching maps read from disk, and free the cached maps."""
+        self._read_cache = None
+
+    @property
+    def read_cache_stats(self):
+        """The statistics of the read cache (see utils.ReadCache.stats), or 
+        None if it is not enabled."""
+        if self._read_cache is None:
+            return None
+        return self._read_cache.stats
+
+    def _read_map(self, fn, read_map_kwargs=None, mmap=False, box=None,
+                  pixbox=None, comps=None):
+        """Read (a region of) a map with utils.read_map_region, through the read
+        cache if it is enabled (see enable_read_cache) and not mmap."""
+        if read_map_kwargs is None:
+            read_map_kwargs = {}
+        read_map_kwargs = dict(read_map_kwargs)
+        for k, v in dict(box=box, pixbox=pixbox).items():
+            if v is not None:
+                if k in read_map_kwargs:
+                    raise ValueError(f'Got {k} and read_map_kwargs[{k!r}]')
+                read_map_kwargs[k] = v
+
+        def read_func():
+            return utils.read_map_region(
+                fn, comps=comps, mmap=mmap, **read_map_kwargs
+                )
+
+        read_cache = self._read_cache
+
+        if read_cache is None or mmap:
+            return read_func()
+        
+        # key on the state of the file so that modified files are reread
+        fn = os.path.abspath(fn)
+        st = os.stat(fn)
+        kwargs_key = utils.make_key(dict(read_map_kwargs, comps=comps))
+        if kwargs_key is None:
+            key = None
+        else:
+            key = (fn, st.st_mtime_ns, st.st_size, kwargs_key)
+        return read_cache.get(key, read_func)
+
+    def set_async_max_workers(self, max_workers):
+        """Set the maximum number of async method calls (e.g. aread_map) that
+        may run at once. Further calls wait for a free thread.
+
+        Parameters
+        ----------
+        max_workers : int
+            Maximum number of threads running async method calls.
+
+        Notes
+        -----
+        Calls already submitted to the previous executor run to completion.
+        """
+        with self._async_lock:
+            old_executor = self._async_executor
+            self._async_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='sofind-async'
+                )
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def _get_async_executor(self):
+        """Get the async executor, creating one with async_max_workers threads
+        if necessary."""
+        with self._async_lock:
+            if self._async_executor is None:
+                self._async_executor = ThreadPoolExecutor(
+                    max_workers=self.async_max_workers, 
+                    thread_name_prefix='sofind-async'
+                    )
+            return self._async_executor
+
+    async def run_async(self, func, *args, **kwargs):
+        """Run a blocking function, e.g. a product read, on the async executor
+        without blocking the event loop. At most async_max_workers calls (see
+        set_async_max_workers) run at once; further calls wait their turn.
+
+        Parameters
+        ----------
+        func : callable
+            The function.
+        args, kwargs
+            Arguments of the function.
+
+        Returns
+        -------
+        any
+            The return value of the function.
+
+        Notes
+        -----
+        If the awaiting task is cancelled while the call is still waiting for
+        a free thread, the call is not run. If the call is already running, 
+        it runs to completion in its thread, but its result is discarded.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_async_executor(), functools.partial(func, *args, **kwargs)
+            )
+
+    def exists(self, *fns):
+        """Check whether many files exist. If the directory listing cache is 
+        enabled (see utils.enable_listing_cache), each directory is listed 
+        once rather than each file being stat'ed.
+
+        Parameters
+        ----------
+        fns : str or array-like of str
+            Full filenames, e.g. the output of get_map_fns.
+
+        Returns
+        -------
+        np.ndarray of bool
+            Whether each file exists. If a single array-like of filenames is
+            passed, the output has the same shape, otherwise it is 1d.
+
+        Examples
+        --------
+        >>> utils.enable_listing_cache(ttl=600)
+        >>> fns = dm.get_map_fns(['pa5a', 'pa5b'], split_nums=range(4))
+        >>> dm.exists(fns).all()
+        """
+        if len(fns) == 1 and not isinstance(fns[0], (str, os.PathLike)):
+            fns = fns[0]
+        fns = np.asarray(fns, dtype=object)
+        out = np.fromiter(
+            (utils.file_exists(fn) for fn in fns.flat), dtype=bool, count=fns.size
+            )
+        return out.reshape(fns.shape)
+
+    def get_fn_parsers(self, product, subproduct, templates=None):
+        """Get a FilenameParser for each filename template of a subproduct of
+        a given product type. The candidate qids of each parser are the
+        allowed_qids of the subproduct. Parsers are cached.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        templates : str or iterable of str, optional
+            The keys of the filename templates in the subproduct config, e.g. 
+            'split_map_file_template'. By default, every key ending in 
+            '_template' with a str value.
+
+        Returns
+        -------
+        dict
+            A mapping from template key to FilenameParser.
+        """
+        product = utils.get_producttag(product)
+        subproduct_dict = self.get_subproduct_dict(product, subproduct, copy=False)
+
+        if templates is None:
+            templates = [
+                k for k, v in subproduct_dict.items()
+                if k.endswith('_template') and isinstance(v, str)
+                ]
+        templates = utils.to_tuple(templates)
+
+        allowed_qids = subproduct_dict['allowed_qids']
+        if allowed_qids is None:
+            allowed_qids = []
+        elif allowed_qids == 'all':
+            allowed_qids = self.qids
+
+        parsers = {}
+        for template in templates:
+            key = (product, subproduct, template)
+            if key not in self._fn_parsers:
+                qid_kwargs = {
+                    qid: self.get_qid_kwargs_by_subproduct(product, subproduct, qid)
+                    for qid in allowed_qids
+                    }
+                self._fn_parsers[key] = FilenameParser(
+                    subproduct_dict[template], qid_kwargs=qid_kwargs
+                    )
+            parsers[template] = self._fn_parsers[key]
+        return parsers
+
+    def parse_fn(self, product, subproduct, fn, templates=None):
+        """Parse a filename of a subproduct of a given product type back into
+        the qid and the keyword arguments of the filename template that 
+        produced it. The inverse of, e.g., get_map_fn.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        fn : str
+            The filename, either a basename or a full path.
+        templates : str or iterable of str, optional
+            The keys of the filename templates in the subproduct config to try,
+            in order, e.g. 'split_map_file_template'. By default, every key 
+            ending in '_template' with a str value.
+
+        Returns
+        -------
+        dict or None
+            None if fn does not match any template. Otherwise, a dict with
+            entries:
+                * 'template': the key of the first matching template
+                * 'qids': the allowed qids consistent with fn, which may be
+                  more than one if the template does not use all of a qid's
+                  keywords, or empty if it uses none
+                * 'qid': the qid if 'qids' has exactly one entry, else None
+                * 'kwargs': the keyword arguments that format the template to
+                  fn (see FilenameParser.parse), including those set by the 
+                  qid
+
+        Examples
+        --------
+        >>> fn = dm.get_map_fn('pa5a', split_num=2, maptag='ivar')
+        >>> dm.parse_fn('maps', 'default', fn)['qid']
+        'pa5a'
+        """
+        parsers = self.get_fn_parsers(product, subproduct, templates=templates)
+        return _parse_fn(parsers, fn)
+
+    def parse_fns(self, product, subproduct, fns=None, templates=None):
+        """Parse many filenames of a subproduct of a given product type, e.g. a 
+        directory listing, in a single pass. See parse_fn.
+
+        Parameters
+        ----------
+        product : str
+            Name of type of product, e.g. 'maps'. Can also be a module __name__
+            in which case the product is inferred from the module basename.
+        subproduct : str
+            The specific subproduct.
+        fns : iterable of str, optional
+            The filenames, either basenames or full paths. By default, the 
+            names of the files in the subproduct directory on this system 
+            (see get_subproduct_path).
+        templates : str or iterable of str, optional
+            The keys of the filename templates in the subproduct config to try,
+            in order, e.g. 'split_map_file_template'. By default, every key 
+            ending in '_template' with a str value.
+
+        Returns
+        -------
+        dict
+            A mapping from each filename to its parse_fn result (None if the
+            filename does not match any template).
+        """
+        if fns is None:
+            with os.scandir(self.get_subproduct_path(product, subproduct)) as it:
+                fns = [entry.name for entry in it if entry.is_file()]
+        parsers = self.get_fn_parsers(product, subproduct, templates=templates)
+        return {fn: _parse_fn(parsers, fn) for fn in fns}
+
+def _parse_fn(parsers, fn):
+    """Return the parse_fn result for the first parser in parsers, a mapping
+    from template key to FilenameParser, that matches fn."""
+    for template, parser in parsers.items():
+        res = parser.parse(fn)
+        if res is not None:
+            kwargs, qids = res
+            return {
+                'template': template,
+                'qids': qids,
+                'qid': qids[0] if len(qids) == 1 else None,
+                'kwargs': kwargs
+                }
+    return None
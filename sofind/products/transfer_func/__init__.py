@@ -1,7 +1,9 @@
-from ..products import Product, get_implements_decorator
-    
-import numpy as np
-import os
+from ..products import Product, get_async_method, get_implements_decorator
+from sofind import utils
+
+import functools
+
+np = utils.lazy_import('numpy')
 
 class TransferFunc(Product):
 
@@ -11,6 +13,11 @@ class TransferFunc(Product):
     def __init__(self, **kwargs):
         self.set_attrs(__name__, kwargs)
         super().__init__(**kwargs)
+
+        # memoized transfer function tables, keyed by filename. each entry is
+        # a (signature, table) tuple
+        self._tf_tables = {}
+
         self.check_product_config_internal_consistency(__name__)
 
     @implements(Product.get_fn)
@@ -43,23 +50,10 @@ class TransferFunc(Product):
             If basename is False and the product, subproduct dirname is not
             known to the datamodel.
         """
-        
-        subprod_dict = self.get_subproduct_dict(__name__, subproduct)
-        # get the appropriate filename template
-        fn_template = subprod_dict['tf_template']
-
-        # get info about the requested array and add kwargs passed to this
-        # method call. use this info to format the file template
-        fn_kwargs = self.get_qid_kwargs_by_subproduct(__name__, subproduct, qid)
-        fn_kwargs.update(**kwargs)
-        fn = fn_template.format(**fn_kwargs)
-
-        if basename:
-            return fn
-        else:
-            # subprod_path is the system path to the directory holding this (sub)product
-            subprod_path = self.get_subproduct_path(__name__, subproduct)
-            return os.path.join(subprod_path, fn)
+        # the resolver holds the info about the requested array. add kwargs
+        # passed to this method call to format the file template
+        resolver = self.resolver(__name__, subproduct, qid, 'tf_template')
+        return resolver(basename=basename, **kwargs)
 
 
     @implements(Product.read_product)
@@ -85,15 +79,12 @@ class TransferFunc(Product):
         Returns
         -------
         np.array
-            The requested transfer function [ell, tf(ell)]
+            The requested transfer function [ell, tf(ell)]. Read-only if the
+            loadtxt cache is enabled (see utils.enable_loadtxt_cache).
         """
         
         if subproduct == 'dummy':
-            # dummy transfer function:
-            ellt = np.arange(2,3000+1)
-            tf = np.ones(len(ellt))
-            
-            return np.array([ellt, tf])
+            return _get_dummy_tf().copy()
 
         # use get_tf_fn and some external library to load the data
         fn = self.get_tf_fn(qid, subproduct=subproduct, 
@@ -101,4 +92,105 @@ class TransferFunc(Product):
         if loadtxt_kwargs is None:
             loadtxt_kwargs = {'unpack': True}
 
-        return np.loadtxt(fn, **loadtxt_kwargs)
\ No newline at end of file
+        return utils.loadtxt(fn, **loadtxt_kwargs)
+
+    def get_tf_table(self, fn):
+        """Get the contents of a transfer function file, which are read from
+        disk only once, unless the file is modified.
+
+        Parameters
+        ----------
+        fn : str
+            Full path to the transfer function file.
+
+        Returns
+        -------
+        (2, nell) np.ndarray
+            The transfer function [ell, tf(ell)], read-only and shared between
+            calls.
+        """
+        signature = utils.get_file_signature(fn)
+        try:
+            _signature, table = self._tf_tables[fn]
+            if _signature == signature:
+                return table
+        except KeyError:
+            pass
+
+        table = np.array(utils.loadtxt(fn, unpack=True)[:2], dtype=np.float64)
+        table.flags.writeable = False
+        self._tf_tables[fn] = (signature, table)
+        return table
+
+    def eval_tf(self, qids, ells, subproduct='default', left=None, right=None,
+                **kwargs):
+        """Evaluate transfer functions for several qids at arbitrary ells, 
+        linearly interpolating between the tabulated ells.
+
+        Parameters
+        ----------
+        qids : str or iterable of str
+            Dataset identification strings.
+        ells : array-like
+            The ells at which to evaluate the transfer functions, of any shape.
+        subproduct : str, optional
+            Name of transfer function subproduct to load raw products from, by 
+            default 'default'.
+        left : float, optional
+            Value of a transfer function below the minimum tabulated ell, by
+            default the value at that ell.
+        right : float, optional
+            Value of a transfer function above the maximum tabulated ell, by
+            default the value at that ell.
+        kwargs : dict, optional
+            Any additional keyword arguments used to format the tf filenames,
+            common to all filenames.
+
+        Returns
+        -------
+        (nqid, *ells.shape) np.ndarray
+            The transfer functions, where a str qids counts as a length-1 axis.
+
+        Notes
+        -----
+        Each transfer function file is read once (see get_tf_table) and the
+        tables of all qids are interpolated together (see utils.interp_rows).
+        """
+        qids = utils.to_tuple(qids)
+        ells = np.asarray(ells)
+
+        if subproduct == 'dummy':
+            tables = {'dummy': _get_dummy_tf()}
+            keys = ['dummy'] * len(qids)
+        else:
+            tables = {}
+            keys = []
+            for qid in qids:
+                fn = self.get_tf_fn(qid, subproduct=subproduct, basename=False,
+                                    **kwargs)
+                if fn not in tables:
+                    tables[fn] = self.get_tf_table(fn)
+                keys.append(fn)
+        uniq_keys = list(tables)
+
+        out = utils.interp_rows(
+            ells.ravel(), [tables[k][0] for k in uniq_keys],
+            [tables[k][1] for k in uniq_keys], left=left, right=right
+            )
+        out = out[[uniq_keys.index(k) for k in keys]]
+        return out.reshape(len(qids), *ells.shape)
+
+    # async counterparts, see Product.run_async
+    aread_tf = get_async_method(read_tf)
+    aeval_tf = get_async_method(eval_tf)
+
+@functools.cache
+def _get_dummy_tf():
+    """The dummy transfer function, 1 for ell in [2, 3000]. Read-only and
+    shared, see read_tf for a copy."""
+    ellt = np.arange(2,3000+1)
+    tf = np.ones(len(ellt))
+    
+    dummy_tf = np.array([ellt, tf])
+    dummy_tf.flags.writeable = False
+    return dummy_tf
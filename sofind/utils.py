@@ -1,12 +1,101 @@
-from pixell import enmap
-import numpy as np
-import yaml
-import h5py
-
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+import hashlib
+import importlib
+import importlib.util
 import io
 import os, sys
+import pickle
+import stat
+import tempfile
+import threading
+import time
+import warnings
 from itertools import product
 
+class LazyModule:
+
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name):
+        """A stand-in for a module which imports the module on first attribute
+        access, and forwards all attribute access to it thereafter. 
+
+        Parameters
+        ----------
+        name : str
+            Full name of the module, e.g. 'pixell.enmap'.
+
+        Notes
+        -----
+        Unlike a module loaded by importlib.util.LazyLoader, a LazyModule is 
+        never placed in sys.modules, so code that inspects every module in 
+        sys.modules (as astropy does during its own import) cannot trigger
+        the import at an unexpected time.
+        """
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = importlib.import_module(self._name)
+            self._module = module
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._name!r})'
+
+def lazy_import(name):
+    """Import a module, but defer executing it until one of its attributes is
+    first accessed. Useful for keeping `import sofind` fast when a heavy
+    dependency is only needed by some functions.
+
+    Parameters
+    ----------
+    name : str
+        Full name of the module, e.g. 'pixell.enmap'.
+
+    Returns
+    -------
+    module or LazyModule
+        If the module was already imported, the module. Otherwise, a 
+        LazyModule which imports it on first use.
+
+    Raises
+    ------
+    ModuleNotFoundError
+        If the top-level package of the module cannot be found.
+
+    Notes
+    -----
+    Only the top-level package (e.g. 'pixell' for 'pixell.enmap') is looked
+    up immediately, which does not import it. Finding a submodule would 
+    import its parent packages, so a missing submodule is only reported on 
+    first use.
+    """
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+
+    package = name.partition('.')[0]
+    if importlib.util.find_spec(package) is None:
+        raise ModuleNotFoundError(f'No module named {package!r}', name=package)
+    return LazyModule(name)
+
+np = lazy_import('numpy')
+yaml = lazy_import('yaml')
+h5py = lazy_import('h5py')
+enmap = lazy_import('pixell.enmap')
+wcsutils = lazy_import('pixell.wcsutils')
+pixell_utils = lazy_import('pixell.utils')
+
+# bump this whenever the layout of a config bundle changes, so that stale
+# bundles written by older versions of sofind are rebuilt rather than loaded
+CONFIG_BUNDLE_VERSION = 2
+
 # adapted from soapack.interfaces
 def config_from_yaml_file(filename):
     """Return a yaml file contents as a dictionary.
@@ -58,6 +147,226 @@ def config_from_hdf5_file(filename, address='/', op=lambda x: x):
         odict[k] = op(v)
     return odict
 
+class FrozenDict(Mapping):
+
+    __slots__ = ('_dict', '_hash')
+
+    def __init__(self, *args, **kwargs):
+        """A read-only, hashable mapping. Values are recursively frozen (see
+        freeze) on construction, so no part of the contents can be modified.
+
+        Parameters
+        ----------
+        args, kwargs
+            Any arguments accepted by the dict constructor.
+        """
+        self._dict = {k: freeze(v) for k, v in dict(*args, **kwargs).items()}
+        self._hash = None
+
+    def __getitem__(self, key):
+        return self._dict[key]
+
+    def __iter__(self):
+        return iter(self._dict)
+
+    def __len__(self):
+        return len(self._dict)
+
+    def __contains__(self, key):
+        return key in self._dict
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self._dict.items()))
+        return self._hash
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._dict!r})'
+
+    def __reduce__(self):
+        return (type(self), (self._dict,))
+
+def freeze(obj):
+    """Return a recursively read-only version of obj. Dicts become FrozenDicts
+    and lists (and tuples) become tuples, with their items frozen in turn.
+    Any other object is returned as-is.
+
+    Parameters
+    ----------
+    obj : any
+        Object to freeze, e.g. the contents of a yaml file.
+
+    Returns
+    -------
+    any
+        Frozen object. Structure that is already frozen is shared, not copied.
+    """
+    if isinstance(obj, FrozenDict):
+        return obj
+    elif isinstance(obj, Mapping):
+        return FrozenDict(obj)
+    elif isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    else:
+        return obj
+
+def thaw(obj):
+    """Return a recursively mutable copy of obj, the inverse of freeze. 
+    Mappings become dicts and tuples (and lists) become lists, with their items
+    thawed in turn. Any other object is returned as-is.
+
+    Parameters
+    ----------
+    obj : any
+        Object to thaw.
+
+    Returns
+    -------
+    any
+        Thawed object. No structure is shared with obj.
+    """
+    if isinstance(obj, Mapping):
+        return {k: thaw(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [thaw(v) for v in obj]
+    else:
+        return obj
+
+def make_key(obj):
+    """Return a hashable key identifying the value of obj, e.g. a dict of 
+    keyword arguments, for use in caches. Mappings become sorted tuples of 
+    items, lists become tuples, and numpy arrays are identified by their
+    dtype, shape and data.
+
+    Parameters
+    ----------
+    obj : any
+        Object to key.
+
+    Returns
+    -------
+    hashable or None
+        The key, or None if obj contains an unhashable object which cannot be
+        keyed.
+    """
+    def _key(obj):
+        if isinstance(obj, Mapping):
+            return (Mapping, tuple(sorted((k, _key(v)) for k, v in obj.items())))
+        elif isinstance(obj, (list, tuple)):
+            return tuple(_key(v) for v in obj)
+        elif isinstance(obj, slice):
+            return (slice, obj.start, obj.stop, obj.step)
+        elif hasattr(obj, '__array_interface__'):
+            arr = np.asarray(obj)
+            return ('ndarray', arr.dtype.str, arr.shape, arr.tobytes())
+        else:
+            return obj
+    
+    try:
+        key = _key(obj)
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+class ReadCache:
+
+    def __init__(self, max_bytes, copy=False):
+        """A thread-safe, in-memory cache of arrays read from disk, bounded by
+        the total size of the cached arrays. When full, the least-recently used
+        arrays are evicted.
+
+        Parameters
+        ----------
+        max_bytes : int
+            Maximum total nbytes of the cached arrays. Arrays larger than this
+            are never cached.
+        copy : bool, optional
+            If True, get returns a writeable copy of a cached array. Otherwise,
+            it returns a read-only view, by default False.
+        """
+        self.max_bytes = int(max_bytes)
+        self.copy = copy
+        self._arrays = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, misses=0, evictions=0)
+
+    def get(self, key, read_func):
+        """Get the array with the given key from the cache, or read it (and
+        cache it) on a miss.
+
+        Parameters
+        ----------
+        key : hashable or None
+            The key of the array, e.g. from make_key. If None, the array is
+            read but not cached.
+        read_func : callable
+            Function of no arguments returning the array.
+
+        Returns
+        -------
+        np.ndarray
+            A read-only view of the cached array, or if copy, a copy. Arrays 
+            that are not cached (if key is None or the array is larger than
+            max_bytes) are returned with the same mutability: read-only, or if
+            copy, writeable.
+        """
+        if key is None:
+            return self._uncached(read_func())
+
+        with self._lock:
+            arr = self._arrays.get(key)
+            if arr is not None:
+                self._arrays.move_to_end(key)
+                self._stats['hits'] += 1
+            else:
+                self._stats['misses'] += 1
+
+        if arr is None:
+            # read outside the lock so that other keys can be served meanwhile
+            arr = read_func()
+            if arr.nbytes > self.max_bytes:
+                return self._uncached(arr)
+            arr.flags.writeable = False
+            with self._lock:
+                if key not in self._arrays:
+                    self._arrays[key] = arr
+                    self._nbytes += arr.nbytes
+                    while self._nbytes > self.max_bytes:
+                        _, evicted = self._arrays.popitem(last=False)
+                        self._nbytes -= evicted.nbytes
+                        self._stats['evictions'] += 1
+        
+        if self.copy:
+            return arr.copy()
+        else:
+            return arr.view()
+
+    def _uncached(self, arr):
+        """Return an array that is not cached as get would a cached one. The
+        array is not shared, so it need not be copied."""
+        if not self.copy:
+            arr.flags.writeable = False
+        return arr
+
+    def clear(self):
+        """Evict all arrays from the cache (not counted as evictions)."""
+        with self._lock:
+            self._arrays.clear()
+            self._nbytes = 0
+
+    @property
+    def stats(self):
+        """A dict of the number of 'hits', 'misses' and 'evictions' so far, and
+        the current number of cached arrays ('items') and their total size 
+        ('nbytes'), as well as 'max_bytes'."""
+        with self._lock:
+            return dict(
+                self._stats, items=len(self._arrays), nbytes=self._nbytes,
+                max_bytes=self.max_bytes
+                )
+
 def get_package_fn(package, basename):
     """Get a filename from within a given package. Useful for accessing
     data that is distributed within the package.
@@ -77,6 +386,77 @@ def get_package_fn(package, basename):
     package_path = os.path.dirname(sys.modules[package].__file__)
     return os.path.join(package_path, basename)
 
+# process-wide registry of parsed package configs, keyed by full filename.
+# each entry is a (signature, config) tuple
+_package_configs = {}
+_package_configs_lock = threading.Lock()
+
+# and of the config basenames in package directories, keyed by full dirname
+_package_config_names = {}
+
+def get_package_config(basename, package='sofind', return_signature=False):
+    """Get the contents of a yaml config distributed within a package. Each
+    config is parsed at most once per process, on first request, and shared
+    by all subsequent requests.
+
+    Parameters
+    ----------
+    basename : str
+        Path of the config relative to package, e.g. 'qids/so_lat_qids.yaml'.
+    package : str, optional
+        Name of package, by default 'sofind'.
+    return_signature : bool, optional
+        Also return the signature (see get_file_signature) of the config,
+        taken when it was parsed, by default False.
+
+    Returns
+    -------
+    any or (tuple, any)
+        Read-only view of the contents of the config (see freeze), and its
+        signature if return_signature.
+    """
+    fn = get_package_fn(package, basename)
+    try:
+        signature, config = _package_configs[fn]
+    except KeyError:
+        with _package_configs_lock:
+            if fn not in _package_configs:
+                signature = get_file_signature(fn)
+                config = freeze(config_from_yaml_file(fn))
+                _package_configs[fn] = (signature, config)
+            signature, config = _package_configs[fn]
+
+    if return_signature:
+        return signature, config
+    else:
+        return config
+
+def get_package_config_names(dirname, package='sofind'):
+    """Get the names of the yaml configs in a directory distributed within a
+    package. The directory is listed at most once per process.
+
+    Parameters
+    ----------
+    dirname : str
+        Path of the directory relative to package, e.g. 'qids'.
+    package : str, optional
+        Name of package, by default 'sofind'.
+
+    Returns
+    -------
+    tuple of str
+        Sorted config basenames (not including dirname).
+    """
+    fn = get_package_fn(package, dirname)
+    try:
+        return _package_config_names[fn]
+    except KeyError:
+        config_names = tuple(sorted(
+            f for f in os.listdir(fn) if f.endswith('.yaml')
+            ))
+        _package_config_names[fn] = config_names
+        return config_names
+
 def get_system_fn(home_config, basename, config_keys=None):
     """Get a filename on the system according to a user configuration file.
     The configuration file must be located in the user's home directory and
@@ -133,6 +513,579 @@ def get_system_fn(home_config, basename, config_keys=None):
 
     return os.path.join(out, basename)
 
+def get_cache_dir(*basenames):
+    """Get a path inside the directory in which sofind may cache derived
+    products, such as compiled config bundles. The directory is given by
+    the SOFIND_CACHE_DIR environment variable if set, otherwise
+    ~/.cache/sofind.
+
+    Parameters
+    ----------
+    basenames : str
+        Additional path components to append to the cache directory.
+
+    Returns
+    -------
+    str
+        Full path inside the cache directory. Nothing is created on disk.
+    """
+    cache_dir = os.environ.get(
+        'SOFIND_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sofind')
+        )
+    return os.path.join(cache_dir, *basenames)
+
+def get_file_signature(*fns):
+    """Get a cheap signature of the state of some files on disk, requiring
+    only a stat of each file.
+
+    Parameters
+    ----------
+    fns : iterable of str
+        Full filenames.
+
+    Returns
+    -------
+    tuple
+        A (filename, mtime in ns, size in bytes) tuple for each file.
+
+    Raises
+    ------
+    FileNotFoundError
+        If any of fns does not exist.
+    """
+    signature = []
+    for fn in fns:
+        st = os.stat(fn)
+        signature.append((fn, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+def atomic_write(filename, write_func):
+    """Write a file such that concurrent readers only ever see either no file
+    or the complete file. The contents are first written to a temporary file
+    in the same directory, which is then renamed.
+
+    Parameters
+    ----------
+    filename : path-like
+        Destination filename. Parent directories are created if necessary.
+    write_func : callable
+        Function of one argument, the temporary file opened for binary
+        writing, which writes the contents to it.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(dirname, exist_ok=True)
+
+    fd, tmp_fn = tempfile.mkstemp(dir=dirname, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_func(f)
+        os.replace(tmp_fn, filename)
+    except BaseException:
+        os.remove(tmp_fn)
+        raise
+
+def atomic_pickle_dump(obj, filename):
+    """Pickle an object to a file such that concurrent readers only ever see
+    either no file or the complete file (see atomic_write).
+
+    Parameters
+    ----------
+    obj : any
+        Picklable object.
+    filename : path-like
+        Destination filename. Parent directories are created if necessary.
+    """
+    atomic_write(
+        filename, lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+def _is_private_file(fd):
+    """Whether an open file is owned by the current user and not writeable by
+    any other user, i.e., whether it is safe to unpickle."""
+    st = os.fstat(fd)
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        return False
+    return not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def read_config_bundle(filename):
+    """Read a config bundle written by write_config_bundle, but only if it is
+    still valid, i.e., none of its source files have changed since it was
+    written.
+
+    Parameters
+    ----------
+    filename : path-like
+        The bundle filename.
+
+    Returns
+    -------
+    any or None
+        The bundled contents, or None if the bundle does not exist, cannot be
+        read, was written by an incompatible version of sofind, or any of its
+        source files have been modified or removed. Also None if the bundle 
+        is not owned by the current user or is writeable by other users, in 
+        which case it is not unpickled.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            if not _is_private_file(f.fileno()):
+                return None
+            bundle = pickle.load(f)
+        if bundle['version'] != CONFIG_BUNDLE_VERSION:
+            return None
+        source_fns = [s[0] for s in bundle['signature']]
+        if get_file_signature(*source_fns) != bundle['signature']:
+            return None
+    except Exception:
+        # a missing, truncated or otherwise stale bundle is just a cache miss
+        return None
+    return bundle['contents']
+
+def write_config_bundle(filename, contents, signature):
+    """Write a config bundle, i.e., some contents derived from source files
+    together with the signature of those source files, so that the contents
+    can be reused by read_config_bundle until any source file changes.
+
+    Parameters
+    ----------
+    filename : path-like
+        The bundle filename.
+    contents : any
+        Picklable contents to store in the bundle.
+    signature : tuple
+        The signature (see get_file_signature) of the files from which
+        contents were derived. This should be taken before the files are
+        read, so that a file modified while being read invalidates the bundle.
+
+    Notes
+    -----
+    Failure to write the bundle (e.g., if the cache directory is read-only)
+    is not an error; the bundle is simply not written.
+    """
+    bundle = {
+        'version': CONFIG_BUNDLE_VERSION,
+        'signature': tuple(signature),
+        'contents': contents
+    }
+    try:
+        atomic_pickle_dump(bundle, filename)
+    except OSError:
+        pass
+
+# opt-in process-wide cache of directory listings, keyed by full dirname. 
+# each entry is a (monotonic time listed, frozenset of file basenames) tuple
+_listing_cache = {}
+_listing_cache_lock = threading.Lock()
+_listing_cache_enabled = False
+_listing_cache_ttl = None
+_listing_cache_stats = dict(queries=0, scans=0)
+
+def enable_listing_cache(ttl=None):
+    """Answer file existence queries (see file_exists), e.g. in 
+    get_protected_fn, from cached directory listings, rather than with a stat 
+    of each file. Each directory is then listed (with one os.scandir) at most 
+    once per ttl seconds, which is much cheaper than many stats on networked 
+    filesystems like GPFS or Lustre.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Seconds after which a directory is listed again, by default None, in
+        which case listings never expire (but see invalidate_listing_cache).
+
+    Notes
+    -----
+    Files created or removed after a directory was listed are not seen until
+    its listing expires or is invalidated.
+    """
+    global _listing_cache_enabled, _listing_cache_ttl
+    with _listing_cache_lock:
+        _listing_cache_enabled = True
+        _listing_cache_ttl = ttl
+
+def disable_listing_cache():
+    """Stop using, and clear, the directory listing cache (see 
+    enable_listing_cache)."""
+    global _listing_cache_enabled
+    with _listing_cache_lock:
+        _listing_cache_enabled = False
+        _listing_cache.clear()
+
+def invalidate_listing_cache(*dirnames):
+    """Drop cached directory listings, such that they are listed again on the
+    next query.
+
+    Parameters
+    ----------
+    dirnames : str
+        Directories whose listings to drop. If none, drop all listings.
+    """
+    with _listing_cache_lock:
+        if not dirnames:
+            _listing_cache.clear()
+        for dirname in dirnames:
+            _listing_cache.pop(os.path.abspath(dirname), None)
+
+def get_listing_cache_stats():
+    """Get counters of the directory listing cache.
+
+    Returns
+    -------
+    dict
+        The number of existence 'queries' answered from the cache, the number
+        of directory 'scans' performed to answer them, and the number of 
+        'stats_avoided', i.e., queries less scans.
+    """
+    with _listing_cache_lock:
+        stats = dict(_listing_cache_stats)
+    stats['stats_avoided'] = stats['queries'] - stats['scans']
+    return stats
+
+def _get_listing(dirname):
+    """Get the basenames of the files in a directory from the listing cache, 
+    listing the directory if necessary. A missing directory has no files."""
+    now = time.monotonic()
+    with _listing_cache_lock:
+        _listing_cache_stats['queries'] += 1
+        entry = _listing_cache.get(dirname)
+        if entry is not None and (_listing_cache_ttl is None or now - entry[0] < _listing_cache_ttl):
+            return entry[1]
+    
+    try:
+        with os.scandir(dirname) as it:
+            names = frozenset(e.name for e in it if e.is_file())
+    except (FileNotFoundError, NotADirectoryError):
+        names = frozenset()
+
+    with _listing_cache_lock:
+        _listing_cache[dirname] = (now, names)
+        _listing_cache_stats['scans'] += 1
+    return names
+
+def file_exists(fn):
+    """Whether a file exists, like os.path.isfile. If the directory listing
+    cache is enabled (see enable_listing_cache), answered from the cached
+    listing of the file's directory.
+
+    Parameters
+    ----------
+    fn : path-like
+        Filename.
+
+    Returns
+    -------
+    bool
+        Whether fn exists and is a file.
+    """
+    if not _listing_cache_enabled:
+        return os.path.isfile(fn)
+    dirname, basename = os.path.split(os.path.abspath(fn))
+    return basename in _get_listing(dirname)
+
+# the keyword arguments of enmap.read_map that select a region of the map 
+# after the data (or a proxy for it) is opened, see enmap.read_helper
+READ_HELPER_KWARGS = ('sel', 'box', 'pixbox', 'geometry', 'wrap', 'mode', 'recenter')
+
+class _ComponentProxy:
+
+    def __init__(self, proxy, comps):
+        """A proxy for the components of a map proxy (e.g. from 
+        enmap.read_map(..., delayed=True)), such that reading a region of
+        the components only reads that region of those components.
+
+        Parameters
+        ----------
+        proxy : enmap.ndmap_proxy or enmap.ndmap
+            The map proxy.
+        comps : int or slice, or tuple of int or slice
+            Indices into the leading non-pixel axes of the map.
+        """
+        if not isinstance(comps, tuple):
+            comps = (comps,)
+        self.proxy = proxy
+        self.comps = comps
+        self.wcs = proxy.wcs
+        self.dtype = proxy.dtype
+        self.shape = np.empty(proxy.shape[:-2], dtype=bool)[comps].shape + \
+            tuple(proxy.shape[-2:])
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __getitem__(self, sel):
+        pre_sel, pix_sel = pixell_utils.split_slice(sel, [self.ndim - 2, 2])
+        res = self.proxy[self.comps + (Ellipsis,) + tuple(pix_sel)]
+        if any(s != slice(None) for s in pre_sel):
+            res = res[tuple(pre_sel) + (slice(None), slice(None))]
+        return res
+
+def read_map_region(fname, comps=None, mmap=False, **read_map_kwargs):
+    """Read some components and/or a region of a map from disk, reading only
+    that part of the map (if possible) rather than the whole map.
+
+    Parameters
+    ----------
+    fname : path-like
+        The map filename.
+    comps : int or slice, or tuple of int or slice, optional
+        Indices into the leading non-pixel axes of the map, e.g. 0 for only the
+        T component of a (3, ny, nx) map, by default None (all components).
+    mmap : bool, optional
+        Read from a memory map of the file (see read_map_mmap), by default
+        False. If no region is selected, the read-only memory-mapped map is 
+        returned.
+    read_map_kwargs : dict, optional
+        Any keyword arguments to pass to enmap.read_map, e.g. box or pixbox to
+        select a region. If mmap, only 'hdu' and the region-selecting keyword
+        arguments are supported.
+
+    Returns
+    -------
+    enmap.ndmap
+        The requested part of the map.
+
+    Raises
+    ------
+    ValueError
+        If mmap and read_map_kwargs contains an unsupported keyword argument.
+
+    Notes
+    -----
+    For uncompressed fits files, enmap.read_map already reads only the
+    rows of a box or pixbox, and only the components selected by sel if no
+    box or pixbox is given. This extends the latter to the case where both
+    components and a region are selected.
+    """
+    helper_kwargs = {
+        k: read_map_kwargs.pop(k) for k in READ_HELPER_KWARGS if k in read_map_kwargs
+        }
+
+    if mmap:
+        unsupported = set(read_map_kwargs) - {'hdu'}
+        if unsupported:
+            raise ValueError(
+                f'read_map_kwargs {sorted(unsupported)} not supported if mmap'
+                )
+        data = read_map_mmap(fname, **read_map_kwargs)
+        if comps is not None:
+            data = data[comps if isinstance(comps, tuple) else (comps,)]
+        if not helper_kwargs:
+            return data
+    elif comps is None:
+        return enmap.read_map(fname, **read_map_kwargs, **helper_kwargs)
+    else:
+        data = _ComponentProxy(
+            enmap.read_map(fname, delayed=True, **read_map_kwargs), comps
+            )
+    
+    return enmap.read_helper(data, **helper_kwargs)
+
+def read_map_mmap(fname, hdu=None):
+    """Read an enmap from a fits file as a memory map of the file, rather than
+    into memory. Only the pages of the file backing the parts of the map that
+    are accessed are read from disk, and those pages are shared in the page
+    cache by all processes mapping the same file.
+
+    Parameters
+    ----------
+    fname : path-like
+        The fits filename.
+    hdu : int, optional
+        The HDU of the image, by default 0.
+
+    Returns
+    -------
+    enmap.ndmap
+        The read-only map, with the wcs read from the header (as in 
+        enmap.read_map). Its data has the byte order of the file, i.e.,
+        big-endian.
+
+    Raises
+    ------
+    ValueError
+        If the HDU is not an uncompressed image with at least 2 axes, or its
+        data is scaled (BSCALE/BZERO) or in the IAU polarization convention, so
+        it cannot be memory mapped as-is.
+    """
+    # import here, since astropy is only needed for this function
+    from astropy.io import fits
+    if hdu is None:
+        hdu = 0
+
+    # closing the file does not unmap the data: the memory map holds its own
+    # file descriptor, which is released once the array is freed
+    with fits.open(fname, memmap=True, mode='readonly') as hdul:
+        hdu = hdul[hdu]
+        if not isinstance(hdu, (fits.PrimaryHDU, fits.ImageHDU)):
+            raise ValueError(f'{fname} is not an uncompressed fits image, cannot mmap')
+        if hdu.header['NAXIS'] < 2:
+            raise ValueError(f'{fname} is not an enmap (only {hdu.header["NAXIS"]} axes)')
+        if hdu.header.get('BSCALE', 1) != 1 or hdu.header.get('BZERO', 0) != 0:
+            raise ValueError(f'{fname} has scaled data, cannot mmap')
+        
+        # enmap.read_map flips the sign of U for maps in the IAU convention,
+        # which cannot be done to a read-only memory map
+        if np.any(enmap.get_stokes_flips(hdu) >= 0):
+            raise ValueError(f'{fname} needs a Stokes convention flip, cannot mmap')
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            wcs = wcsutils.WCS(hdu.header).sub(2)
+        
+        data = hdu.data
+    
+    data.flags.writeable = False
+    return enmap.ndmap(data, wcs)
+
+# opt-in process-wide cache of arrays parsed by np.loadtxt, as .npy sidecar
+# files in this directory (None if disabled)
+_loadtxt_cache_dir = None
+
+def enable_loadtxt_cache(cache_dir=None):
+    """Cache the arrays parsed from text products (e.g. beams, transfer 
+    functions and catalogs) by loadtxt as binary .npy sidecar files, such 
+    that later reads of the same file (with the same loadtxt keyword 
+    arguments) only load the binary array. Sidecars are written atomically,
+    so the cache directory may be shared by concurrent processes.
+
+    Parameters
+    ----------
+    cache_dir : path-like, optional
+        Directory in which to store the sidecar files, by default the
+        'loadtxt' subdirectory of the sofind cache directory (see
+        get_cache_dir).
+
+    Notes
+    -----
+    While enabled, loadtxt returns read-only, memory-mapped arrays. A 
+    sidecar is keyed by the source file's path, mtime and size, so is not
+    used once the source file is modified; stale sidecars are not removed.
+    """
+    global _loadtxt_cache_dir
+    if cache_dir is None:
+        cache_dir = get_cache_dir('loadtxt')
+    _loadtxt_cache_dir = os.fspath(cache_dir)
+
+def disable_loadtxt_cache():
+    """Stop using the loadtxt sidecar cache (see enable_loadtxt_cache). 
+    Existing sidecar files are left on disk."""
+    global _loadtxt_cache_dir
+    _loadtxt_cache_dir = None
+
+def loadtxt(fname, **loadtxt_kwargs):
+    """Read a text file with np.loadtxt, or if the loadtxt cache is enabled
+    (see enable_loadtxt_cache), from its binary sidecar file, if it exists.
+
+    Parameters
+    ----------
+    fname : path-like
+        The text filename.
+    loadtxt_kwargs : dict, optional
+        Any keyword arguments to pass to np.loadtxt.
+
+    Returns
+    -------
+    np.ndarray
+        The array. If the loadtxt cache is enabled, read-only and 
+        C-contiguous.
+    """
+    cache_dir = _loadtxt_cache_dir
+    if cache_dir is None:
+        return np.loadtxt(fname, **loadtxt_kwargs)
+
+    fname = os.path.abspath(fname)
+    kwargs_key = make_key(loadtxt_kwargs)
+    if kwargs_key is None:
+        return np.loadtxt(fname, **loadtxt_kwargs)
+    signature = get_file_signature(fname)
+    digest = hashlib.sha1(repr((signature, kwargs_key)).encode()).hexdigest()
+    sidecar_fn = os.path.join(
+        cache_dir, f'{os.path.basename(fname)}_{digest[:16]}.npy'
+        )
+
+    try:
+        return np.load(sidecar_fn, mmap_mode='r')
+    except (OSError, ValueError):
+        # missing or unreadable sidecar is just a cache miss
+        pass
+
+    arr = np.loadtxt(fname, **loadtxt_kwargs)
+    if arr.dtype.hasobject:
+        return arr
+    
+    # e.g. if unpack, np.loadtxt returns a transposed view. store the array
+    # as it is indexed, so that each row of the sidecar is contiguous
+    arr = np.ascontiguousarray(arr)
+    
+    try:
+        atomic_write(sidecar_fn, lambda f: np.save(f, arr))
+    except OSError:
+        # e.g., read-only cache directory
+        pass
+    
+    arr.flags.writeable = False
+    return arr
+
+def iter_prefetch(func, items, prefetch=1):
+    """Iterate over func(item) for each item in items, while computing the
+    results for the next prefetch items on background threads. Useful for 
+    overlapping reading the next products from disk with processing the
+    current one.
+
+    Parameters
+    ----------
+    func : callable
+        Function of one item, e.g. a filename.
+    items : iterable
+        The items.
+    prefetch : int, optional
+        Number of results to compute ahead of the one being consumed, by
+        default 1. If 0, results are computed serially, on demand.
+
+    Yields
+    ------
+    any
+        func(item), in the order of items.
+
+    Notes
+    -----
+    The generator holds at most prefetch + 1 results at once (the one being
+    consumed and those being computed ahead); the next one is submitted only
+    once the consumer asks for another result. A consumer still referring to
+    the previous result while asking for the next holds one more: in a plain
+    for loop, the loop variable keeps it alive until it is rebound, so up to
+    prefetch + 2 results exist at once unless it is deleted at the end of
+    each iteration. If iteration stops early (the generator is closed or
+    garbage collected, e.g. if the loop consuming it breaks), results not
+    yet started are cancelled and those in progress are waited on, so no
+    threads outlive the generator.
+    """
+    if prefetch < 1:
+        for item in items:
+            yield func(item)
+        return
+    
+    items = iter(items)
+    futures = deque()
+    executor = ThreadPoolExecutor(
+        max_workers=prefetch, thread_name_prefix='sofind-prefetch'
+        )
+    try:
+        for item in items:
+            futures.append(executor.submit(func, item))
+            if len(futures) > prefetch:
+                break
+        while futures:
+            result = futures.popleft().result()
+            yield result
+            del result
+            for item in items:
+                futures.append(executor.submit(func, item))
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
 def get_protected_fn(*fns, no_fn_collisions=True, write_to_fn_idx=None):
     """Get one filename from a list of filenames, with restrictions on whether
     all or None of the possibilities exist.
@@ -166,12 +1119,17 @@ def get_protected_fn(*fns, no_fn_collisions=True, write_to_fn_idx=None):
             fns exists.
     FileNotFoundError
         If write_to_fn_idx is not supplied and none of fns exists.
+
+    Notes
+    -----
+    Existence is checked with file_exists, so may be answered from the
+    directory listing cache (see enable_listing_cache).
     """
     fns = list(fns)
 
     if write_to_fn_idx is not None:
         write_fn = fns.pop(write_to_fn_idx)
-        fns_exists = np.array([os.path.isfile(f) for f in fns])
+        fns_exists = np.array([file_exists(f) for f in fns])
         num_exists = fns_exists.sum()
 
         if no_fn_collisions and num_exists > 0:
@@ -183,7 +1141,7 @@ def get_protected_fn(*fns, no_fn_collisions=True, write_to_fn_idx=None):
             return write_fn
 
     else:
-        fns_exists = np.array([os.path.isfile(f) for f in fns])
+        fns_exists = np.array([file_exists(f) for f in fns])
         num_exists = fns_exists.sum()         
         
         err_str = '\n'.join(fns) 
@@ -200,6 +1158,96 @@ def get_protected_fn(*fns, no_fn_collisions=True, write_to_fn_idx=None):
         out_idx = np.min(np.where(fns_exists)[0])
         return fns[out_idx]
 
+def to_tuple(obj):
+    """Return obj as a tuple. Strings and other non-iterables are wrapped in a
+    1-tuple, while other iterables are converted to a tuple of their items.
+
+    Parameters
+    ----------
+    obj : any
+        E.g., a qid or a list of qids.
+
+    Returns
+    -------
+    tuple
+        The tuple.
+    """
+    if isinstance(obj, (str, bytes)):
+        return (obj,)
+    try:
+        return tuple(obj)
+    except TypeError:
+        return (obj,)
+
+def interp_rows(x, xps, fps, left=None, right=None):
+    """Linearly interpolate several 1d functions, each sampled on its own
+    grid, onto a common grid in one vectorized pass. Equivalent to stacking
+    np.interp(x, xp, fp) for each xp, fp pair.
+
+    Parameters
+    ----------
+    x : (nx,) array-like
+        The common points at which to evaluate the functions.
+    xps : iterable of 1d array-like
+        The sample points of each function. Each must be increasing, but
+        they may have different lengths.
+    fps : iterable of 1d array-like
+        The sampled values of each function, each the same length as the
+        corresponding entry of xps.
+    left : float, optional
+        Value to return for x below a function's first sample point, by
+        default that function's first sampled value.
+    right : float, optional
+        Value to return for x above a function's last sample point, by
+        default that function's last sampled value.
+
+    Returns
+    -------
+    (nfunc, nx) np.ndarray
+        The interpolated functions.
+
+    Notes
+    -----
+    The functions are concatenated into a single increasing grid by 
+    offsetting each one's sample points past the previous one's, such that
+    only one call to np.interp is needed. The offsets round the points that
+    are not integers, so the result matches np.interp only up to floating 
+    point precision, unless x and xps are integer-valued (e.g. multipoles).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    xps = [np.asarray(xp, dtype=np.float64) for xp in xps]
+    fps = [np.asarray(fp) for fp in fps]
+    assert x.ndim == 1, 'x must be 1d'
+    assert len(xps) == len(fps), 'xps and fps must have the same length'
+    for xp, fp in zip(xps, fps):
+        assert xp.ndim == 1 and xp.shape == fp.shape and xp.size > 0, \
+            'Each xp, fp pair must be 1d, the same length, and non-empty'
+
+    nfunc = len(xps)
+    if nfunc == 0:
+        return np.empty((0, x.size), dtype=np.float64)
+
+    lo = np.array([xp[0] for xp in xps])[:, None]
+    hi = np.array([xp[-1] for xp in xps])[:, None]
+
+    # each function occupies its own [offset, offset + width) interval.
+    # queries are clipped to each function's range, which reproduces the
+    # edge values of np.interp and keeps them within their own interval
+    start = min(x.min(initial=np.inf), lo.min())
+    width = max(x.max(initial=-np.inf), hi.max()) - start + 1
+    offsets = np.arange(nfunc)[:, None] * width - start
+
+    xq = np.clip(x, lo, hi) + offsets
+    xcat = np.concatenate([xp + offset for xp, offset in zip(xps, offsets[:, 0])])
+    fcat = np.concatenate(fps)
+    out = np.interp(xq.ravel(), xcat, fcat).reshape(nfunc, x.size)
+
+    if left is not None:
+        out[x < lo] = left
+    if right is not None:
+        out[x > hi] = right
+    return out
+
 # This creates a mapping between Product subclasses and their product tag
 def get_producttag(product):
     """Return product.split('.')[-1]"""
@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+# products resolve their on-disk directories for this system
+os.environ.setdefault('SOFIND_SYSTEM', 'della')
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep anything sofind caches on disk inside the test's tmp_path."""
+    cache_dir = tmp_path / 'sofind_cache'
+    monkeypatch.setenv('SOFIND_CACHE_DIR', str(cache_dir))
+    return cache_dir
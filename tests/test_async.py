@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from pixell import enmap
+
+from sofind import DataModel
+
+QIDS = ('pa5a', 'pa5b', 'pa6a')
+
+
+@pytest.fixture
+def dm(tmp_path):
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    dm.get_subproduct_path = lambda *args, **kwargs: str(tmp_path)
+    shape, wcs = enmap.fullsky_geometry(res=np.radians(4))
+    rng = np.random.default_rng(0)
+    for qid in QIDS:
+        enmap.write_map(
+            dm.get_map_fn(qid), enmap.ndmap(rng.standard_normal(shape), wcs)
+            )
+    np.savetxt(dm.get_catalog_fn('catalog.csv', subproduct='inpaint_catalogs'),
+               rng.uniform(0, 10, (20, 3)), delimiter=',')
+    return dm
+
+
+def test_async_method_metadata():
+    assert DataModel.aread_map.__name__ == 'aread_map'
+    assert DataModel.aread_map.__qualname__.endswith('.aread_map')
+    assert 'Async counterpart of read_map' in DataModel.aread_map.__doc__
+    assert asyncio.iscoroutinefunction(DataModel.aread_map)
+
+
+def test_gather_matches_sync(dm):
+    async def gather():
+        return await asyncio.gather(
+            *[dm.aread_map(qid) for qid in QIDS],
+            dm.aread_maps(QIDS),
+            dm.aread_catalog('catalog.csv', subproduct='inpaint_catalogs'),
+            dm.aread_catalog_columns('catalog.csv', columns=2, 
+                                     where=[(2, '>', 5)],
+                                     subproduct='inpaint_catalogs'),
+            dm.aread_tf('pa5a', subproduct='dummy'),
+            dm.aeval_tf(QIDS, [2, 100], subproduct='dummy'),
+            dm.aread_calibration('pa5a', subproduct='dummy'),
+            )
+    
+    *maps, stacked, catalog, columns, tf, tfs, cal = asyncio.run(gather())
+    for qid, omap in zip(QIDS, maps):
+        np.testing.assert_array_equal(omap, dm.read_map(qid))
+    np.testing.assert_array_equal(stacked, dm.read_maps(QIDS))
+    np.testing.assert_array_equal(
+        catalog, dm.read_catalog('catalog.csv', subproduct='inpaint_catalogs')
+        )
+    np.testing.assert_array_equal(
+        columns, dm.read_catalog_columns('catalog.csv', columns=2, 
+                                         where=[(2, '>', 5)],
+                                         subproduct='inpaint_catalogs')
+        )
+    np.testing.assert_array_equal(tf, dm.read_tf('pa5a', subproduct='dummy'))
+    np.testing.assert_array_equal(
+        tfs, dm.eval_tf(QIDS, [2, 100], subproduct='dummy')
+        )
+    assert cal == dm.read_calibration('pa5a', subproduct='dummy')
+
+
+def test_async_exceptions_propagate(dm):
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(dm.aread_map('pa6b'))
+
+
+def test_cancel_queued_reads(dm):
+    dm.set_async_max_workers(1)
+    started = []
+    release = threading.Event()
+    read_map = dm._read_map
+
+    def blocking_read_map(fn, **kwargs):
+        started.append(fn)
+        if len(started) == 1:
+            release.wait(10)
+        return read_map(fn, **kwargs)
+    dm._read_map = blocking_read_map
+
+    async def main():
+        first = asyncio.ensure_future(dm.aread_map('pa5a'))
+        queued = [asyncio.ensure_future(dm.aread_map(qid)) for qid in QIDS[1:]]
+        # let the tasks submit their reads; only the first may start
+        while not started:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        for task in queued:
+            task.cancel()
+        release.set()
+        
+        omap = await first
+        results = await asyncio.gather(*queued, return_exceptions=True)
+        
+        # give any read that was not cancelled the chance to start
+        await dm.run_async(lambda: None)
+        return omap, results, list(started)
+    
+    omap, results, started = asyncio.run(main())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    # the queued reads never ran
+    assert started == [dm.get_map_fn('pa5a')]
+    dm._read_map = read_map
+    np.testing.assert_array_equal(omap, dm.read_map('pa5a'))
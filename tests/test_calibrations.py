@@ -0,0 +1,100 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from sofind import DataModel, utils
+
+QIDS = ('pa5a', 'pa5b', 'pa6a')
+SPLITS = ('el1', 'el2', 'el3')
+
+
+def write_cals(fn, offset=0.):
+    d = {}
+    for i, array in enumerate(['pa4', 'pa5', 'pa6']):
+        for j, freq in enumerate(['f090', 'f150', 'f220']):
+            d[f'dr6_{array}_{freq}'] = {
+                'calibs': [offset + 100*i + 10*j + k for k in range(3)]
+                }
+    with open(fn, 'wb') as f:
+        pickle.dump(d, f)
+
+
+@pytest.fixture
+def dm(tmp_path):
+    dm = DataModel.from_config('act_dr6.02_noise', use_bundle=False)
+    dm.get_subproduct_path = lambda *args, **kwargs: str(tmp_path)
+    write_cals(dm.get_calibration_fn('pa5a', subproduct='el_split'))
+    return dm
+
+
+def test_read_calibration(dm):
+    assert dm.read_calibration(
+        'pa5b', subproduct='el_split', el_split='el3'
+        ) == 112
+    assert dm.read_calibration(
+        'pa6a', subproduct='el_split', el_split='el1'
+        ) == 200
+    with pytest.raises(ValueError):
+        dm.read_calibration('pa6a', subproduct='el_split', el_split='el4')
+    with pytest.raises(AssertionError):
+        dm.read_calibration('pa6a', subproduct='el_split')
+
+
+def test_read_calibrations(dm):
+    cals = dm.read_calibrations(QIDS, subproduct='el_split',
+                                el_split=SPLITS)
+    assert cals.shape == (len(SPLITS), len(QIDS))
+    for i, el_split in enumerate(SPLITS):
+        for j, qid in enumerate(QIDS):
+            assert cals[i, j] == dm.read_calibration(
+                qid, subproduct='el_split', el_split=el_split
+                )
+    np.testing.assert_array_equal(
+        dm.read_calibrations(QIDS, subproduct='dummy', el_split=SPLITS),
+        np.ones((3, 3))
+        )
+
+
+def test_calibration_table_modified(dm, monkeypatch):
+    fn = dm.get_calibration_fn('pa5a', subproduct='el_split')
+    assert dm.read_calibration(
+        'pa5a', subproduct='el_split', el_split='el1'
+        ) == 100
+
+    # a rewritten file is picked up on the next call
+    write_cals(fn, offset=1000.)
+    st = os.stat(fn)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert dm.read_calibration(
+        'pa5a', subproduct='el_split', el_split='el1'
+        ) == 1100
+
+    # read_calibrations checks each file once per call
+    nstat = 0
+    get_file_signature = utils.get_file_signature
+    def counting_get_file_signature(fname):
+        nonlocal nstat
+        nstat += 1
+        return get_file_signature(fname)
+    monkeypatch.setattr(utils, 'get_file_signature', counting_get_file_signature)
+
+    cals = dm.read_calibrations(QIDS, subproduct='el_split', el_split=SPLITS)
+    assert cals[0, 0] == 1100
+    assert nstat == 1
+
+
+def test_calibration_table_refresh(dm):
+    fn = dm.get_calibration_fn('pa5a', subproduct='el_split')
+    table = dm.get_calibration_table(fn)
+    assert dm.get_calibration_table(fn) is table
+
+    # refresh re-reads even an unmodified file
+    refreshed = dm.get_calibration_table(fn, refresh=True)
+    assert refreshed is not table and refreshed == table
+    assert dm.get_calibration_table(fn) is refreshed
+    assert dm.read_calibrations(
+        QIDS, subproduct='el_split', el_split=SPLITS, refresh=True
+        )[0, 0] == 100
+    assert dm.get_calibration_table(fn) is not refreshed
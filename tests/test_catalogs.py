@@ -0,0 +1,265 @@
+import os
+
+import numpy as np
+import pytest
+
+from sofind import DataModel, utils
+
+SUBPRODUCT = 'inpaint_catalogs'
+CAT_FN = 'catalog.csv'
+
+
+def write_catalog(fn, ra, dec, *columns):
+    np.savetxt(fn, np.array([ra, dec, *columns]).T, delimiter=',')
+
+
+@pytest.fixture
+def dm(tmp_path):
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    dm.get_subproduct_path = lambda *args, **kwargs: str(tmp_path)
+    return dm
+
+
+@pytest.fixture
+def catalog(dm):
+    """A random catalog, (ra, dec, snr) in degrees, written to CAT_FN."""
+    rng = np.random.default_rng(0)
+    n = 2000
+    ra = rng.uniform(0, 360, n)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    snr = rng.uniform(0, 20, n)
+    write_catalog(
+        dm.get_catalog_fn(CAT_FN, subproduct=SUBPRODUCT), ra, dec, snr
+        )
+    return np.array([ra, dec, snr])
+
+
+def test_catalog_table(dm, catalog, cache_dir):
+    fn = dm.get_catalog_fn(CAT_FN, subproduct=SUBPRODUCT)
+    table = dm.get_catalog_table(fn)
+    np.testing.assert_allclose(table, catalog, rtol=1e-15)
+    assert not table.flags.writeable
+    assert table.flags.c_contiguous
+    assert dm.get_catalog_table(fn) is table
+
+    # reading a catalog writes nothing to disk unless the loadtxt cache is on
+    assert not os.path.exists(cache_dir)
+
+
+def test_catalog_table_loadtxt_cache(dm, catalog, tmp_path):
+    utils.enable_loadtxt_cache(tmp_path / 'loadtxt')
+    try:
+        fn = dm.get_catalog_fn(CAT_FN, subproduct=SUBPRODUCT)
+        table = dm.get_catalog_table(fn)
+        np.testing.assert_allclose(table, catalog, rtol=1e-15)
+        assert not table.flags.writeable
+        assert len(os.listdir(tmp_path / 'loadtxt')) == 1
+    finally:
+        utils.disable_loadtxt_cache()
+
+
+def test_catalog_table_modified(dm, catalog):
+    fn = dm.get_catalog_fn(CAT_FN, subproduct=SUBPRODUCT)
+    dm.get_catalog_table(fn)
+    write_catalog(fn, [1., 2.], [3., 4.], [5., 6.])
+    st = os.stat(fn)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    np.testing.assert_array_equal(
+        dm.get_catalog_table(fn), [[1., 2.], [3., 4.], [5., 6.]]
+        )
+
+
+def test_read_catalog_columns(dm, catalog):
+    ra, dec, snr = catalog
+    np.testing.assert_allclose(
+        dm.read_catalog(CAT_FN, subproduct=SUBPRODUCT),
+        np.radians([dec, ra]), rtol=1e-15
+        )
+
+    where = [(2, '>', 5), (1, '<=', 10)]
+    mask = (snr > 5) & (dec <= 10)
+    out = dm.read_catalog_columns(
+        CAT_FN, columns=[2, 0], where=where, subproduct=SUBPRODUCT
+        )
+    np.testing.assert_allclose(out, [snr[mask], ra[mask]], rtol=1e-15)
+    np.testing.assert_allclose(
+        dm.read_catalog(CAT_FN, where=where, subproduct=SUBPRODUCT),
+        np.radians([dec[mask], ra[mask]]), rtol=1e-15
+        )
+    assert dm.read_catalog_columns(
+        CAT_FN, columns=1, subproduct=SUBPRODUCT
+        ).shape == (1, ra.size)
+
+    with pytest.raises(ValueError, match='Unsupported operator'):
+        dm.read_catalog_columns(CAT_FN, where=[(2, '~', 5)],
+                                subproduct=SUBPRODUCT)
+
+
+def angular_distance(dec0, ra0, dec1, ra1):
+    cos = (np.sin(dec0) * np.sin(dec1)
+           + np.cos(dec0) * np.cos(dec1) * np.cos(ra1 - ra0))
+    return np.arccos(np.clip(cos, -1, 1))
+
+
+@pytest.mark.parametrize('ra, dec, radius', [
+    (10, 0, 5), (359, 20, 10), (0, 89, 3), (120, -45, 60), (200, 10, 200)
+    ])
+def test_query_cone(dm, catalog, ra, dec, radius):
+    ra, dec, radius = np.radians([ra, dec, radius])
+    idxs = dm.query_cone(CAT_FN, ra, dec, radius, subproduct=SUBPRODUCT)
+    dist = angular_distance(dec, ra, *np.radians(catalog[[1, 0]]))
+    np.testing.assert_array_equal(idxs, np.nonzero(dist <= radius)[0])
+
+
+def in_box(catalog, dec0, dec1, ra_lo, ra_hi):
+    """Brute-force box membership, for RA in the interval [ra_lo, ra_hi]
+    (in degrees) taken modulo 360."""
+    ra, dec = catalog[0], catalog[1]
+    ra = ra_lo + np.mod(ra - ra_lo, 360)
+    return np.nonzero((dec >= dec0) & (dec <= dec1) & (ra <= ra_hi))[0]
+
+
+@pytest.mark.parametrize('box', [
+    [[-10, 40], [-5, 30]], # as in pixell, RA decreasing
+    [[-10, 30], [-5, 40]],
+    [[20, 100], [60, 300]], # wider than 180 degrees in RA
+    [[-90, 0], [90, 360]],
+    ])
+def test_query_box(dm, catalog, box):
+    idxs = dm.query_box(CAT_FN, np.radians(box), subproduct=SUBPRODUCT)
+    (dec0, ra0), (dec1, ra1) = box
+    expected = in_box(catalog, min(dec0, dec1), max(dec0, dec1),
+                      min(ra0, ra1), max(ra0, ra1))
+    np.testing.assert_array_equal(idxs, expected)
+
+
+def test_query_box_wraps_through_zero(dm, catalog):
+    # RA from 10 to -10 degrees crosses RA = 0
+    idxs = dm.query_box(CAT_FN, np.radians([[-30, 10], [30, -10]]),
+                        subproduct=SUBPRODUCT)
+    expected = in_box(catalog, -30, 30, -10, 10)
+    assert expected.size > 0
+    np.testing.assert_array_equal(idxs, expected)
+    ra = catalog[0][idxs]
+    assert np.all((ra <= 10) | (ra >= 350))
+
+    # the same with RA beyond 360 degrees
+    np.testing.assert_array_equal(
+        dm.query_box(CAT_FN, np.radians([[-30, 350], [30, 370]]),
+                     subproduct=SUBPRODUCT),
+        expected
+        )
+
+    # whereas RA from 350 to 10 degrees is the interval in between
+    idxs = dm.query_box(CAT_FN, np.radians([[-30, 350], [30, 10]]),
+                        subproduct=SUBPRODUCT)
+    np.testing.assert_array_equal(idxs, in_box(catalog, -30, 30, 10, 350))
+
+
+def brute_force_crossmatch(dec_a, ra_a, dec_b, ra_b, radius):
+    dist = angular_distance(dec_a[:, None], ra_a[:, None], dec_b, ra_b)
+    idxs = np.argmin(dist, axis=1)
+    seps = dist[np.arange(dec_a.size), idxs]
+    return np.where(seps <= radius, idxs, -1), np.where(seps <= radius, seps, np.inf)
+
+
+def test_crossmatch_catalogs(dm, catalog):
+    rng = np.random.default_rng(1)
+    dec_b, ra_b = np.radians(catalog[[1, 0]])
+
+    # perturbed copies of some sources, and some random points
+    n = 300
+    sel = rng.choice(dec_b.size, n, replace=False)
+    dec_a = np.clip(dec_b[sel] + rng.normal(0, 1e-3, n), -np.pi/2, np.pi/2)
+    ra_a = ra_b[sel] + rng.normal(0, 1e-3, n)
+    dec_a = np.append(dec_a, np.arcsin(rng.uniform(-1, 1, 100)))
+    ra_a = np.append(ra_a, rng.uniform(0, 2*np.pi, 100))
+    radius = np.radians(0.2)
+    expected_idxs, expected_seps = brute_force_crossmatch(
+        dec_a, ra_a, dec_b, ra_b, radius
+        )
+    assert np.any(expected_idxs == -1) and np.mean(expected_idxs[:n] == sel) > 0.9
+
+    # the second catalog from a file (using its spatial index) or an array
+    for cat_b in [CAT_FN, np.array([dec_b, ra_b])]:
+        idxs, seps = dm.crossmatch_catalogs(
+            np.array([dec_a, ra_a]), cat_b, radius, subproduct=SUBPRODUCT
+            )
+        np.testing.assert_array_equal(idxs, expected_idxs)
+        assert np.all(np.isinf(seps[idxs == -1]))
+        np.testing.assert_allclose(
+            seps[idxs >= 0], expected_seps[idxs >= 0], rtol=1e-6, atol=1e-12
+            )
+
+
+def test_crossmatch_catalog_with_itself(dm, catalog):
+    idxs, seps = dm.crossmatch_catalogs(CAT_FN, CAT_FN, np.radians(1/60),
+                                        subproduct=SUBPRODUCT)
+    np.testing.assert_array_equal(idxs, np.arange(catalog.shape[1]))
+    np.testing.assert_array_equal(seps, 0)
+
+
+def test_catalog_pixels(dm, catalog):
+    from pixell import enmap
+
+    shape, wcs = enmap.band_geometry(np.radians([-40, 20]), res=np.radians(0.5))
+    idxs, pix = dm.catalog_pixels(CAT_FN, (3, *shape), wcs,
+                                  subproduct=SUBPRODUCT)
+    assert not idxs.flags.writeable and not pix.flags.writeable
+    dec, ra = np.radians(catalog[[1, 0]])
+    expected = enmap.sky2pix(shape, wcs, [dec, ra], safe=True)
+    ipix = np.floor(expected + 0.5)
+    in_geometry = np.all((ipix >= 0) & (ipix < np.array(shape)[:, None]), 0)
+    np.testing.assert_array_equal(idxs, np.nonzero(in_geometry)[0])
+    np.testing.assert_allclose(pix, expected[:, idxs])
+
+    # cached per geometry
+    assert dm.catalog_pixels(CAT_FN, shape, wcs, subproduct=SUBPRODUCT)[0] is idxs
+
+
+def test_catalog_pixels_half_pixel(dm):
+    # sources exactly half a pixel outside the first and last rows of pixel
+    # centers: the first rounds up into the geometry, the last out of it
+    from pixell import enmap
+
+    # an odd number of rows, so that np.round (half to even) would round the
+    # last source into the geometry
+    shape, wcs = enmap.geometry(
+        np.radians([[-5, 5], [5, -5]]), res=np.radians(1), proj='car'
+        )
+    shape, wcs = enmap.zeros(shape, wcs)[:-1].geometry
+    assert shape[0] % 2 == 1
+    pix = np.array([[-0.5, shape[0] - 0.5], [2., 2.]])
+    dec, ra = np.degrees(enmap.pix2sky(shape, wcs, pix))
+    fn = dm.get_catalog_fn(CAT_FN, subproduct=SUBPRODUCT)
+    write_catalog(fn, ra, dec)
+
+    idxs, opix = dm.catalog_pixels(CAT_FN, shape, wcs, subproduct=SUBPRODUCT)
+    np.testing.assert_array_equal(idxs, [0])
+    np.testing.assert_allclose(opix[0], [-0.5], atol=1e-8)
+
+
+def test_catalog_pixels_cache(dm, catalog, monkeypatch):
+    from pixell import enmap
+
+    monkeypatch.setattr(dm, 'catalog_pixels_cache_size', 2)
+    geometries = [enmap.fullsky_geometry(res=np.radians(res))
+                  for res in [1, 2, 3]]
+    for shape, wcs in geometries:
+        dm.catalog_pixels(CAT_FN, shape, wcs, subproduct=SUBPRODUCT)
+    assert len(dm._catalog_pixels) == 2
+
+    # the least-recently used geometry is evicted
+    shape, wcs = geometries[0]
+    idxs, _ = dm.catalog_pixels(CAT_FN, shape, wcs, subproduct=SUBPRODUCT)
+    assert len(dm._catalog_pixels) == 2
+    assert dm.catalog_pixels(CAT_FN, shape, wcs, subproduct=SUBPRODUCT)[0] is idxs
+
+    # a modified file gets a new entry, so stale ones are eventually evicted
+    fn = dm.get_catalog_fn(CAT_FN, subproduct=SUBPRODUCT)
+    write_catalog(fn, [10.], [0.])
+    st = os.stat(fn)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    idxs, _ = dm.catalog_pixels(CAT_FN, shape, wcs, subproduct=SUBPRODUCT)
+    np.testing.assert_array_equal(idxs, [0])
+    assert len(dm._catalog_pixels) == 2
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from sofind import DataModel, utils
+
+
+@pytest.fixture
+def source_fn(tmp_path):
+    fn = tmp_path / 'source.yaml'
+    fn.write_text('a: 1\n')
+    return str(fn)
+
+
+def test_bundle_round_trip(tmp_path, source_fn):
+    bundle_fn = str(tmp_path / 'bundle.pkl')
+    signature = utils.get_file_signature(source_fn)
+    utils.write_config_bundle(bundle_fn, {'a': [1, 2]}, signature)
+    assert utils.read_config_bundle(bundle_fn) == {'a': [1, 2]}
+
+
+def test_bundle_invalidated_by_modified_source(tmp_path, source_fn):
+    bundle_fn = str(tmp_path / 'bundle.pkl')
+    signature = utils.get_file_signature(source_fn)
+    utils.write_config_bundle(bundle_fn, {'a': 1}, signature)
+
+    st = os.stat(source_fn)
+    os.utime(source_fn, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert utils.read_config_bundle(bundle_fn) is None
+
+
+def test_bundle_invalidated_by_removed_source(tmp_path, source_fn):
+    bundle_fn = str(tmp_path / 'bundle.pkl')
+    signature = utils.get_file_signature(source_fn)
+    utils.write_config_bundle(bundle_fn, {'a': 1}, signature)
+
+    os.remove(source_fn)
+    assert utils.read_config_bundle(bundle_fn) is None
+
+
+def test_bundle_missing_or_corrupt(tmp_path):
+    bundle_fn = tmp_path / 'bundle.pkl'
+    assert utils.read_config_bundle(str(bundle_fn)) is None
+
+    bundle_fn.write_bytes(b'not a pickle')
+    os.chmod(bundle_fn, 0o600)
+    assert utils.read_config_bundle(str(bundle_fn)) is None
+
+
+def test_bundle_writeable_by_others_not_loaded(tmp_path, source_fn):
+    bundle_fn = str(tmp_path / 'bundle.pkl')
+    signature = utils.get_file_signature(source_fn)
+    utils.write_config_bundle(bundle_fn, {'a': 1}, signature)
+
+    os.chmod(bundle_fn, 0o666)
+    assert utils.read_config_bundle(bundle_fn) is None
+
+
+def test_from_config_uses_bundle(cache_dir):
+    dm = DataModel.from_config('act_dr6v4')
+    bundle_fns = os.listdir(cache_dir / 'config_bundles')
+    assert len(bundle_fns) == 1
+
+    # loaded from the bundle
+    dm_bundle = DataModel.from_config('act_dr6v4')
+    assert dm_bundle.get_map_fn('pa5a') == dm.get_map_fn('pa5a')
+
+    dm_no_bundle = DataModel.from_config('act_dr6v4', use_bundle=False)
+    assert dm_no_bundle.get_map_fn('pa5a') == dm.get_map_fn('pa5a')
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from sofind import DataModel
+from sofind.products.products import FilenameParser
+
+
+@pytest.fixture(scope='module')
+def dm():
+    return DataModel.from_config('act_dr6v4', use_bundle=False)
+
+
+def test_parser_round_trip():
+    template = '{array}_{freq}_set{split_num}_{alm_str}{sim_num:04}.fits'
+    parser = FilenameParser(template)
+    kwargs = dict(array='pa5', freq='f090', split_num=3, alm_str='map',
+                  sim_num=12)
+    parsed_kwargs, qids = parser.parse(template.format(**kwargs))
+    assert parsed_kwargs == kwargs
+    assert qids == ()
+
+
+def test_parser_no_match():
+    parser = FilenameParser('{array}_set{split_num}.fits')
+    assert parser.parse('pa5_set0.txt') is None
+
+
+def test_parser_static_and_qid_kwargs():
+    parser = FilenameParser(
+        '{patch}_{array}_{freq}_{maptag}.fits', static_kwargs={'patch': 'dr6'},
+        qid_kwargs={
+            'pa5a': {'array': 'pa5', 'freq': 'f090'},
+            'pa5b': {'array': 'pa5', 'freq': 'f150'},
+        })
+    kwargs, qids = parser.parse('dr6_pa5_f150_ivar.fits')
+    assert kwargs == {'array': 'pa5', 'freq': 'f150', 'maptag': 'ivar'}
+    assert qids == ('pa5b',)
+    assert parser.parse('s19_pa5_f150_ivar.fits') is None
+
+
+def test_parser_rejects_attribute_fields():
+    with pytest.raises(ValueError):
+        FilenameParser('{a.b}.fits')
+
+
+@pytest.mark.parametrize('qid', ['pa4a', 'pa5a', 'pa5b', 'pa6b'])
+@pytest.mark.parametrize('split_num', [0, 3])
+def test_parse_map_fn_round_trip(dm, qid, split_num):
+    fn = dm.get_map_fn(qid, split_num=split_num, maptag='ivar')
+    parsed = dm.parse_fn('maps', 'default', fn)
+    assert parsed['template'] == 'split_map_file_template'
+    assert parsed['qid'] == qid
+    assert parsed['kwargs']['split_num'] == split_num
+    assert parsed['kwargs']['maptag'] == 'ivar'
+    template = dm.get_subproduct_dict('maps', 'default')[parsed['template']]
+    assert template.format(**parsed['kwargs']) == os.path.basename(fn)
+
+    assert dm.get_map_fn(
+        parsed['qid'], basename=True, **parsed['kwargs']
+        ) == os.path.basename(fn)
+
+
+def test_parse_fns(dm):
+    fns = [dm.get_map_fn('pa5a', split_num=i) for i in range(4)]
+    parsed = dm.parse_fns('maps', 'default', fns + ['not_a_map.fits'])
+    assert [parsed[fn]['kwargs']['split_num'] for fn in fns] == [0, 1, 2, 3]
+    assert parsed['not_a_map.fits'] is None
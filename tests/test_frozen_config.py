@@ -0,0 +1,71 @@
+import pickle
+
+import pytest
+
+from sofind import DataModel, utils
+
+
+@pytest.fixture(scope='module')
+def dm():
+    return DataModel.from_config('act_dr6v4', use_bundle=False)
+
+
+def test_freeze_thaw_round_trip():
+    obj = {'a': [1, {'b': [2, 3]}], 'c': 'str', 'd': None}
+    frozen = utils.freeze(obj)
+    assert isinstance(frozen, utils.FrozenDict)
+    assert frozen['a'] == (1, utils.FrozenDict({'b': (2, 3)}))
+    assert utils.thaw(frozen) == obj
+    assert type(utils.thaw(frozen)['a']) is list
+
+
+def test_frozen_dict_read_only():
+    frozen = utils.freeze({'a': [1, 2]})
+    with pytest.raises(TypeError):
+        frozen['a'] = 0
+    with pytest.raises(AttributeError):
+        frozen['a'].append(3)
+
+
+def test_frozen_dict_hash_and_pickle():
+    frozen = utils.freeze({'a': [1, 2], 'b': {'c': 3}})
+    assert hash(frozen) == hash(utils.freeze({'b': {'c': 3}, 'a': (1, 2)}))
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+
+
+def test_freeze_shares_frozen_structure():
+    frozen = utils.freeze({'a': [1]})
+    assert utils.freeze(frozen) is frozen
+
+
+def test_thaw_does_not_share_structure():
+    frozen = utils.freeze({'a': {'b': [1]}})
+    thawed = utils.thaw(frozen)
+    thawed['a']['b'].append(2)
+    assert frozen['a']['b'] == (1,)
+
+
+def test_subproduct_dict_copy_by_default(dm):
+    subproduct_dict = dm.get_subproduct_dict('maps', 'default')
+    assert type(subproduct_dict) is dict
+    assert isinstance(subproduct_dict['allowed_qids'], list)
+
+    # mutating the copy does not affect the datamodel
+    subproduct_dict['allowed_qids'].append('not_a_qid')
+    subproduct_dict['split_map_file_template'] = None
+    assert 'not_a_qid' not in dm.get_subproduct_dict('maps', 'default')['allowed_qids']
+    assert dm.get_subproduct_dict('maps', 'default')['split_map_file_template'] is not None
+
+
+def test_subproduct_dict_no_copy(dm):
+    subproduct_dict = dm.get_subproduct_dict('maps', 'default', copy=False)
+    assert isinstance(subproduct_dict, utils.FrozenDict)
+    assert subproduct_dict is dm.get_subproduct_dict('maps', 'default', copy=False)
+    assert utils.thaw(subproduct_dict) == dm.get_subproduct_dict('maps', 'default')
+
+
+def test_product_dict_copy_by_default(dm):
+    product_dict = dm.get_product_dict('maps')
+    assert type(product_dict) is dict
+    assert type(product_dict['default']) is dict
+    assert isinstance(dm.get_product_dict('maps', copy=False), utils.FrozenDict)
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# deferred until a product is actually read, see utils.lazy_import
+HEAVY_MODULES = ('astropy', 'scipy', 'h5py', 'yaml', 'pixell', 'numpy')
+
+# cumulative import time of sofind, in microseconds. importing the heavy
+# modules eagerly takes over a second
+IMPORT_TIME_BUDGET = 500_000
+
+
+def run_python(code, *args):
+    return subprocess.run(
+        [sys.executable, *args, '-c', code], capture_output=True, text=True,
+        check=True, env=dict(os.environ, PYTHONWARNINGS='ignore')
+        )
+
+
+def get_import_times(code):
+    """Map from module name to cumulative import time (us), see python -X
+    importtime."""
+    stderr = run_python(code, '-X', 'importtime').stderr
+    import_times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        import_times[name.strip()] = int(cumulative)
+    return import_times
+
+
+def test_import_defers_heavy_modules():
+    import_times = get_import_times('from sofind import DataModel')
+    for name in import_times:
+        assert name.split('.')[0] not in HEAVY_MODULES, name
+
+
+def test_import_time_budget():
+    import_times = get_import_times('from sofind import DataModel')
+    assert import_times['sofind'] < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize('module', ['astropy.io.fits', 'astropy.wcs'])
+def test_import_after_sofind(module):
+    run_python(f'import sofind; import {module}')
+
+
+def test_lazy_module_imports_on_use():
+    code = (
+        'import sys; from sofind import utils; '
+        'assert "pixell.enmap" not in sys.modules; '
+        'utils.enmap.zeros; '
+        'assert "pixell.enmap" in sys.modules'
+        )
+    run_python(code)
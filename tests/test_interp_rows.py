@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from sofind import utils
+
+
+def reference(x, xps, fps, left=None, right=None):
+    return np.array([np.interp(x, xp, fp, left=left, right=right)
+                     for xp, fp in zip(xps, fps)])
+
+
+@pytest.mark.parametrize('left, right', [(None, None), (0., None), (None, -1.),
+                                         (2., 3.)])
+def test_interp_rows(left, right):
+    rng = np.random.default_rng(0)
+    x = np.linspace(-50, 8100, 1001)
+    xps, fps = [], []
+    for n in [2, 17, 500, 3000]:
+        xps.append(np.sort(rng.uniform(0, 8000, n)))
+        fps.append(rng.standard_normal(n))
+    xps.append(np.arange(6001.))
+    fps.append(np.exp(-xps[-1] / 3000))
+
+    out = utils.interp_rows(x, xps, fps, left=left, right=right)
+    assert out.shape == (len(xps), x.size)
+    # the offset sample points are rounded
+    np.testing.assert_allclose(
+        out, reference(x, xps, fps, left=left, right=right), rtol=0,
+        atol=1e-9
+        )
+
+
+def test_interp_rows_integer_grids():
+    # as beams and transfer functions are read, exact for integer points
+    rng = np.random.default_rng(1)
+    x = np.arange(-10., 10010.)
+    xps = [np.arange(n, dtype=np.float64) for n in [2, 3001, 10001]]
+    xps.append(np.unique(rng.integers(0, 12000, 500)).astype(np.float64))
+    fps = [rng.standard_normal(xp.size) for xp in xps]
+    np.testing.assert_array_equal(
+        utils.interp_rows(x, xps, fps, right=0.),
+        reference(x, xps, fps, right=0.)
+        )
+
+
+def test_interp_rows_sample_points():
+    # queries at the sample points return the samples
+    xp = np.arange(10.)
+    fps = [np.arange(10.) ** 2, -np.arange(10.)]
+    out = utils.interp_rows(xp, [xp, xp], fps)
+    np.testing.assert_array_equal(out, fps)
+
+
+def test_interp_rows_single_point():
+    x = np.array([-1., 0., 1.])
+    out = utils.interp_rows(x, [[0.], [0., 2.]], [[5.], [0., 2.]])
+    np.testing.assert_allclose(out, [[5., 5., 5.], [0., 0., 1.]])
+
+
+def test_interp_rows_empty():
+    assert utils.interp_rows([0., 1.], [], []).shape == (0, 2)
+    assert utils.interp_rows([], [[0., 1.]], [[0., 1.]]).shape == (1, 0)
+
+
+def test_interp_rows_bad_input():
+    with pytest.raises(AssertionError):
+        utils.interp_rows([0.], [[0., 1.]], [[0.]])
+    with pytest.raises(AssertionError):
+        utils.interp_rows([0.], [[0., 1.]], [])
+    with pytest.raises(AssertionError):
+        utils.interp_rows([[0.]], [[0., 1.]], [[0., 1.]])
@@ -0,0 +1,110 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sofind import DataModel, utils
+
+CONFIG_NAMES = [name for name in utils.get_package_config_names('datamodels')]
+
+
+@pytest.mark.parametrize('config_name', CONFIG_NAMES)
+def test_lazy_matches_eager(config_name):
+    lazy = DataModel.from_config(config_name, lazy=True)
+    try:
+        eager = DataModel.from_config(config_name, use_bundle=False)
+    except FileNotFoundError:
+        # e.g. act_dr6v3 names a masks config that is not distributed. the
+        # lazy data model fails the same way, once the product is requested
+        with pytest.raises(FileNotFoundError):
+            for product in lazy.configs:
+                lazy.get_product_dict(product)
+        return
+
+    assert lazy.configs == eager.configs
+    for product in eager.configs:
+        assert lazy.get_product_dict(product, copy=False) == \
+            eager.get_product_dict(product, copy=False)
+        assert lazy.get_product_dict(product) == eager.get_product_dict(product)
+
+
+def test_lazy_loads_on_first_access():
+    dm = DataModel.from_config('act_dr6v4', lazy=True)
+    assert len(dm.maps) == 0
+
+    subproduct_dict = dm.get_subproduct_dict('maps', 'default', copy=False)
+    assert set(dm.maps) == {'default'}
+    assert dm.get_subproduct_dict('maps', 'default', copy=False) is \
+        subproduct_dict
+
+    # filling the product dict loads only the missing subproducts
+    product_dict = dm.get_product_dict('maps', copy=False)
+    assert set(product_dict) == set(dm.configs['maps'])
+    assert product_dict['default'] is subproduct_dict
+
+    # and products can be used as usual
+    eager = DataModel.from_config('act_dr6v4', use_bundle=False)
+    assert dm.get_map_fn('pa5a', split_num=1) == \
+        eager.get_map_fn('pa5a', split_num=1)
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_unknown_subproduct(lazy):
+    dm = DataModel.from_config('act_dr6v4', lazy=lazy, use_bundle=False)
+    with pytest.raises(LookupError):
+        dm.get_subproduct_dict('maps', 'not_a_subproduct')
+    with pytest.raises(LookupError):
+        dm.get_map_fn('pa5a', subproduct='not_a_subproduct')
+    with pytest.raises(LookupError):
+        dm.get_product_dict('not_a_product')
+
+
+def test_lazy_checks_qids_config_on_first_access(monkeypatch):
+    dm = DataModel.from_config('act_dr6v4', lazy=True)
+    subproduct = 'beams_v4_20230902'
+    subproduct_config = dm.configs['beams'][subproduct]
+
+    # a beams config that does not allow the qids_config of the data model
+    get_package_config = utils.get_package_config
+    def patched_get_package_config(basename, return_signature=False, **kwargs):
+        signature, config = get_package_config(
+            basename, return_signature=True, **kwargs
+            )
+        if basename == f'products/beams/{subproduct_config}':
+            config = utils.freeze({
+                **utils.thaw(config), 
+                'allowed_qids_configs': ['not_the_qids_config.yaml']
+                })
+        return (signature, config) if return_signature else config
+    monkeypatch.setattr(utils, 'get_package_config', patched_get_package_config)
+
+    # other products are unaffected
+    dm.get_map_fn('pa5a')
+    with pytest.raises(AssertionError, match='not allowed'):
+        dm.get_beam_fn('pa5a', subproduct=subproduct)
+    with pytest.raises(AssertionError, match='not allowed'):
+        dm.get_product_dict('beams')
+    assert subproduct not in dm.beams
+
+    # whereas the eager data model fails up front
+    with pytest.raises(AssertionError, match='not allowed'):
+        DataModel.from_config('act_dr6v4', use_bundle=False)
+
+
+def test_lazy_concurrent_loads():
+    dm = DataModel.from_config('act_dr6v4', lazy=True)
+    requests = [(product, subproduct) for product in dm.configs 
+                for subproduct in dm.configs[product]]
+    barrier = threading.Barrier(8)
+
+    def load(request):
+        barrier.wait()
+        return dm.get_subproduct_dict(*request, copy=False)
+
+    # every thread loads every subproduct at once; none may be lost
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: [load(r) for r in requests], range(8)))
+
+    eager = DataModel.from_config('act_dr6v4', use_bundle=False)
+    for product in dm.configs:
+        assert getattr(dm, product) == eager.get_product_dict(product, copy=False)
@@ -0,0 +1,74 @@
+import pytest
+
+from sofind import utils
+
+
+@pytest.fixture
+def listing_cache():
+    utils.enable_listing_cache()
+    yield
+    utils.disable_listing_cache()
+
+
+def test_file_exists_without_cache(tmp_path):
+    fn = tmp_path / 'a.fits'
+    assert not utils.file_exists(str(fn))
+    fn.touch()
+    assert utils.file_exists(str(fn))
+    assert not utils.file_exists(str(tmp_path))
+
+
+def test_listing_reused(tmp_path, listing_cache):
+    (tmp_path / 'a.fits').touch()
+    stats = utils.get_listing_cache_stats()
+
+    assert utils.file_exists(str(tmp_path / 'a.fits'))
+    assert not utils.file_exists(str(tmp_path / 'b.fits'))
+    new_stats = utils.get_listing_cache_stats()
+    assert new_stats['queries'] - stats['queries'] == 2
+    assert new_stats['scans'] - stats['scans'] == 1
+
+
+def test_listing_stale_until_invalidated(tmp_path, listing_cache):
+    fn = tmp_path / 'a.fits'
+    assert not utils.file_exists(str(fn))
+    fn.touch()
+    assert not utils.file_exists(str(fn))
+
+    utils.invalidate_listing_cache(str(tmp_path))
+    assert utils.file_exists(str(fn))
+
+    fn.unlink()
+    assert utils.file_exists(str(fn))
+    utils.invalidate_listing_cache()
+    assert not utils.file_exists(str(fn))
+
+
+def test_listing_ttl(tmp_path):
+    utils.enable_listing_cache(ttl=0)
+    try:
+        fn = tmp_path / 'a.fits'
+        assert not utils.file_exists(str(fn))
+        fn.touch()
+        assert utils.file_exists(str(fn))
+    finally:
+        utils.disable_listing_cache()
+
+
+def test_missing_directory(tmp_path, listing_cache):
+    assert not utils.file_exists(str(tmp_path / 'missing' / 'a.fits'))
+
+
+def test_protected_fn_uses_listing(tmp_path, listing_cache):
+    fn_a, fn_b = str(tmp_path / 'a.fits'), str(tmp_path / 'b.fits')
+    (tmp_path / 'b.fits').touch()
+    stats = utils.get_listing_cache_stats()
+    assert utils.get_protected_fn(fn_a, fn_b) == fn_b
+    assert utils.get_listing_cache_stats()['scans'] - stats['scans'] == 1
+
+    # a new file is not seen until the listing is invalidated
+    (tmp_path / 'a.fits').touch()
+    assert utils.get_protected_fn(fn_a, fn_b) == fn_b
+    utils.invalidate_listing_cache(str(tmp_path))
+    with pytest.raises(FileExistsError):
+        utils.get_protected_fn(fn_a, fn_b)
@@ -0,0 +1,65 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from sofind import utils
+
+
+@pytest.fixture
+def loadtxt_cache(tmp_path):
+    cache_dir = tmp_path / 'loadtxt'
+    utils.enable_loadtxt_cache(cache_dir)
+    yield cache_dir
+    utils.disable_loadtxt_cache()
+
+
+def test_atomic_write(tmp_path):
+    fn = tmp_path / 'sub' / 'obj.pkl'
+    utils.atomic_pickle_dump({'a': 1}, fn)
+    with open(fn, 'rb') as f:
+        assert pickle.load(f) == {'a': 1}
+
+    # a failed write leaves the previous file and no temporary file behind
+    def fail(f):
+        f.write(b'partial')
+        raise RuntimeError
+    with pytest.raises(RuntimeError):
+        utils.atomic_write(fn, fail)
+    with open(fn, 'rb') as f:
+        assert pickle.load(f) == {'a': 1}
+    assert os.listdir(fn.parent) == ['obj.pkl']
+
+
+def test_loadtxt_cache(tmp_path, loadtxt_cache):
+    fn = tmp_path / 'table.txt'
+    arr = np.arange(12.).reshape(4, 3)
+    np.savetxt(fn, arr)
+
+    out = utils.loadtxt(fn, unpack=True)
+    np.testing.assert_array_equal(out, arr.T)
+    assert not out.flags.writeable
+    sidecars = os.listdir(loadtxt_cache)
+    assert len(sidecars) == 1 and sidecars[0].endswith('.npy')
+
+    out = utils.loadtxt(fn, unpack=True)
+    assert isinstance(out, np.memmap)
+    np.testing.assert_array_equal(out, arr.T)
+    assert out.flags.c_contiguous
+
+    # different keyword arguments and modified files get their own sidecar
+    np.testing.assert_array_equal(utils.loadtxt(fn), arr)
+    np.savetxt(fn, 2 * arr)
+    st = os.stat(fn)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    np.testing.assert_array_equal(utils.loadtxt(fn), 2 * arr)
+    assert len(os.listdir(loadtxt_cache)) == 3
+
+
+def test_loadtxt_no_cache(tmp_path, cache_dir):
+    fn = tmp_path / 'table.txt'
+    np.savetxt(fn, np.ones((2, 2)))
+    out = utils.loadtxt(fn)
+    assert out.flags.writeable
+    assert not cache_dir.exists()
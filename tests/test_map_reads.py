@@ -0,0 +1,191 @@
+import os
+
+import numpy as np
+import pytest
+from astropy.io import fits
+from pixell import enmap
+
+from sofind import DataModel, utils
+
+QIDS = ('pa5a', 'pa5b', 'pa6a')
+
+
+def make_map(seed, ncomp=3, res=2):
+    shape, wcs = enmap.fullsky_geometry(res=np.radians(res))
+    rng = np.random.default_rng(seed)
+    return enmap.ndmap(rng.standard_normal((ncomp, *shape)), wcs)
+
+
+@pytest.fixture
+def dm(tmp_path):
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    dm.get_subproduct_path = lambda *args, **kwargs: str(tmp_path)
+    return dm
+
+
+@pytest.fixture
+def maps(dm):
+    """Write a map for each qid and split 0-1, return them by filename."""
+    maps = {}
+    for i, qid in enumerate(QIDS):
+        for split_num in range(2):
+            fn = dm.get_map_fn(qid, split_num=split_num)
+            maps[fn] = make_map(2*i + split_num)
+            enmap.write_map(fn, maps[fn])
+    return maps
+
+
+def num_open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def test_read_map_mmap(dm, maps):
+    fn = dm.get_map_fn('pa5a')
+    omap = dm.read_map('pa5a', mmap=True)
+    assert isinstance(omap, enmap.ndmap)
+    assert not omap.flags.writeable
+    np.testing.assert_array_equal(omap, maps[fn])
+    assert omap.shape == maps[fn].shape
+    assert omap.wcs.wcs.compare(maps[fn].wcs.wcs)
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc')
+def test_read_map_mmap_closes_file(dm, maps):
+    fn = dm.get_map_fn('pa5a')
+    nfds = num_open_fds()
+    omap = utils.read_map_mmap(fn)
+    # only the memory map's own descriptor is open while the map exists
+    assert num_open_fds() <= nfds + 1
+    del omap
+    assert num_open_fds() == nfds
+
+
+def test_read_map_mmap_region(dm, maps):
+    fn = dm.get_map_fn('pa5a')
+    box = np.radians([[-10, 20], [10, -20]])
+    expected = enmap.read_map(fn, box=box)[1]
+    np.testing.assert_array_equal(
+        dm.read_map('pa5a', mmap=True, box=box, comps=1), expected
+        )
+    np.testing.assert_array_equal(
+        dm.read_map('pa5a', box=box, comps=1), expected
+        )
+
+
+@pytest.fixture
+def iau_fn(tmp_path):
+    fn = str(tmp_path / 'iau.fits')
+    enmap.write_map(fn, make_map(0))
+    with fits.open(fn, mode='update') as hdul:
+        header = hdul[0].header
+        header.update(CTYPE3='STOKES', CRPIX3=1., CRVAL3=1., CDELT3=1.,
+                      POLCCONV='IAU')
+    return fn
+
+
+def test_read_map_mmap_refuses_stokes_flip(iau_fn):
+    # enmap.read_map flips the sign of U for the IAU convention
+    imap = enmap.read_map(iau_fn)
+    np.testing.assert_array_equal(imap[2], -make_map(0)[2])
+
+    nfds = num_open_fds() if os.path.isdir('/proc/self/fd') else None
+    with pytest.raises(ValueError, match='Stokes'):
+        utils.read_map_mmap(iau_fn)
+    if nfds is not None:
+        assert num_open_fds() == nfds
+
+
+def test_datamodel_read_map_mmap_refuses_stokes_flip(dm, iau_fn):
+    dm.get_map_fn = lambda *args, **kwargs: iau_fn
+    with pytest.raises(ValueError, match='Stokes'):
+        dm.read_map('pa5a', mmap=True)
+    np.testing.assert_array_equal(dm.read_map('pa5a'), enmap.read_map(iau_fn))
+
+
+def test_read_map_mmap_refuses_scaled_data(tmp_path):
+    fn = str(tmp_path / 'scaled.fits')
+    enmap.write_map(fn, make_map(0))
+    with fits.open(fn, mode='update') as hdul:
+        hdul[0].header['BSCALE'] = 2.
+    with pytest.raises(ValueError, match='scaled'):
+        utils.read_map_mmap(fn)
+
+
+def test_read_maps_matches_read_map(dm, maps):
+    omaps = dm.read_maps(QIDS, split_nums=[0, 1])
+    assert omaps.shape[:2] == (len(QIDS), 2)
+    for i, qid in enumerate(QIDS):
+        for split_num in range(2):
+            np.testing.assert_array_equal(
+                omaps[i, split_num], dm.read_map(qid, split_num=split_num)
+                )
+    assert omaps.wcs.wcs.compare(dm.read_map('pa5a').wcs.wcs)
+
+    # str and int arguments count as length-1 axes
+    omap = dm.read_maps('pa5b', split_nums=1)
+    assert omap.shape[:2] == (1, 1)
+    np.testing.assert_array_equal(omap[0, 0], dm.read_map('pa5b', split_num=1))
+
+
+def test_read_maps_out(dm, maps):
+    omaps = dm.read_maps(QIDS[:2])
+    out = np.zeros_like(omaps)
+    res = dm.read_maps(QIDS[:2], out=out)
+    assert np.shares_memory(res, out)
+    np.testing.assert_array_equal(out, omaps)
+
+    with pytest.raises(ValueError, match='out shape'):
+        dm.read_maps(QIDS, out=out)
+
+
+def test_read_maps_read_cache(dm, maps):
+    expected = dm.read_maps(QIDS, split_nums=[0, 1])
+    dm.enable_read_cache(2**30)
+    np.testing.assert_array_equal(dm.read_maps(QIDS, split_nums=[0, 1]), expected)
+
+
+def test_read_maps_geometry_mismatch(dm, maps):
+    enmap.write_map(dm.get_map_fn('pa6a'), make_map(0, res=4))
+    with pytest.raises(ValueError, match='Geometry'):
+        dm.read_maps(QIDS)
+
+
+def test_read_maps_falls_back_to_read_map(dm, maps, iau_fn):
+    # maps needing a Stokes flip cannot be memory mapped, but must still be
+    # read the way read_map reads them
+    fn = dm.get_map_fn('pa5b')
+    os.replace(iau_fn, fn)
+    omaps = dm.read_maps(QIDS)
+    for i, qid in enumerate(QIDS):
+        np.testing.assert_array_equal(omaps[i, 0], dm.read_map(qid))
+    np.testing.assert_array_equal(omaps[1, 0, 2], -make_map(0)[2])
+
+
+@pytest.mark.parametrize('read_cache', [False, True])
+def test_read_maps_coadd_reads_once(dm, monkeypatch, read_cache):
+    coadds = {}
+    for i, qid in enumerate(QIDS[:2]):
+        fn = dm.get_map_fn(qid, coadd=True)
+        coadds[fn] = make_map(10 + i)
+        enmap.write_map(fn, coadds[fn])
+    if read_cache:
+        dm.enable_read_cache(2**30)
+
+    reads = []
+    read_map_mmap, read_map = utils.read_map_mmap, dm._read_map
+    monkeypatch.setattr(
+        utils, 'read_map_mmap', lambda fn: reads.append(fn) or read_map_mmap(fn)
+        )
+    monkeypatch.setattr(
+        dm, '_read_map', lambda fn: reads.append(fn) or read_map(fn)
+        )
+
+    # the split axis is kept, but every slot holds the same coadd
+    omaps = dm.read_maps(QIDS[:2], split_nums=[0, 1, 2], coadd=True)
+    assert omaps.shape[:2] == (2, 3)
+    assert sorted(reads) == sorted(coadds)
+    for i, qid in enumerate(QIDS[:2]):
+        for split_num in range(3):
+            np.testing.assert_array_equal(
+                omaps[i, split_num], coadds[dm.get_map_fn(qid, coadd=True)]
+                )
@@ -0,0 +1,87 @@
+import pytest
+
+from sofind import DataModel, utils
+
+
+@pytest.fixture
+def dm():
+    return DataModel.from_config('act_dr6v4', use_bundle=False)
+
+
+def set_noise_subproduct_dict(dm, subprod_dict, subproduct='default'):
+    noise_models = utils.thaw(dm.noise_models)
+    noise_models[subproduct] = subprod_dict
+    dm.noise_models = utils.freeze(noise_models)
+
+
+def test_noise_model_config_ok(dm):
+    dm.check_noise_model_config('tile_cmbmask')
+    assert ('default', 'tile_cmbmask') in dm._checked_noise_models
+    assert ('default', 'maps', 'default') in dm._checked_noise_parents
+
+
+@pytest.mark.parametrize('key, value, match', [
+    ('data_model_name', 'act_dr6v3', 'Inconsistent data_model_name'),
+    ('subproduct', 'other', 'Inconsistent subproduct'),
+])
+def test_noise_model_config_inconsistent(dm, key, value, match):
+    subprod_dict = dm.get_subproduct_dict('noise_models', 'default')
+    subprod_dict['tile_cmbmask'][key] = value
+    set_noise_subproduct_dict(dm, subprod_dict)
+
+    with pytest.raises(AssertionError, match=match):
+        dm.check_noise_model_config('tile_cmbmask')
+    assert ('default', 'tile_cmbmask') not in dm._checked_noise_models
+
+    # the check runs on first use, before mnms is needed
+    with pytest.raises(AssertionError, match=match):
+        dm.get_noise_fn('tile_cmbmask', 'pa5a', split_num=0, sim_num=0)
+
+    # other noise models in the subproduct are unaffected
+    dm.check_noise_model_config('tile_cmbmask_ivfwhm2')
+
+
+@pytest.mark.parametrize('update', [
+    {'allowed_qids': ['pa5a', 'pa5b', 'pa7a']},
+    {'allowed_qids_configs': ['act_dr6vX_qids.yaml', 'other_qids.yaml']},
+    {'allowed_qids_extra_kwargs': {'pa5a': {'num_splits': 8}}},
+])
+def test_noise_model_config_not_subset(dm, update):
+    subprod_dict = dm.get_subproduct_dict('noise_models', 'default')
+    subprod_dict.update(update)
+    set_noise_subproduct_dict(dm, subprod_dict)
+
+    with pytest.raises(AssertionError):
+        dm.check_noise_model_config('tile_cmbmask')
+    assert ('default', 'maps', 'default') not in dm._checked_noise_parents
+
+    with pytest.raises(AssertionError):
+        dm.get_noise_fn('tile_cmbmask', 'pa5a', split_num=0, sim_num=0)
+
+
+def test_noise_model_config_checked_once(dm, monkeypatch):
+    calls = []
+    check_subset = dm.check_subproduct_config_is_subset
+
+    def counting_check_subset(*args, **kwargs):
+        calls.append(args)
+        return check_subset(*args, **kwargs)
+
+    monkeypatch.setattr(
+        dm, 'check_subproduct_config_is_subset', counting_check_subset
+        )
+
+    dm.check_noise_model_config('tile_cmbmask')
+    dm.check_noise_model_config('tile_cmbmask')
+    assert len(calls) == 1
+
+    # a second noise model with the same parent subproduct does not recheck
+    # the parent
+    dm.check_noise_model_config('tile_cmbmask_ivfwhm2')
+    assert len(calls) == 1
+
+    # once checked, later edits to the config are not seen again
+    subprod_dict = dm.get_subproduct_dict('noise_models', 'default')
+    subprod_dict['tile_cmbmask']['data_model_name'] = 'act_dr6v3'
+    set_noise_subproduct_dict(dm, subprod_dict)
+    dm.check_noise_model_config('tile_cmbmask')
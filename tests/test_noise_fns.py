@@ -0,0 +1,69 @@
+import pytest
+
+from sofind import DataModel
+
+
+@pytest.fixture
+def dm():
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    # stand in for the parameters mnms would format from the packaged config,
+    # so no mnms is needed. mnms derives lmax, which the templates use
+    params = dm.get_subproduct_dict('noise_models', 'default')['tile_cmbmask']
+    params.update(config_name='act_dr6v4', noise_model_name='tile_cmbmask',
+                  lmax=5400)
+    dm._noise_models[('default', 'tile_cmbmask')] = (None, params)
+    return dm
+
+
+def test_noise_fns(dm):
+    fn = dm.get_noise_fn(
+        'tile_cmbmask', 'pa5a', 'pa5b', split_num=1, sim_num=3, basename=True
+        )
+    assert fn == ('act_dr6v4_tile_cmbmask_pa5_f090_pa5_f150_lmax5400_4way_'
+                  'set1_noise_sim_map0003.fits')
+
+    fns = dm.get_noise_fns(
+        'tile_cmbmask', 'pa5a', 'pa5b', split_nums=[0, 1], sim_nums=[2, 3],
+        alm=True, basename=True
+        )
+    assert fns.shape == (2, 2)
+    for i, split_num in enumerate([0, 1]):
+        for j, sim_num in enumerate([2, 3]):
+            assert fns[i, j] == dm.get_noise_fn(
+                'tile_cmbmask', 'pa5a', 'pa5b', split_num=split_num,
+                sim_num=sim_num, alm=True, basename=True
+                )
+
+
+def test_noise_fn_kwargs_override_model_params(dm):
+    # as at baseline, where kwargs updated the noise model's param_dict
+    fn = dm.get_noise_fn('tile_cmbmask', 'pa5a', split_num=0, sim_num=0,
+                         lmax=1000, dtype='f8', basename=True)
+    assert fn == ('act_dr6v4_tile_cmbmask_pa5_f090_lmax1000_4way_set0_'
+                  'noise_sim_map0000.fits')
+    fns = dm.get_noise_fns('tile_cmbmask', 'pa5a', which='models', lmax=1000,
+                           basename=True)
+    assert fns[0, 0] == ('act_dr6v4_tile_cmbmask_pa5_f090_lmax1000_4way_set0_'
+                         'noise_model.hdf5')
+
+    # the memoized parameters are not modified by an override
+    fn = dm.get_noise_fn('tile_cmbmask', 'pa5a', split_num=0, sim_num=0,
+                         basename=True)
+    assert 'lmax5400_4way' in fn
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(config_name='act_dr6v3'),
+    dict(noise_model_name='tile_other'),
+    dict(qids='pa6a'),
+    dict(qid_names='pa6_f090'),
+    dict(num_splits=1), # a keyword argument shared by the qids
+    dict(alm_str='alm')
+    ])
+def test_noise_fn_duplicate_kwargs(dm, kwargs):
+    with pytest.raises(TypeError, match='multiple values'):
+        dm.get_noise_fn(
+            'tile_cmbmask', 'pa5a', split_num=0, sim_num=0, **kwargs
+            )
+    with pytest.raises(TypeError, match='multiple values'):
+        dm.get_noise_fns('tile_cmbmask', 'pa5a', **kwargs)
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from sofind import utils
+
+
+class Tracker:
+    """Count the results of func alive at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.live = 0
+        self.peak = 0
+        self.calls = []
+
+    def __call__(self, item):
+        with self.lock:
+            self.calls.append(item)
+        return Result(self, item)
+
+
+class Result:
+
+    def __init__(self, tracker, item):
+        self.tracker = tracker
+        self.item = item
+        with tracker.lock:
+            tracker.live += 1
+            tracker.peak = max(tracker.peak, tracker.live)
+
+    def __del__(self):
+        with self.tracker.lock:
+            self.tracker.live -= 1
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_iter_prefetch_order(prefetch):
+    tracker = Tracker()
+    items = [r.item for r in utils.iter_prefetch(tracker, range(10), prefetch)]
+    assert items == list(range(10))
+
+
+@pytest.mark.parametrize('prefetch', [1, 2, 3])
+def test_iter_prefetch_memory_bound(prefetch):
+    # a slow consumer lets every prefetched result finish before the next
+    tracker = Tracker()
+    for result in utils.iter_prefetch(tracker, range(10), prefetch):
+        time.sleep(0.01)
+        del result
+    assert tracker.peak == prefetch + 1
+
+    # the loop variable can keep the previous result alive for one more
+    tracker = Tracker()
+    for result in utils.iter_prefetch(tracker, range(10), prefetch):
+        time.sleep(0.01)
+    assert tracker.peak <= prefetch + 2
+
+
+def test_iter_prefetch_close():
+    tracker = Tracker()
+    it = utils.iter_prefetch(tracker, range(100), prefetch=2)
+    next(it)
+    it.close()
+    assert len(tracker.calls) <= 3
+    assert not [t for t in threading.enumerate()
+                if t.name.startswith('sofind-prefetch')]
+
+
+def test_iter_prefetch_raises():
+    def func(item):
+        if item == 2:
+            raise RuntimeError(item)
+        return item
+
+    it = utils.iter_prefetch(func, range(5), prefetch=2)
+    assert [next(it), next(it)] == [0, 1]
+    with pytest.raises(RuntimeError):
+        next(it)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from sofind import utils
+
+
+def reader(arr, counter):
+    def read_func():
+        counter.append(None)
+        return arr.copy()
+    return read_func
+
+
+def test_hit_and_miss():
+    cache = utils.ReadCache(max_bytes=1000)
+    counter = []
+    arr = np.arange(10.)
+    a = cache.get('a', reader(arr, counter))
+    b = cache.get('a', reader(arr, counter))
+    np.testing.assert_array_equal(a, arr)
+    np.testing.assert_array_equal(b, arr)
+    assert len(counter) == 1
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.stats['nbytes'] == arr.nbytes
+
+
+def test_lru_eviction():
+    # room for two arrays of 80 bytes
+    cache = utils.ReadCache(max_bytes=160)
+    counter = []
+    arr = np.arange(10.)
+    cache.get('a', reader(arr, counter))
+    cache.get('b', reader(arr, counter))
+    cache.get('a', reader(arr, counter))
+    cache.get('c', reader(arr, counter))
+
+    # b was least-recently used
+    assert cache.stats['evictions'] == 1
+    assert cache.stats['items'] == 2
+    assert cache.stats['nbytes'] == 160
+    cache.get('a', reader(arr, counter))
+    assert len(counter) == 3
+    cache.get('b', reader(arr, counter))
+    assert len(counter) == 4
+
+
+def test_clear():
+    cache = utils.ReadCache(max_bytes=1000)
+    cache.get('a', reader(np.arange(10.), []))
+    cache.clear()
+    assert cache.stats['items'] == 0
+    assert cache.stats['nbytes'] == 0
+    assert cache.stats['evictions'] == 0
+
+
+@pytest.mark.parametrize('key', ['a', None])
+@pytest.mark.parametrize('size', [10, 1000])
+def test_read_only_regardless_of_size(key, size):
+    cache = utils.ReadCache(max_bytes=1000)
+    arr = cache.get(key, reader(np.arange(size, dtype=np.float64), []))
+    assert not arr.flags.writeable
+    with pytest.raises(ValueError):
+        arr[0] = 1
+
+    # an array too large to cache is not cached
+    assert cache.stats['items'] == (1 if key is not None and size == 10 else 0)
+
+
+@pytest.mark.parametrize('key', ['a', None])
+@pytest.mark.parametrize('size', [10, 1000])
+def test_copy_writeable_regardless_of_size(key, size):
+    cache = utils.ReadCache(max_bytes=1000, copy=True)
+    read_func = reader(np.arange(size, dtype=np.float64), [])
+    arr = cache.get(key, read_func)
+    arr[0] = -1
+    assert cache.get(key, read_func)[0] == 0
+
+
+def test_make_key():
+    assert utils.make_key({'a': [1, 2], 'b': slice(0, 2)}) == \
+        utils.make_key({'b': slice(0, 2), 'a': (1, 2)})
+    assert utils.make_key({'a': np.arange(3)}) != \
+        utils.make_key({'a': np.arange(3) + 1})
+    assert utils.make_key({'a': object}) is not None
+    assert utils.make_key({'a': {1, 2}}) is None
@@ -0,0 +1,61 @@
+import gc
+import weakref
+
+import pytest
+
+from sofind import DataModel
+
+
+@pytest.fixture
+def dm():
+    return DataModel.from_config('act_dr6v4', use_bundle=False)
+
+
+def test_resolver_cached(dm):
+    r = dm.resolver('maps', 'default', 'pa5a', 'split_map_file_template')
+    assert r is dm.resolver(
+        'sofind.products.maps', 'default', 'pa5a', 'split_map_file_template'
+        )
+    assert r(split_num=1, maptag='ivar') == dm.get_map_fn(
+        'pa5a', split_num=1, maptag='ivar'
+        )
+
+
+def test_resolver_basename(dm):
+    r = dm.resolver('maps', 'default', 'pa5a', 'split_map_file_template')
+    assert r(basename=True, split_num=0, maptag='map') == \
+        'cmb_night_pa5_f090_3pass_4way_set0_map.fits'
+
+
+def test_kwargs_override_qid_kwargs(dm):
+    # as at baseline, where get_map_fn did qid_kwargs.update(**kwargs)
+    assert dm.get_map_fn('pa5a', freq='f220', basename=True) == \
+        'cmb_night_pa5_f220_3pass_4way_set0_map.fits'
+    fns = dm.get_map_fns(['pa5a', 'pa6b'], array='pa4', basename=True)
+    assert fns[0, 0, 0] == 'cmb_night_pa4_f090_3pass_4way_set0_map.fits'
+    assert fns[1, 0, 0] == 'cmb_night_pa4_f150_3pass_4way_set0_map.fits'
+    r = dm.resolver('maps', 'default', 'pa5a', 'split_map_file_template')
+    assert r(split_num=0, maptag='map', freq='f220', basename=True) == \
+        'cmb_night_pa5_f220_3pass_4way_set0_map.fits'
+    # the cached resolver is not modified by an override
+    assert r(split_num=0, maptag='map', basename=True) == \
+        'cmb_night_pa5_f090_3pass_4way_set0_map.fits'
+
+
+def test_duplicate_kwargs_raise(dm):
+    with pytest.raises(TypeError):
+        dm.get_map_fn('pa5a', split_num=0, **{'split_num': 1})
+
+
+def test_resolver_cache_does_not_keep_datamodel_alive():
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    dm.get_map_fn('pa5a')
+    ref = weakref.ref(dm)
+
+    # freed without the cyclic garbage collector, i.e., there is no cycle
+    gc.disable()
+    try:
+        del dm
+        assert ref() is None
+    finally:
+        gc.enable()
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sofind import DataModel
+
+QIDS = ('pa5a', 'pa5b', 'pa6a')
+SUBPRODUCT = 'tf_dr6v4_240416'
+
+
+@pytest.fixture
+def dm(tmp_path):
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    dm.get_subproduct_path = lambda *args, **kwargs: str(tmp_path)
+    return dm
+
+
+@pytest.fixture
+def tfs(dm):
+    tfs = {}
+    for i, qid in enumerate(QIDS):
+        ells = np.arange(0., 4001. + 100*i)
+        tf = np.linspace(0.5 + 0.1*i, 1., ells.size)
+        fn = dm.get_tf_fn(qid, subproduct=SUBPRODUCT)
+        np.savetxt(fn, np.array([ells, tf]).T)
+        tfs[qid] = np.array([ells, tf])
+    return tfs
+
+
+def test_read_tf_dummy_is_private():
+    dm = DataModel.from_config('act_dr6v4', use_bundle=False)
+    tf = dm.read_tf('pa5a', subproduct='dummy')
+    assert tf.flags.writeable
+    np.testing.assert_array_equal(tf[0], np.arange(2, 3001))
+    np.testing.assert_array_equal(tf[1], 1)
+
+    tf[1] = 0
+    np.testing.assert_array_equal(dm.read_tf('pa5a', subproduct='dummy')[1], 1)
+    np.testing.assert_array_equal(
+        dm.eval_tf('pa5a', [2, 100], subproduct='dummy'), [[1, 1]]
+        )
+
+
+def test_read_tf(dm, tfs):
+    for qid in QIDS:
+        np.testing.assert_array_equal(dm.read_tf(qid, subproduct=SUBPRODUCT), tfs[qid])
+
+
+def test_eval_tf(dm, tfs):
+    ells = np.array([[0, 10.5, 4000], [4050, 4150, 5000]])
+    out = dm.eval_tf(QIDS + QIDS[:1], ells, subproduct=SUBPRODUCT, right=0.)
+    assert out.shape == (4, 2, 3)
+    for i, qid in enumerate(QIDS + QIDS[:1]):
+        ell, tf = tfs[qid]
+        np.testing.assert_allclose(
+            out[i], np.interp(ells, ell, tf, right=0.), rtol=0, atol=1e-12
+            )
+
+    fn = dm.get_tf_fn('pa5a', subproduct=SUBPRODUCT)
+    table = dm.get_tf_table(fn)
+    assert not table.flags.writeable
+    assert table is dm.get_tf_table(fn)